@@ -3,38 +3,122 @@ Initialize Flask application and register blueprints for each set of routes:
 """
 
 from flask import Flask
+import threading
+import click
+
+from app.utils.startup import startup
 
 # Custom modules
-from config import ApplicationConfig
+with startup.stage("config"):
+    from config import ApplicationConfig
+    from logger import get_stats as get_log_stats
+    from app.constants import FAST_START
+    from app.utils.metrics import TimedJSONProvider, metrics
 
 # Import the extensions
-from .extensions import bcrypt, db, migrate
+with startup.stage("extensions"):
+    from .extensions import bcrypt, db, init_migrate
 
 # Create the app instance
 app = Flask(__name__)
 
 # Set the configurations from external object
 app.config.from_object(ApplicationConfig)
+# Time the encoding of the responses
+app.json = TimedJSONProvider(app)
 
 # Initialize extensions
 bcrypt.init_app(app)
 # Initialize the Database
 db.init_app(app)
 
-with app.app_context():
-    db.create_all()
+# Whether the tables are known to exist
+__schema_ready = False
+__schema_lock = threading.Lock()
+
+
+def create_schema():
+    """
+    Creates the missing tables, once per process, their later changes
+    being made by the migrations
+    """
+    global __schema_ready
+
+    if __schema_ready:
+        return
+
+    with __schema_lock:
+        if not __schema_ready:
+            with startup.stage("schema"), app.app_context():
+                db.create_all()
+            __schema_ready = True
+
+
+def preload():
+    """
+    Loads what the fast-start mode leaves for the first use, the tables,
+    the migrator, netCDF4 and the declination table
+    """
+    from app.constants import DAYLENGTH_PRECOMPUTE
+    from app.lib.dataset import get_netcdf
+    from app.lib.energy import daylength_cache, get_declinations
+
+    create_schema()
+    with startup.stage("migrate"):
+        init_migrate(app)
+    with startup.stage("netcdf"):
+        get_netcdf()
+    with startup.stage("declinations"):
+        get_declinations()
+    if DAYLENGTH_PRECOMPUTE:
+        with startup.stage("daylength"):
+            daylength_cache.precompute()
+
 
-# Initialize the migrator
-migrate.init_app(app, db)
+# The CLI commands serving the app, which keep the fast start. The others
+# need the tables and the migrator right away, `db` is only added by it
+SERVE_COMMANDS = {"run"}
+
+
+def get_cli_commands() -> set[str] | None:
+    """
+    Returns the names of the flask CLI command loading the app and of its
+    groups, None outside of the CLI
+    """
+    context = click.get_current_context(silent=True)
+    if context is None:
+        return None
+
+    names = set()
+    while context is not None:
+        names.add(context.info_name)
+        context = context.parent
+
+    return names
+
+
+cli_commands = get_cli_commands()
+if not FAST_START or (cli_commands is not None and not cli_commands & SERVE_COMMANDS):
+    create_schema()
+    # Initialize the migrator
+    with startup.stage("migrate"):
+        init_migrate(app)
 
 # Import and register blueprints
-from .routes.admin import admin_bp
-from .routes.data import data_bp
+with startup.stage("routes"):
+    from .routes.admin import admin_bp
+    from .routes.data import data_bp
 
 # from .routes.<TODO: endpoint route here> import auth_bp
 
+# The admin pages are the ones touching the tables
+admin_bp.before_request(create_schema)
+
 # Register blueprints
 app.register_blueprint(admin_bp, url_prefix="/_/admin")
 
 # The APIS for db access
 app.register_blueprint(data_bp, url_prefix="/api/data")
+
+metrics.collect("startup_seconds", lambda: startup.state)
+metrics.collect("logging", get_log_stats)
@@ -13,6 +13,72 @@ ADMIN_PASSWD = os.environ.get('ADMIN_PASSWD')
 
 TITLE = "Flask - backend"
 
+# The folder of the SDLmm NetCDF files
+SDL_DATA_FOLDER = os.environ.get("SDL_DATA_FOLDER", os.path.join("app", "static", "nc"))
+# The year the energy is estimated from, the last year when not set
+ESTIMATION_YEAR = os.environ.get("ESTIMATION_YEAR")
+
+# Defer the heavy loading (netCDF4, the declinations, the schema and the
+# migrations) to the first use or a background preload, for quick boots
+FAST_START = os.environ.get("FAST_START", "").lower() in ("1", "true")
+
+# Limits for the pool of NetCDF datasets kept open across requests
+DATASET_POOL_MAX_FILES = int(os.environ.get("DATASET_POOL_MAX_FILES", 64))
+DATASET_POOL_MAX_BYTES = int(os.environ.get("DATASET_POOL_MAX_BYTES", 64 * 1024 * 1024))
+
+# How often the NetCDF folder is checked for new files, in seconds
+DATA_POLL_INTERVAL = float(os.environ.get("DATA_POLL_INTERVAL", 5))
+
+# Where the SDL is read from: "netcdf" files, or the prebuilt "cube" or "tiles"
+SDL_BACKEND = os.environ.get("SDL_BACKEND", "netcdf")
+# Worker processes reading the NetCDF files of a range of years, 0 to read inline
+SDL_READ_WORKERS = int(os.environ.get("SDL_READ_WORKERS", 2))
+
+# The cache of monthly sunlight hours, keyed by the latitude at a resolution
+DAYLENGTH_RESOLUTION = float(os.environ.get("DAYLENGTH_RESOLUTION", 0.01))
+DAYLENGTH_CACHE_SIZE = int(os.environ.get("DAYLENGTH_CACHE_SIZE", 4096))
+# Fill in the hours for every latitude at startup
+DAYLENGTH_PRECOMPUTE = os.environ.get("DAYLENGTH_PRECOMPUTE", "").lower() in (
+    "1",
+    "true",
+)
+
+# The cache of the data responses: "memory", "redis" or "none"
+RESPONSE_CACHE_BACKEND = os.environ.get("RESPONSE_CACHE_BACKEND", "memory")
+RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", 4096))
+RESPONSE_CACHE_TTL = int(os.environ.get("RESPONSE_CACHE_TTL", 24 * 60 * 60))
+
+# The sites estimated together for each chunk of a streamed response
+STREAM_CHUNK_SIZE = int(os.environ.get("STREAM_CHUNK_SIZE", 1024))
+
+# The threads running the requests when served through asgi.py, and the
+# requests allowed to wait for them before answering with a 503
+ASGI_WORKERS = int(os.environ.get("ASGI_WORKERS", 32))
+ASGI_MAX_PENDING = int(os.environ.get("ASGI_MAX_PENDING", 256))
+
+# The share of the requests whose stages are timed for /metrics, 0 to turn off
+METRICS_SAMPLE_RATE = float(os.environ.get("METRICS_SAMPLE_RATE", 0.1))
+
+# Where the profiles of the requests are kept, and how many of the latest ones
+PROFILE_FOLDER = os.environ.get("PROFILE_FOLDER", "profiles")
+PROFILE_MAX_FILES = int(os.environ.get("PROFILE_MAX_FILES", 50))
+# The interval of the sampling profiler, in seconds
+PROFILE_SAMPLE_INTERVAL = float(os.environ.get("PROFILE_SAMPLE_INTERVAL", 0.001))
+
+# The records on a page of the admin logs, and the most bytes read for one
+LOGS_PAGE_SIZE = int(os.environ.get("LOGS_PAGE_SIZE", 100))
+LOGS_MAX_SCAN = int(os.environ.get("LOGS_MAX_SCAN", 8 * 1024 * 1024))
+
+# The users on a page of the admin portal, and in each query of the export
+USERS_PAGE_SIZE = int(os.environ.get("USERS_PAGE_SIZE", 50))
+USERS_EXPORT_BATCH = int(os.environ.get("USERS_EXPORT_BATCH", 1000))
+
+# The most sites in a request for the daily or hourly energy profiles
+ENERGY_PROFILE_MAX_SITES = int(os.environ.get("ENERGY_PROFILE_MAX_SITES", 100))
+
+# The places to warm the caches for at startup, see `flask --app run warmup`
+WARMUP_FILE = os.environ.get("WARMUP_FILE")
+
 STRINGS: dict[str, str] = {
     "user": {
         # Regarding authentication
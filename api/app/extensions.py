@@ -1,5 +1,4 @@
 from flask_bcrypt import Bcrypt
-from flask_migrate import Migrate
 
 
 # To export to the app
@@ -7,5 +6,19 @@ from app.models import db
 
 # Passwords and cryptography
 bcrypt = Bcrypt()
-# For database management
-migrate = Migrate()
+# For database management, set up by `init_migrate`
+migrate = None
+
+
+def init_migrate(app):
+    """
+    Sets up the migrations, importing alembic only when called
+    """
+    global migrate
+    from flask_migrate import Migrate
+
+    if migrate is None:
+        migrate = Migrate()
+        migrate.init_app(app, db)
+
+    return migrate
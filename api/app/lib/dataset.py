@@ -1,17 +1,76 @@
-import netCDF4 as nc
 import numpy as np
+import multiprocessing
+import threading
+import warnings
+import json
+import time
+import zlib
 import csv
 import os
 
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
 
 # Custom modules
 from app.utils.dates import is_valid_year, get_month, get_valid_year_range
+from app.utils.metrics import metrics
+from app.constants import (
+    DATASET_POOL_MAX_FILES,
+    DATASET_POOL_MAX_BYTES,
+    DATA_POLL_INTERVAL,
+    FAST_START,
+    SDL_BACKEND,
+    SDL_DATA_FOLDER,
+    SDL_READ_WORKERS,
+)
+from .grid import get_grid_index, grid_signature
+
+# Optional codecs for the tiled store
+try:
+    import lz4.frame as lz4
+except ImportError:
+    lz4 = None
+try:
+    import zstandard as zstd
+except ImportError:
+    zstd = None
+
+# The netCDF4 module, imported on the first use in the fast-start mode
+__netcdf = None
+
+
+def get_netcdf():
+    """
+    Returns the netCDF4 module, importing it on the first call
+    """
+    global __netcdf
+
+    if __netcdf is None:
+        import netCDF4
+
+        __netcdf = netCDF4
+
+    return __netcdf
+
+
+if not FAST_START:
+    get_netcdf()
 
 """
 Constants
 """
 STATIC_FOLDER = os.path.join("app", "static")
-DATA_FOLDER = os.path.join("app", "static", "nc")
+DATA_FOLDER = SDL_DATA_FOLDER
+CUBE_FOLDER = os.path.join("app", "static", "cube")
+CUBE_NAME = "sdl"
+TILES_FOLDER = os.path.join("app", "static", "tiles")
+TILES_NAME = "sdl"
+CLIMATOLOGY_FOLDER = os.path.join("app", "static", "climatology")
+CLIMATOLOGY_NAME = "sdl"
+# The statistics of the climatology, in the order they're stored
+CLIMATOLOGY_STATS = ["mean", "std", "p10", "p50", "p90"]
 
 
 def get_solar_decline(filename: str = "delta_table.csv"):
@@ -23,13 +82,363 @@ def get_solar_decline(filename: str = "delta_table.csv"):
         return [line for line in reader]
 
 
+def parse_filename(file_name: str) -> tuple[int, int, str]:
+    """
+    Parses the (year, month, version) out of a SDLmm file name,
+    e.g. SDLmm197901010000003UDAVPOS01UD.nc -> (1979, 1, "POS01")
+    """
+    name = os.path.basename(file_name)
+    if not (name.startswith("SDLmm") and name.endswith(".nc")):
+        raise ValueError(f"unexpected SDL file name: '{name}'")
+
+    return int(name[5:9]), int(name[9:11]), name[-10:-5]
+
+
+# netCDF4 and HDF5 aren't thread-safe, even across different files,
+# so all the calls into them from the app go through this lock. The reads
+# of a process run one at a time, the parallel ones need the read workers
+# or the cube and tiles backends
+netcdf_lock = threading.RLock()
+
+
+class PooledDataset:
+    """
+    An open NetCDF dataset along with its decoded coordinate arrays.
+    The calls into the dataset have to hold `netcdf_lock`
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.dataset = get_netcdf().Dataset(path, "r")
+
+        # Decode the coordinates once, they never change for an open file
+        self.latitudes = self.dataset.variables["lat"][:]
+        self.longitudes = self.dataset.variables["lon"][:]
+        self.time = self.dataset.variables["time"][:]
+        # The files on the same grid share one index
+        self.grid = get_grid_index(self.latitudes, self.longitudes)
+
+        # The number of callers currently reading from the dataset
+        self.users = 0
+        self.evicted = False
+
+        # Approximate memory held: the coordinates and one decoded SDL chunk
+        sdl = self.dataset.variables["SDL"]
+        chunking = sdl.chunking()
+        chunk_shape = sdl.shape if chunking == "contiguous" else chunking
+        self.nbytes = (
+            self.latitudes.nbytes
+            + self.longitudes.nbytes
+            + self.time.nbytes
+            + int(np.prod(chunk_shape)) * sdl.dtype.itemsize
+        )
+
+    def close(self):
+        with netcdf_lock:
+            self.dataset.close()
+
+
+class DatasetPool:
+    """
+    Keeps NetCDF datasets open across requests, evicting the least
+    recently used ones when over the file count or memory budget
+    """
+
+    def __init__(
+        self,
+        max_files: int = DATASET_POOL_MAX_FILES,
+        max_bytes: int = DATASET_POOL_MAX_BYTES,
+    ):
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+
+        self.__entries: OrderedDict[str, PooledDataset] = OrderedDict()
+        self.__nbytes = 0
+        self.__lock = threading.Lock()
+
+    @contextmanager
+    def open(self, path: str):
+        """
+        Yields the pooled dataset for the path, opening it if needed.
+        The dataset stays open until the block exits
+        """
+        entry = self.__checkout(path)
+        try:
+            yield entry
+        finally:
+            self.__release(entry)
+
+    def discard(self, path: str):
+        """
+        Drops the dataset for the path, e.g. when the file on disk changed
+        """
+        closing = []
+        with self.__lock:
+            entry = self.__entries.pop(path, None)
+            if entry is not None:
+                self.__evict(entry, closing)
+
+        close_all(closing)
+
+    def clear(self):
+        """
+        Drops all the pooled datasets
+        """
+        closing = []
+        with self.__lock:
+            while self.__entries:
+                _, entry = self.__entries.popitem(last=False)
+                self.__evict(entry, closing)
+
+        close_all(closing)
+
+    @property
+    def stats(self):
+        with self.__lock:
+            return {"files": len(self.__entries), "bytes": self.__nbytes}
+
+    def __checkout(self, path: str) -> PooledDataset:
+        with self.__lock:
+            entry = self.__entries.get(path)
+            if entry is not None:
+                self.__entries.move_to_end(path)
+                entry.users += 1
+                metrics.count("dataset_pool_hits")
+                return entry
+
+        metrics.count("dataset_pool_misses")
+        # Open outside the pool's lock so the others can check out meanwhile
+        with metrics.span("netcdf.open"), netcdf_lock:
+            opened = PooledDataset(path)
+        metrics.count("netcdf_opens")
+
+        closing = []
+        with self.__lock:
+            entry = self.__entries.get(path)
+            if entry is not None:
+                # Another thread beat us to it, keep theirs
+                closing.append(opened)
+            else:
+                entry = opened
+                self.__entries[path] = entry
+                self.__nbytes += entry.nbytes
+                self.__shrink(closing)
+
+            self.__entries.move_to_end(path)
+            entry.users += 1
+
+        close_all(closing)
+        return entry
+
+    def __release(self, entry: PooledDataset):
+        with self.__lock:
+            entry.users -= 1
+            closing = entry.evicted and entry.users == 0
+
+        if closing:
+            entry.close()
+
+    def __shrink(self, closing: list):
+        """
+        Evicts the least recently used datasets until within limits,
+        always keeping the most recent one
+        """
+        while len(self.__entries) > 1 and (
+            len(self.__entries) > self.max_files or self.__nbytes > self.max_bytes
+        ):
+            _, entry = self.__entries.popitem(last=False)
+            self.__evict(entry, closing)
+
+    def __evict(self, entry: PooledDataset, closing: list):
+        """
+        Takes the dataset out of the budget, adding it to the ones to close
+        once the pool's lock is released, as closing waits on `netcdf_lock`
+        """
+        self.__nbytes -= entry.nbytes
+        entry.evicted = True
+        # Datasets still being read are closed by the last reader
+        if entry.users == 0:
+            closing.append(entry)
+
+
+def close_all(entries: list[PooledDataset]):
+    """
+    Closes the datasets evicted from the pool
+    """
+    for entry in entries:
+        entry.close()
+
+
+# The shared pool for all the requests
+dataset_pool = DatasetPool()
+metrics.collect("dataset_pool", lambda: dataset_pool.stats)
+
+
+# The grid of each file looked up so far
+__file_grids = {}
+
+
+def get_file_grid(file: str):
+    """
+    Returns the grid index of the file, opening it on the first lookup
+    """
+    grid = __file_grids.get(file)
+    if grid is None:
+        with dataset_pool.open(file) as entry:
+            grid = __file_grids[file] = entry.grid
+
+    return grid
+
+
+def snap_to_grid(files: list[str], lat: float, lon: float) -> tuple:
+    """
+    Returns the (lat_idx, lon_idx) of the cell for the point on each of the
+    distinct grids of the files, the points within the same cells share it
+    """
+    cells = []
+    for file in files:
+        cell = get_file_grid(file).lookup(lat, lon)
+        if cell not in cells:
+            cells.append(cell)
+
+    return tuple(cells)
+
+
+def forget_file(file: str):
+    """
+    Drops everything held for the file, when it changed on disk
+    """
+    dataset_pool.discard(file)
+    __file_grids.pop(file, None)
+
+
+class NetCDFIndex:
+    """
+    Index of the SDL files in the data folder by year, kept up-to-date by
+    polling the folder's mtime and rescanning only when it changed
+    """
+
+    def __init__(
+        self, data_folder: str = DATA_FOLDER, poll_interval: float = DATA_POLL_INTERVAL
+    ):
+        self.data_folder = data_folder
+        self.poll_interval = poll_interval
+        self.version = None
+
+        # The (mtime, (year, month, version)) for each of the file names
+        self.__files: dict[str, tuple[int, tuple[int, int, str]]] = {}
+        # The paths of the files of each year, in the order of the months
+        self.__years: dict[int, list[str]] = {}
+        self.__checked = 0.0
+        self.__lock = threading.Lock()
+
+    def years(self) -> list[int]:
+        """
+        Returns the years with any files, in order
+        """
+        self.refresh()
+        return sorted(self.__years)
+
+    def files(self, year: int) -> list[str]:
+        """
+        Returns the paths of the year's files, in the order of the months
+        """
+        self.refresh()
+        return list(self.__years.get(year, []))
+
+    def refresh(self, force: bool = False):
+        """
+        Rescans the folder if it changed since the last scan,
+        checking at most once every poll interval
+        """
+        if not force and self.__is_fresh():
+            return
+
+        # Until the first scan is done, the readers wait for it on the lock
+        with self.__lock:
+            # Another caller may have scanned while this one waited
+            if not force and self.__is_fresh():
+                return
+
+            version = os.stat(self.data_folder).st_mtime_ns
+            if force or version != self.version:
+                self.__scan()
+                self.version = version
+            # Only marked as checked once the scan is done
+            self.__checked = time.monotonic()
+
+    def __is_fresh(self) -> bool:
+        return (
+            self.version is not None
+            and time.monotonic() - self.__checked < self.poll_interval
+        )
+
+    def __scan(self):
+        with metrics.span("netcdf.list"):
+            self.__scan_folder()
+        metrics.count("netcdf_scans")
+
+    def __scan_folder(self):
+        files = {}
+        for entry in os.scandir(self.data_folder):
+            try:
+                period = parse_filename(entry.name)
+            except ValueError:
+                continue
+
+            mtime = entry.stat().st_mtime_ns
+            known = self.__files.get(entry.name)
+            # Only the new or replaced files need parsing
+            files[entry.name] = (mtime, period) if known is None else known
+            if known is not None and known[0] != mtime:
+                files[entry.name] = (mtime, period)
+                forget_file(os.path.join(self.data_folder, entry.name))
+
+        for name in self.__files.keys() - files.keys():
+            forget_file(os.path.join(self.data_folder, name))
+
+        # Keep one file for each month, preferring the TCDR release ("POS01")
+        # over the interim ones when both exist
+        months: dict[tuple[int, int], tuple[str, str]] = {}
+        for name, (_, (year, month, version)) in sorted(files.items()):
+            if (year, month) not in months or version < months[(year, month)][0]:
+                months[(year, month)] = (version, name)
+
+        years: dict[int, list[str]] = {}
+        for (year, _), (_, name) in sorted(months.items()):
+            years.setdefault(year, []).append(os.path.join(self.data_folder, name))
+
+        self.__files = files
+        self.__years = years
+
+
+# The shared index of the data folder
+netcdf_index = NetCDFIndex()
+
+
+def get_data_version(data_folder: str = DATA_FOLDER) -> int:
+    """
+    Returns a token that changes whenever files are added to, removed from
+    or replaced in the data folder
+    """
+    if data_folder == netcdf_index.data_folder:
+        netcdf_index.refresh()
+        return netcdf_index.version
+
+    return os.stat(data_folder).st_mtime_ns
+
+
 class NetCDFRetriever:
     """
     NetCDF file reading utility
     """
 
     def __init__(self, data_folder: str = DATA_FOLDER):
-        self.filelist = os.listdir(data_folder)
+        self.index = (
+            netcdf_index
+            if data_folder == netcdf_index.data_folder
+            else NetCDFIndex(data_folder)
+        )
 
     def retrieve(self, year: int):
         """
@@ -39,7 +448,8 @@ class NetCDFRetriever:
             raise ValueError(f"unexpected input for year: '{year}'")
 
         # Else get the files required for the data handling
-        return self.__resolve_files(year)
+        with metrics.span("netcdf.retrieve"):
+            return self.__resolve_files(year)
 
     def retrieve_all(self, from_: int, to_: int):
         """
@@ -55,19 +465,30 @@ class NetCDFRetriever:
 
     def __resolve_files(self, year: int):
         """
-        Finds all the matching files for the given time period
+        Finds all the matching files for the given time period, in month order
         """
-        files = filter(
-            lambda name: name.startswith("SDLmm" + str(year)) and name.endswith(".nc"),
-            self.filelist,
-        )
-        return self.__resolve_filepaths(files)
+        return self.index.files(year)
 
-    def __resolve_filepaths(self, file_names: list[str]):
-        return list(
-            # Resolve the file path name for better access
-            map(lambda file_name: os.path.join(DATA_FOLDER, file_name), file_names)
-        )
+
+def read_grid_region(grid, lats, lons, read) -> np.ndarray:
+    """
+    Reads the values of the cells centred on the lats and lons from a grid,
+    with `read(lat_slice, lon_slice)` returning the slice of the grid that
+    covers them. The cells that aren't on the grid are NaN
+    """
+    lat_idx, lon_idx = grid.lat.lookup(lats), grid.lon.lookup(lons)
+    lat_start, lon_start = lat_idx.min(), lon_idx.min()
+
+    values = read(
+        slice(lat_start, lat_idx.max() + 1), slice(lon_start, lon_idx.max() + 1)
+    )
+    values = np.ma.filled(np.ma.asarray(values).astype(np.float64), np.nan)
+    values = values[..., lat_idx[:, None] - lat_start, lon_idx[None, :] - lon_start]
+
+    # The nearest cells of the grid, that aren't the cells asked for
+    values[..., ~np.isclose(grid.lat.values[lat_idx], lats), :] = np.nan
+    values[..., ~np.isclose(grid.lon.values[lon_idx], lons)] = np.nan
+    return values
 
 
 class NetCDFExtractor:
@@ -89,52 +510,91 @@ class NetCDFExtractor:
         sdl_data = []
 
         for i, file in enumerate(files):
-            # Load the NetCDF4 file
-            dataset = nc.Dataset(file, "r")
-
-            # Print the dataset information
-            # print(dataset)
-
-            # Get the latitude and longitude variables
-            latitudes = dataset.variables["lat"][:]
-            longitudes = dataset.variables["lon"][:]
-
-            # Find the index of the nearest point to your coordinates
-            target_lat = lat
-            target_lon = lon
-
-            lat_idx = np.abs(latitudes - target_lat).argmin()
-            lon_idx = np.abs(longitudes - target_lon).argmin()
-
-            # Extract the time variable (optional: depending on what you want to analyze)
-            time = dataset.variables["time"][:]
-
-            # Extract the radiation data (SID - Surface Incoming Direct Radiation)
-            # You might need to adjust the variable name depending on the dataset
             sdl_data.append(
                 {
                     "order": i,
                     "month": get_month(i + 1),
-                    "sdlr": float(dataset.variables["SDL"][..., lat_idx, lon_idx][0]),
+                    "sdlr": NetCDFExtractor.read_cell(file, lat, lon),
                 }
             )
 
-            # Close the dataset
-            dataset.close()
-
         # Filter the N/A with mean if so
 
         return sdl_data
 
+    @staticmethod
+    def read_cell(file: str, lat: float, lon: float) -> float:
+        """
+        Returns the SDLR of the file's cell nearest to the point
+        """
+        # Borrow the NetCDF4 file from the pool, it stays open afterwards
+        with dataset_pool.open(file) as entry:
+            # Find the index of the nearest point to your coordinates
+            with metrics.span("grid.lookup"):
+                lat_idx, lon_idx = entry.grid.lookup(lat, lon)
+
+            # Extract the radiation data, reading only the cell we need
+            with metrics.span("netcdf.read"), netcdf_lock:
+                sdl = entry.dataset.variables["SDL"]
+                value = float(sdl[..., lat_idx, lon_idx][0])
+
+        metrics.count("netcdf_bytes_read", sdl.dtype.itemsize)
+        return value
+
+    @staticmethod
+    def read_region(file: str, lats, lons) -> np.ndarray:
+        """
+        Returns the SDLR of the file for the grid of cells centred on the
+        lats and lons, reading only the slice that covers them. The cells
+        off the file's grid are NaN
+        """
+        lats, lons = np.asarray(lats), np.asarray(lons)
+
+        def read(lat_slice, lon_slice):
+            with metrics.span("netcdf.read"), netcdf_lock:
+                values = entry.dataset.variables["SDL"][0, lat_slice, lon_slice]
+            metrics.count("netcdf_bytes_read", values.nbytes)
+            return values
+
+        with dataset_pool.open(file) as entry:
+            return read_grid_region(entry.grid, lats, lons, read)
+
     @staticmethod
     def get_sdlr_as_np(files: list[str], lat: float, lon: float):
         """
         Converts the result to a np array
         """
-        sdlr_series = [
-            entry["sdlr"] for entry in NetCDFExtractor.get_sdlr(files, lat, lon)
-        ]
-        return np.array(sdlr_series)
+        return np.array(
+            [NetCDFExtractor.read_cell(file, lat, lon) for file in files],
+            dtype=np.float64,
+        )
+
+    @staticmethod
+    def get_sdlr_many(files: list[str], lats, lons) -> np.ndarray:
+        """
+        Returns the SDLR for many points at once as a (file, point) array,
+        reading only the slice of each file's grid that covers them
+        """
+        lats, lons = np.asarray(lats).reshape(-1), np.asarray(lons).reshape(-1)
+        sdl_data = np.empty((len(files), len(lats)), dtype=np.float64)
+        if len(lats) == 0:
+            return sdl_data
+
+        for i, file in enumerate(files):
+            with dataset_pool.open(file) as entry:
+                with metrics.span("grid.lookup"):
+                    lat_idx, lon_idx = entry.grid.lookup(lats, lons)
+                lat_start, lon_start = lat_idx.min(), lon_idx.min()
+                with metrics.span("netcdf.read"), netcdf_lock:
+                    sdl = entry.dataset.variables["SDL"][
+                        0, lat_start : lat_idx.max() + 1, lon_start : lon_idx.max() + 1
+                    ]
+            metrics.count("netcdf_bytes_read", sdl.nbytes)
+
+            sdl = np.ma.filled(sdl.astype(np.float64), np.nan)
+            sdl_data[i] = sdl[lat_idx - lat_start, lon_idx - lon_start]
+
+        return sdl_data
 
     @staticmethod
     def __fillNA(sdl_data: list[dict[str, str]]) -> list[dict[str, str]]:
@@ -154,6 +614,795 @@ class NetCDFExtractor:
         threshold = 3
 
 
+class SDLArchive:
+    """
+    The monthly SDL grids of the data folder, placed on the union of the
+    grids of all the files, as the archive switches to a smaller grid for
+    the recent (ICDR) files
+    """
+
+    def __init__(self, data_folder: str = DATA_FOLDER):
+        index = NetCDFIndex(data_folder)
+        index.refresh(force=True)
+
+        self.files = [file for year in index.years() for file in index.files(year)]
+        if len(self.files) == 0:
+            raise ValueError(f"no SDL files found in: '{data_folder}'")
+
+        self.periods = [parse_filename(file)[:2] for file in self.files]
+        self.first_year = self.periods[0][0]
+        self.last_year = self.periods[-1][0]
+
+        self.__grids = []
+        for file in self.files:
+            with netcdf_lock, get_netcdf().Dataset(file, "r") as dataset:
+                self.__grids.append(
+                    (
+                        np.ma.getdata(dataset.variables["lat"][:]),
+                        np.ma.getdata(dataset.variables["lon"][:]),
+                    )
+                )
+
+        # The distinct grids of the files, and the one of each file
+        self.grids, self.file_grids = [], []
+        for file_lat, file_lon in self.__grids:
+            signature = grid_signature(file_lat, file_lon)
+            for i, (lat, lon) in enumerate(self.grids):
+                if grid_signature(lat, lon) == signature:
+                    break
+            else:
+                i = len(self.grids)
+                self.grids.append((file_lat, file_lon))
+            self.file_grids.append(i)
+        self.latitudes = np.unique(
+            np.concatenate([lat for lat, _ in self.__grids]).round(6)
+        )
+        self.longitudes = np.unique(
+            np.concatenate([lon for _, lon in self.__grids]).round(6)
+        )
+        self.grid = get_grid_index(self.latitudes, self.longitudes)
+
+    @property
+    def shape(self):
+        return len(self.latitudes), len(self.longitudes)
+
+    def get_grids_header(self) -> dict:
+        """
+        Returns the distinct grids of the files and the (year, month) grid
+        of each of them, -1 for the missing months, for the stores' headers
+        """
+        grid = np.full((self.last_year - self.first_year + 1, 12), -1)
+        for (year, month), i in zip(self.periods, self.file_grids):
+            grid[year - self.first_year, month - 1] = i
+
+        return {
+            "grids": [
+                {"lat": lat.tolist(), "lon": lon.tolist()} for lat, lon in self.grids
+            ],
+            "grid": grid.tolist(),
+        }
+
+    def __iter__(self):
+        """
+        Yields the (year, month, SDL) of each of the files in order, the SDL
+        on the union grid with NaN outside of the file's grid
+        """
+        for file, (year, month), (file_lat, file_lon) in zip(
+            self.files, self.periods, self.__grids
+        ):
+            # Place the file's grid within the union one
+            lat_idx, lon_idx = self.grid.lookup(file_lat, file_lon)
+            if not (
+                np.allclose(self.latitudes[lat_idx], file_lat)
+                and np.allclose(self.longitudes[lon_idx], file_lon)
+            ):
+                raise ValueError(f"file is not on the grid of the archive: '{file}'")
+
+            with netcdf_lock, get_netcdf().Dataset(file, "r") as dataset:
+                sdl = dataset.variables["SDL"][0]
+
+            values = np.full(self.shape, np.nan, dtype=np.float32)
+            values[np.ix_(lat_idx, lon_idx)] = np.ma.filled(
+                sdl.astype(np.float32), np.nan
+            )
+            yield year, month, values
+
+
+def save_header(path: str, header: dict):
+    """
+    Writes the JSON header of a store, replacing the old one at once
+    """
+    with open(path + ".tmp", mode="w") as wFile:
+        json.dump(header, wFile)
+
+    os.replace(path + ".tmp", path)
+
+
+def build_sdl_cube(
+    folder: str = CUBE_FOLDER, name: str = CUBE_NAME, data_folder: str = DATA_FOLDER
+) -> str:
+    """
+    Packs all the monthly SDL grids into one array file shaped
+    (year, month, lat, lon), with a JSON header alongside it.
+    The months missing from the archive are left as NaN
+
+    Returns the path of the array file
+    """
+    archive = SDLArchive(data_folder)
+
+    os.makedirs(folder, exist_ok=True)
+    cube_path = os.path.join(folder, name + ".npy")
+    temp_path = os.path.join(folder, name + ".tmp.npy")
+
+    shape = (archive.last_year - archive.first_year + 1, 12, *archive.shape)
+    cube = np.lib.format.open_memmap(temp_path, mode="w+", dtype="<f4", shape=shape)
+    cube[:] = np.nan
+    present = np.zeros(shape[:2], dtype=bool)
+
+    for year, month, sdl in archive:
+        cube[year - archive.first_year, month - 1] = sdl
+        present[year - archive.first_year, month - 1] = True
+
+    cube.flush()
+    del cube
+
+    # Swap in the new cube only once it's complete
+    os.replace(temp_path, cube_path)
+    save_header(
+        os.path.join(folder, name + ".json"),
+        {
+            "variable": "SDL",
+            "dtype": "<f4",
+            "shape": list(shape),
+            "years": [archive.first_year, archive.last_year],
+            "lat": archive.latitudes.tolist(),
+            "lon": archive.longitudes.tolist(),
+            "present": present.tolist(),
+            **archive.get_grids_header(),
+        },
+    )
+
+    return cube_path
+
+
+def build_sdl_climatology(
+    folder: str = CLIMATOLOGY_FOLDER,
+    name: str = CLIMATOLOGY_NAME,
+    data_folder: str = DATA_FOLDER,
+) -> str:
+    """
+    Reads through the archive once and computes the climatology of each
+    cell for each month of the year over all the years: the mean, the
+    standard deviation, and the 10th, 50th and 90th percentiles. Stored as
+    an array shaped (stat, month, lat, lon), with a JSON header alongside
+
+    Returns the path of the array file
+    """
+    archive = SDLArchive(data_folder)
+    years = archive.last_year - archive.first_year + 1
+
+    # The values of each month of the year, stacked over the years
+    months = np.full((12, years, *archive.shape), np.nan, dtype=np.float32)
+    for year, month, sdl in archive:
+        months[month - 1, year - archive.first_year] = sdl
+
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, name + ".npy")
+    temp_path = os.path.join(folder, name + ".tmp.npy")
+
+    shape = (len(CLIMATOLOGY_STATS), 12, *archive.shape)
+    climatology = np.lib.format.open_memmap(
+        temp_path, mode="w+", dtype="<f4", shape=shape
+    )
+    with warnings.catch_warnings():
+        # The cells outside of every file's grid are all NaN
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        climatology[0] = np.nanmean(months, axis=1)
+        climatology[1] = np.nanstd(months, axis=1)
+        climatology[2:] = np.nanpercentile(months, [10, 50, 90], axis=1)
+
+    climatology.flush()
+    del climatology
+
+    # Swap in the new climatology only once it's complete
+    os.replace(temp_path, path)
+    save_header(
+        os.path.join(folder, name + ".json"),
+        {
+            "variable": "SDL",
+            "dtype": "<f4",
+            "shape": list(shape),
+            "stats": CLIMATOLOGY_STATS,
+            "years": [archive.first_year, archive.last_year],
+            "lat": archive.latitudes.tolist(),
+            "lon": archive.longitudes.tolist(),
+        },
+    )
+
+    return path
+
+
+class ClimatologyUnavailable(Exception):
+    """
+    Raised when the climatology is asked for before it's built
+    """
+
+
+class SDLClimatology:
+    """
+    Reads the per-cell monthly climatology built by `build_sdl_climatology`
+    """
+
+    def __init__(self, folder: str = CLIMATOLOGY_FOLDER, name: str = CLIMATOLOGY_NAME):
+        # Tells the builds apart, for the results computed from them
+        self.mtime = os.path.getmtime(self.header_path(folder, name))
+        with open(os.path.join(folder, name + ".json"), mode="r") as rFile:
+            header = json.load(rFile)
+
+        self.climatology = np.load(os.path.join(folder, name + ".npy"), mmap_mode="r")
+        self.stats = header["stats"]
+        self.first_year, self.last_year = header["years"]
+        self.grid = get_grid_index(header["lat"], header["lon"])
+
+    @staticmethod
+    def header_path(
+        folder: str = CLIMATOLOGY_FOLDER, name: str = CLIMATOLOGY_NAME
+    ) -> str:
+        return os.path.join(folder, name + ".json")
+
+    @staticmethod
+    def exists(folder: str = CLIMATOLOGY_FOLDER, name: str = CLIMATOLOGY_NAME) -> bool:
+        return os.path.exists(os.path.join(folder, name + ".json")) and os.path.exists(
+            os.path.join(folder, name + ".npy")
+        )
+
+    def get(self, lat: float, lon: float, stat: str = "mean") -> np.ndarray:
+        """
+        Returns the 12 monthly values of the statistic for the point
+        """
+        if stat not in self.stats:
+            raise ValueError(f"unexpected climatology statistic: '{stat}'")
+
+        lat_idx, lon_idx = self.grid.lookup(lat, lon)
+        return self.climatology[self.stats.index(stat), :, lat_idx, lon_idx]
+
+    def get_region(self, lats, lons, stat: str = "mean") -> np.ndarray:
+        """
+        Returns the statistic for the grid of cells centred on the lats and
+        lons, as a (month, lat, lon) array
+        """
+        if stat not in self.stats:
+            raise ValueError(f"unexpected climatology statistic: '{stat}'")
+
+        raster = self.climatology[self.stats.index(stat)]
+        return read_grid_region(
+            self.grid,
+            np.asarray(lats),
+            np.asarray(lons),
+            lambda lat_slice, lon_slice: raster[:, lat_slice, lon_slice],
+        )
+
+
+# The loaded climatology, reloaded when rebuilt
+__climatology = None
+
+
+def get_climatology() -> SDLClimatology:
+    """
+    Returns the climatology, which has to be built beforehand
+
+    Raises:
+    - ClimatologyUnavailable: If the climatology hasn't been built.
+    """
+    global __climatology
+
+    if not SDLClimatology.exists():
+        raise ClimatologyUnavailable("the SDL climatology hasn't been built")
+
+    mtime = os.path.getmtime(SDLClimatology.header_path())
+    if __climatology is None or __climatology.mtime != mtime:
+        __climatology = SDLClimatology()
+
+    return __climatology
+
+
+class StoreGrids:
+    """
+    The grids of the files packed into a store on the union grid. The points
+    are looked up on the grid of each month's file, so those off a smaller
+    grid get its nearest edge cell like the NetCDF reads instead of NaN
+    """
+
+    def __init__(self, header: dict):
+        self.grid = get_grid_index(header["lat"], header["lon"])
+
+        # The stores built before the grids were kept have the union only
+        grids = header.get("grids") or [{"lat": header["lat"], "lon": header["lon"]}]
+        self.__grids = [
+            (
+                get_grid_index(grid["lat"], grid["lon"]),
+                self.grid.lat.lookup(np.asarray(grid["lat"])),
+                self.grid.lon.lookup(np.asarray(grid["lon"])),
+            )
+            for grid in grids
+        ]
+        # The grid of each month, flat over the years
+        shape = np.shape(header["present"])
+        self.time_grids = np.maximum(
+            np.asarray(header.get("grid", np.zeros(shape)), dtype=np.intp), 0
+        ).reshape(-1)
+
+    def lookup(self, lats, lons) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the (lat_idx, lon_idx) on the union grid of the cells nearest
+        to the points on the grid of each month, as (time, point) arrays
+        """
+        lats = np.asarray(lats, dtype=np.float64).reshape(-1)
+        lons = np.asarray(lons, dtype=np.float64).reshape(-1)
+
+        lat_idx = np.stack(
+            [lat_map[grid.lat.lookup(lats)] for grid, lat_map, _ in self.__grids]
+        )
+        lon_idx = np.stack(
+            [lon_map[grid.lon.lookup(lons)] for grid, _, lon_map in self.__grids]
+        )
+        return lat_idx[self.time_grids], lon_idx[self.time_grids]
+
+
+class SDLCubeExtractor:
+    """
+    Extracts the SDLR from the consolidated cube built by `build_sdl_cube`,
+    reading the point series as views over the memory-mapped file
+    """
+
+    def __init__(self, folder: str = CUBE_FOLDER, name: str = CUBE_NAME):
+        with open(os.path.join(folder, name + ".json"), mode="r") as rFile:
+            header = json.load(rFile)
+
+        self.cube = np.load(os.path.join(folder, name + ".npy"), mmap_mode="r")
+        self.first_year, self.last_year = header["years"]
+        self.present = np.array(header["present"], dtype=bool)
+        self.grids = StoreGrids(header)
+        self.grid = self.grids.grid
+
+        # The months of all the years along a single time axis
+        self.__series = self.cube.reshape(-1, *self.cube.shape[2:])
+
+    @staticmethod
+    def header_path(folder: str = CUBE_FOLDER, name: str = CUBE_NAME) -> str:
+        return os.path.join(folder, name + ".json")
+
+    @staticmethod
+    def exists(folder: str = CUBE_FOLDER, name: str = CUBE_NAME) -> bool:
+        return os.path.exists(os.path.join(folder, name + ".json")) and os.path.exists(
+            os.path.join(folder, name + ".npy")
+        )
+
+    def get_series(self, lat: float, lon: float, from_: int = None, to_: int = None):
+        """
+        Returns the (year, month) SDLR for the point as a view over the cube,
+        a single strided read covering all the years asked for. It's copied
+        from the cells of each grid when the point is off one of them
+        """
+        from_ = self.first_year if from_ is None else from_
+        to_ = self.last_year if to_ is None else to_
+        if from_ < self.first_year or to_ > self.last_year or from_ > to_:
+            raise ValueError(
+                f"years {from_}-{to_} are outside of the cube: "
+                f"{self.first_year}-{self.last_year}"
+            )
+
+        start = (from_ - self.first_year) * 12
+        times = np.arange(start, start + (to_ - from_ + 1) * 12)
+        lat_idx, lon_idx = self.grids.lookup(lat, lon)
+        lat_idx, lon_idx = lat_idx[times, 0], lon_idx[times, 0]
+        if np.all(lat_idx == lat_idx[0]) and np.all(lon_idx == lon_idx[0]):
+            return self.cube[
+                from_ - self.first_year : to_ - self.first_year + 1,
+                :,
+                lat_idx[0],
+                lon_idx[0],
+            ]
+
+        return self.__series[times, lat_idx, lon_idx].reshape(-1, 12)
+
+    def get_sdlr(self, files: list[str], lat: float, lon: float, fill_na: bool = False):
+        """
+        Same as `NetCDFExtractor.get_sdlr`, the months are taken from the
+        names of the files instead of reading them
+        """
+        return [
+            {"order": i, "month": get_month(i + 1), "sdlr": float(sdlr)}
+            for i, sdlr in enumerate(self.get_sdlr_as_np(files, lat, lon))
+        ]
+
+    def get_sdlr_as_np(self, files: list[str], lat: float, lon: float):
+        """
+        Converts the result to a np array
+        """
+        return self.get_sdlr_many(files, [lat], [lon])[:, 0]
+
+    def get_sdlr_many(self, files: list[str], lats, lons) -> np.ndarray:
+        """
+        Returns the SDLR for many points at once as a (file, point) array
+        """
+        times = self.__times(files)
+        lat_idx, lon_idx = self.grids.lookup(lats, lons)
+
+        return self.__series[times[:, None], lat_idx[times], lon_idx[times]].astype(
+            np.float64
+        )
+
+    def __times(self, files: list[str]) -> np.ndarray:
+        """
+        Returns the positions of the files along the time axis of the cube
+        """
+        times = []
+        for file in files:
+            year, month, _ = parse_filename(file)
+            if not (
+                self.first_year <= year <= self.last_year
+                and self.present[year - self.first_year, month - 1]
+            ):
+                raise ValueError(f"file is missing from the cube: '{file}'")
+            times.append((year - self.first_year) * 12 + month - 1)
+
+        return np.array(times, dtype=np.intp)
+
+
+def compress_block(data: bytes, codec: str) -> bytes:
+    """
+    Compresses a block of the tiled store with the codec
+    """
+    if codec == "none":
+        return data
+    if codec == "zlib":
+        return zlib.compress(data, 1)
+    if codec == "lz4" and lz4 is not None:
+        return lz4.compress(data)
+    if codec == "zstd" and zstd is not None:
+        return zstd.ZstdCompressor(level=3).compress(data)
+
+    raise ValueError(f"unsupported or unavailable codec: '{codec}'")
+
+
+def decompress_block(data: bytes, codec: str) -> bytes:
+    """
+    Reverses `compress_block`
+    """
+    if codec == "none":
+        return data
+    if codec == "zlib":
+        return zlib.decompress(data)
+    if codec == "lz4" and lz4 is not None:
+        return lz4.decompress(data)
+    if codec == "zstd" and zstd is not None:
+        return zstd.ZstdDecompressor().decompress(data)
+
+    raise ValueError(f"unsupported or unavailable codec: '{codec}'")
+
+
+def build_sdl_tiles(
+    folder: str = TILES_FOLDER,
+    name: str = TILES_NAME,
+    tile_size: int = 16,
+    codec: str = "none",
+    cube_folder: str = CUBE_FOLDER,
+) -> str:
+    """
+    Re-chunks the SDL cube into square tiles of grid cells, where each
+    block holds the tile as (lat, lon, time) so the whole monthly history
+    of a cell is contiguous. The blocks can be compressed with a codec:
+    "none", "zlib", or "lz4" and "zstd" when installed
+
+    Returns the path of the blocks file
+    """
+    if not SDLCubeExtractor.exists(cube_folder):
+        raise ValueError(f"the SDL cube needs to be built first in: '{cube_folder}'")
+
+    with open(SDLCubeExtractor.header_path(cube_folder), mode="r") as rFile:
+        header = json.load(rFile)
+    cube = np.load(os.path.join(cube_folder, CUBE_NAME + ".npy"), mmap_mode="r")
+
+    years, months, n_lat, n_lon = cube.shape
+    # Flatten the years and months into a single time axis
+    series = cube.reshape(years * months, n_lat, n_lon)
+
+    os.makedirs(folder, exist_ok=True)
+    blocks_path = os.path.join(folder, name + ".bin")
+    temp_path = blocks_path + ".tmp"
+
+    offsets, lengths = [], []
+    with open(temp_path, mode="wb") as wFile:
+        for lat_start in range(0, n_lat, tile_size):
+            for lon_start in range(0, n_lon, tile_size):
+                lat_end, lon_end = lat_start + tile_size, lon_start + tile_size
+                tile = series[:, lat_start:lat_end, lon_start:lon_end]
+                block = np.ascontiguousarray(tile.transpose(1, 2, 0), dtype="<f4")
+                data = compress_block(block.tobytes(), codec)
+
+                offsets.append(wFile.tell())
+                lengths.append(len(data))
+                wFile.write(data)
+
+    header.update(
+        {
+            "tile_size": tile_size,
+            "codec": codec,
+            "offsets": offsets,
+            "lengths": lengths,
+        }
+    )
+    # Swap in the new store only once it's complete
+    os.replace(temp_path, blocks_path)
+    save_header(os.path.join(folder, name + ".json"), header)
+
+    return blocks_path
+
+
+class SDLTileExtractor:
+    """
+    Extracts the SDLR from the tiled store built by `build_sdl_tiles`,
+    a point's whole history is a single block read
+    """
+
+    def __init__(
+        self, folder: str = TILES_FOLDER, name: str = TILES_NAME, cache_blocks: int = 64
+    ):
+        with open(os.path.join(folder, name + ".json"), mode="r") as rFile:
+            header = json.load(rFile)
+
+        self.first_year, self.last_year = header["years"]
+        self.present = np.array(header["present"], dtype=bool)
+        self.grids = StoreGrids(header)
+        self.grid = self.grids.grid
+        self.tile_size = header["tile_size"]
+        self.codec = header["codec"]
+        self.offsets = header["offsets"]
+        self.lengths = header["lengths"]
+
+        self.n_times = self.present.size
+        self.__tiles_across = -(-self.grid.lon.size // self.tile_size)
+        self.__blocks = np.memmap(os.path.join(folder, name + ".bin"), mode="r")
+
+        # The recently decompressed blocks
+        self.cache_blocks = cache_blocks
+        self.__cache: OrderedDict[int, np.ndarray] = OrderedDict()
+        self.__lock = threading.Lock()
+
+    @staticmethod
+    def header_path(folder: str = TILES_FOLDER, name: str = TILES_NAME) -> str:
+        return os.path.join(folder, name + ".json")
+
+    @staticmethod
+    def exists(folder: str = TILES_FOLDER, name: str = TILES_NAME) -> bool:
+        return os.path.exists(os.path.join(folder, name + ".json")) and os.path.exists(
+            os.path.join(folder, name + ".bin")
+        )
+
+    def get_series(self, lat: float, lon: float, from_: int = None, to_: int = None):
+        """
+        Returns the (year, month) SDLR for the point
+        """
+        from_ = self.first_year if from_ is None else from_
+        to_ = self.last_year if to_ is None else to_
+        if from_ < self.first_year or to_ > self.last_year or from_ > to_:
+            raise ValueError(
+                f"years {from_}-{to_} are outside of the store: "
+                f"{self.first_year}-{self.last_year}"
+            )
+
+        start = (from_ - self.first_year) * 12
+        times = np.arange(start, start + (to_ - from_ + 1) * 12)
+        lat_idx, lon_idx = self.grids.lookup(lat, lon)
+        return self.__read_point(lat_idx[:, 0], lon_idx[:, 0], times).reshape(-1, 12)
+
+    def get_sdlr(self, files: list[str], lat: float, lon: float, fill_na: bool = False):
+        """
+        Same as `NetCDFExtractor.get_sdlr`, the months are taken from the
+        names of the files instead of reading them
+        """
+        return [
+            {"order": i, "month": get_month(i + 1), "sdlr": float(sdlr)}
+            for i, sdlr in enumerate(self.get_sdlr_as_np(files, lat, lon))
+        ]
+
+    def get_sdlr_as_np(self, files: list[str], lat: float, lon: float):
+        """
+        Converts the result to a np array
+        """
+        return self.get_sdlr_many(files, [lat], [lon])[:, 0]
+
+    def get_sdlr_many(self, files: list[str], lats, lons) -> np.ndarray:
+        """
+        Returns the SDLR for many points at once as a (file, point) array,
+        reading each cell's history once
+        """
+        times = []
+        for file in files:
+            year, month, _ = parse_filename(file)
+            if not (
+                self.first_year <= year <= self.last_year
+                and self.present[year - self.first_year, month - 1]
+            ):
+                raise ValueError(f"file is missing from the store: '{file}'")
+            times.append((year - self.first_year) * 12 + month - 1)
+        times = np.array(times, dtype=np.intp)
+
+        lat_idx, lon_idx = self.grids.lookup(lats, lons)
+        sdl_data = np.empty((len(files), lat_idx.shape[1]), dtype=np.float64)
+        for j in range(lat_idx.shape[1]):
+            sdl_data[:, j] = self.__read_point(lat_idx[:, j], lon_idx[:, j], times)
+
+        return sdl_data
+
+    def __read_point(self, lat_idx, lon_idx, times) -> np.ndarray:
+        """
+        Returns the SDLR of a point at the times, given its cell at each
+        time, reading the history of each of its distinct cells once
+        """
+        cells = np.stack([lat_idx[times], lon_idx[times]], axis=-1)
+        values = np.empty(len(times), dtype=np.float64)
+
+        for cell in np.unique(cells, axis=0):
+            at_cell = (cells == cell).all(axis=-1)
+            values[at_cell] = self.__read_cell(*cell)[times[at_cell]]
+
+        return values
+
+    def __read_cell(self, lat_idx: int, lon_idx: int) -> np.ndarray:
+        """
+        Returns the flat monthly history of the cell
+        """
+        tile = (lat_idx // self.tile_size) * self.__tiles_across + (
+            lon_idx // self.tile_size
+        )
+        # The cell's position within its tile, edge tiles can be narrower
+        tile_width = min(
+            self.tile_size,
+            self.grid.lon.size - (lon_idx // self.tile_size) * self.tile_size,
+        )
+        cell = (lat_idx % self.tile_size) * tile_width + lon_idx % self.tile_size
+
+        if self.codec == "none":
+            # Read the cell's bytes right off the block
+            start = self.offsets[tile] + cell * self.n_times * 4
+            return np.frombuffer(
+                self.__blocks[start : start + self.n_times * 4], dtype="<f4"
+            )
+
+        return self.__read_block(tile).reshape(-1, self.n_times)[cell]
+
+    def __read_block(self, tile: int) -> np.ndarray:
+        with self.__lock:
+            block = self.__cache.get(tile)
+            if block is not None:
+                self.__cache.move_to_end(tile)
+                return block
+
+        start = self.offsets[tile]
+        data = decompress_block(
+            self.__blocks[start : start + self.lengths[tile]].tobytes(), self.codec
+        )
+        block = np.frombuffer(data, dtype="<f4")
+
+        with self.__lock:
+            self.__cache[tile] = block
+            while len(self.__cache) > self.cache_blocks:
+                self.__cache.popitem(last=False)
+
+        return block
+
+
+# The worker processes for reading many NetCDF files at once
+__executor = None
+__executor_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    Returns the shared pool of worker processes, or None when disabled.
+    Processes, as netCDF4 can't read from several threads at once. They
+    run `workers.read_year_sdlr`, which doesn't import the app
+    """
+    global __executor
+
+    with __executor_lock:
+        if __executor is None and SDL_READ_WORKERS > 0:
+            __executor = ProcessPoolExecutor(
+                max_workers=SDL_READ_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+
+    return __executor
+
+
+def read_year_sdlr(files: list[str], lat: float, lon: float) -> np.ndarray:
+    """
+    Returns the SDLR of the point for each of the files of a year,
+    read inline from the pooled datasets
+    """
+    return np.array([NetCDFExtractor.read_cell(file, lat, lon) for file in files])
+
+
+def iter_sdlr_range(lat: float, lon: float, from_: int, to_: int):
+    """
+    Returns a generator of the (year, SDLR of each month) of the point for the
+    years from and to, with NaN for the missing months. The years are yielded
+    in order as soon as they're read, the files are checked before
+
+    Raises:
+    - ValueError: If the years are out of range.
+    """
+    files = NetCDFRetriever().retrieve_all(from_, to_)
+    years = range(from_, to_ + 1)
+
+    def rows(values):
+        for year, year_files, year_values in zip(years, files, values):
+            sdlr = np.full(12, np.nan)
+            sdlr[[parse_filename(file)[1] - 1 for file in year_files]] = year_values
+            yield year, sdlr
+
+    extractor = get_extractor()
+    if hasattr(extractor, "get_series") and (
+        extractor.first_year <= from_ and to_ <= extractor.last_year
+    ):
+        # Views over the store, nothing to read ahead
+        return zip(years, extractor.get_series(lat, lon, from_, to_))
+
+    executor = get_executor()
+    if executor is None:
+        return rows(read_year_sdlr(year_files, lat, lon) for year_files in files)
+
+    # Imports netCDF4, deferred in the fast-start mode
+    import workers
+
+    # The workers read ahead, while the earlier years are consumed
+    return rows(
+        executor.map(
+            workers.read_year_sdlr, files, [lat] * len(files), [lon] * len(files)
+        )
+    )
+
+
+def get_sdlr_range(lat: float, lon: float, from_: int, to_: int) -> dict:
+    """
+    Returns the SDLR history of the point for the years from and to, as a
+    (year, month) array with NaN for the missing months. The years are
+    read in parallel unless the backend holds the whole history together
+    """
+    years = np.arange(from_, to_ + 1)
+    sdlr = np.full((len(years), 12), np.nan)
+
+    for i, (_, year_sdlr) in enumerate(iter_sdlr_range(lat, lon, from_, to_)):
+        sdlr[i] = year_sdlr
+
+    return {"years": years, "sdlr": sdlr}
+
+
+# The loaded store for the backend, reloaded when rebuilt
+__extractor = None
+__extractor_mtime = None
+
+
+def get_extractor():
+    """
+    Returns the extractor for the configured SDL backend, falling back to
+    reading the NetCDF files when the store hasn't been built
+    """
+    global __extractor, __extractor_mtime
+
+    store = {"cube": SDLCubeExtractor, "tiles": SDLTileExtractor}.get(SDL_BACKEND)
+
+    if store is not None and store.exists():
+        mtime = os.path.getmtime(store.header_path())
+        if not isinstance(__extractor, store) or __extractor_mtime != mtime:
+            __extractor, __extractor_mtime = store(), mtime
+        return __extractor
+
+    return NetCDFExtractor
+
+
 if __name__ == "__main__":
 
     year = 2003
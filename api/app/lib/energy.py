@@ -1,12 +1,38 @@
+import numpy as np
+import threading
 import datetime
+import calendar
 import math
+import time
+
+from collections import OrderedDict
 
 # Custom modules
+from logger import logger
 from app.utils.dates import date_range, get_month_abbr
-from .dataset import NetCDFRetriever, NetCDFExtractor, get_solar_decline
-
-# The solar decline dataset
-delta_map = get_solar_decline()
+from app.utils.metrics import metrics
+from app.constants import (
+    DAYLENGTH_RESOLUTION,
+    DAYLENGTH_CACHE_SIZE,
+    DAYLENGTH_PRECOMPUTE,
+    ESTIMATION_YEAR,
+    FAST_START,
+)
+from .dataset import (
+    NetCDFRetriever,
+    get_climatology,
+    get_extractor,
+    get_solar_decline,
+)
+from .solar import broadcast_to_sites, get_default_orientation, get_solar_geometry
+
+# The month codes, in the order of the declination table
+MONTHS = [get_month_abbr(i) for i in range(12)]
+
+# Adjustment factor for sunlight, accounting for peak hours
+PEAK_HOURS_FACTOR = 0.6
+# The efficiency of the panels when not given
+DEFAULT_EFFICIENCY = 0.223
 
 
 def get_sunlight_hours(lat: float, date: int, month: str) -> float:
@@ -25,47 +51,26 @@ def get_sunlight_hours(lat: float, date: int, month: str) -> float:
     - ValueError: If the date is out of range for the specified month.
 
     Note:
-    - The function relies on external mappings and functions, including `delta_map`, `dms_to_decimal`, and `calculate_omegao`, which must be defined elsewhere in the code.
+    - The function relies on the precomputed `declinations` table and `calculate_omegao`.
     """
-    phi = lat
-
-    def get_hours(date):
-        delta = delta_map[date - 1][month]
-        # If the value is none, return none
-        if not delta or len(delta) == 0:
-            return None
-
-        # Convert the DMS string to decimal degrees
-        delta_degrees = dms_to_decimal(*parse_dms(delta))
-        # Get the omega (solar angle) for the delta and phi
-        omega = calculate_omegao(delta_degrees, phi)
-        # Adjust the omega to watch time
-        return omega * (24 / math.pi)
+    month = MONTHS.index(month)
+    declinations, declination_mask = get_declinations()
 
     # If a particular date is in question, then return the result
     if date != -1:
-        return get_hours(date)
-
-    # Else, return an average answer
-    hours = []
-
-    # If the date is provided as -1, then range it from start to end
-    for j in range(1, 13):
-        for i in range(date_range(j, datetime.datetime.now().year)):
-            delta = delta_map[i][month]
-
-            # Skip the iteration of the data point is None
-            if not delta or len(delta) == 0:
-                continue
+        if date < 1 or date > 31:
+            raise ValueError(f"date out of range: {date}")
+        # If the day doesn't exist for the month, return none
+        if not declination_mask[month, date - 1]:
+            return None
 
-            # Convert the DMS string to decimal degrees
-            delta_degrees = dms_to_decimal(*parse_dms(delta))
-            # Get the omega (solar angle) for the delta and phi
-            omega = calculate_omegao(delta_degrees, phi)
-            # Adjust the omega to watch time
-            hours.append(omega * (24 / math.pi))
+        # Get the omega (solar angle) for the delta and phi, adjusted to watch time
+        omega = calculate_omegao(declinations[month, date - 1], lat)
+        return float(omega * (24 / math.pi))
 
-    return sum(hours) / len(hours)
+    # Else, return an average answer over the days of the month
+    omega = calculate_omegao(declinations[month, declination_mask[month]], lat)
+    return float(omega.mean() * (24 / math.pi))
 
 
 def parse_dms(dms_str: str) -> tuple:
@@ -157,20 +162,218 @@ def calculate_omegao(delta: float, phi: float):
     """
     rpd = math.pi / 180  # Radians per degree
 
-    # Calculate omegao
-    omegao = math.acos(
-        max(min(-math.tan(delta * rpd) * math.tan(phi * rpd), 1.0), -1.0)
-    )
+    # Calculate omegao, for scalars or arrays of delta and phi alike
+    omegao = np.arccos(np.clip(-np.tan(delta * rpd) * np.tan(phi * rpd), -1.0, 1.0))
 
     return omegao
 
 
+def get_declination_table() -> tuple[np.ndarray, np.ndarray]:
+    """
+    Converts the solar decline dataset to a (month, day) array of the
+    declinations in decimal degrees, along with the mask of the valid days
+    """
+    declinations = np.zeros((12, 31), dtype=np.float64)
+    mask = np.zeros((12, 31), dtype=bool)
+
+    for day, row in enumerate(get_solar_decline()):
+        for month in range(12):
+            delta = row.get(MONTHS[month])
+            # The days missing from the month are left empty
+            if not delta:
+                continue
+
+            declinations[month, day] = dms_to_decimal(*parse_dms(delta))
+            mask[month, day] = True
+
+    return declinations, mask
+
+
+# The solar declinations, parsed once for all the requests
+__declinations = None
+__declinations_lock = threading.Lock()
+
+
+def get_declinations() -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the declination table and its mask, parsing it on the first use
+    """
+    global __declinations
+
+    if __declinations is None:
+        with __declinations_lock:
+            if __declinations is None:
+                started = time.perf_counter()
+                __declinations = get_declination_table()
+                # Parsed once only, so it's always recorded
+                metrics.observe("dms.parse", time.perf_counter() - started)
+
+    return __declinations
+
+
+# Deferred to the first use or the preload in the fast-start mode
+if not FAST_START:
+    get_declinations()
+
+
+def get_monthly_sunlight_hours(lats) -> np.ndarray:
+    """
+    Returns the average sunlight hours of each month for many latitudes at
+    once, as a (latitude, month) array
+
+    Parameters:
+    - lats (array-like): The latitudes in decimal degrees.
+    """
+    phi = np.asarray(lats, dtype=np.float64).reshape(-1, 1, 1)
+    declinations, declination_mask = get_declinations()
+
+    # The hours for every (latitude, month, day), averaged over the valid days
+    omega = calculate_omegao(declinations, phi)
+    hours = np.where(declination_mask, omega, 0.0).sum(axis=-1) / declination_mask.sum(
+        axis=-1
+    )
+    hours *= 24 / math.pi
+
+    return hours
+
+
+class DaylengthCache:
+    """
+    Caches the 12-month vector of average sunlight hours by the latitude,
+    quantised to a resolution in degrees
+    """
+
+    def __init__(
+        self,
+        resolution: float = DAYLENGTH_RESOLUTION,
+        max_size: int = DAYLENGTH_CACHE_SIZE,
+    ):
+        self.resolution = resolution
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+        self.__entries: OrderedDict[int, np.ndarray] = OrderedDict()
+        self.__lock = threading.Lock()
+        # The precomputed table, as (first key, hours for each key onwards)
+        self.__table = None
+
+    def key(self, lat):
+        """
+        Returns the quantised latitude, for a scalar or an array
+        """
+        return np.rint(np.asarray(lat, dtype=np.float64) / self.resolution).astype(
+            np.int64
+        )
+
+    def get(self, lat: float) -> np.ndarray:
+        """
+        Returns the average sunlight hours of each month for the latitude
+        """
+        return self.get_many([lat])[0]
+
+    def get_many(self, lats) -> np.ndarray:
+        """
+        Returns the average sunlight hours of each month for many latitudes,
+        as a (latitude, month) array
+        """
+        keys = self.key(lats).reshape(-1)
+        hours = np.empty((len(keys), 12), dtype=np.float64)
+
+        table = self.__table
+        if table is not None:
+            first, rows = table
+            found = (keys >= first) & (keys < first + len(rows))
+            hours[found] = rows[keys[found] - first]
+        else:
+            found = np.zeros(len(keys), dtype=bool)
+
+        missing = {}
+        with self.__lock:
+            for i in np.flatnonzero(~found):
+                entry = self.__entries.get(keys[i])
+                if entry is None:
+                    missing.setdefault(keys[i], []).append(i)
+                    continue
+                self.__entries.move_to_end(keys[i])
+                hours[i] = entry
+
+            # Counted per row, the rows sharing a missing key are all misses
+            misses = sum(len(rows) for rows in missing.values())
+            self.hits += len(keys) - misses
+            self.misses += misses
+
+        if not missing:
+            return hours
+
+        # Compute the missing latitudes together
+        with metrics.span("energy.daylength"):
+            computed = get_monthly_sunlight_hours(
+                np.array(list(missing)) * self.resolution
+            )
+
+        with self.__lock:
+            for (key, rows), entry in zip(missing.items(), computed):
+                hours[rows] = entry
+                self.__entries[key] = entry
+            while len(self.__entries) > self.max_size:
+                self.__entries.popitem(last=False)
+
+        return hours
+
+    def precompute(self, lat_min: float = -90.0, lat_max: float = 90.0):
+        """
+        Fills in the hours for every latitude in the range at the resolution,
+        so the lookups within it do no trigonometry
+        """
+        first, last = self.key(lat_min), self.key(lat_max)
+        keys = np.arange(first, last + 1)
+        self.__table = (int(first), get_monthly_sunlight_hours(keys * self.resolution))
+
+    def clear(self):
+        """
+        Drops the cached and the precomputed hours
+        """
+        with self.__lock:
+            self.__entries.clear()
+            self.__table = None
+            self.hits = self.misses = 0
+
+    @property
+    def stats(self):
+        with self.__lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self.__entries),
+                "precomputed": 0 if self.__table is None else len(self.__table[1]),
+            }
+
+
+# The shared cache for all the requests
+daylength_cache = DaylengthCache()
+metrics.collect("daylength_cache", lambda: daylength_cache.stats)
+if DAYLENGTH_PRECOMPUTE and not FAST_START:
+    daylength_cache.precompute()
+
+
+def get_estimation_year() -> int:
+    """
+    Returns the year whose data the energy is estimated from
+    """
+    if ESTIMATION_YEAR:
+        return int(ESTIMATION_YEAR)
+    return datetime.datetime.now().year - 1
+
+
 def get_estimated_energy(
     lat: float,
     lon: float,
     area: float,
     efficiency: float | None = 0.223,
     month: int | None = None,
+    source: str = "year",
+    stat: str = "mean",
 ) -> float | None:
     """
     Estimate the energy output of a solar panel system for a given location and month.
@@ -183,6 +386,9 @@ def get_estimated_energy(
       If None, defaults to 0.223 (22.3%).
     - month (int | None): The month for which to estimate energy (1 for January, ..., 12 for December).
       If None, returns the average energy output for the whole year.
+    - source (str): Where the radiation comes from, "year" for the last year's data or
+      "climatology" for the statistic of each month over all the years.
+    - stat (str): The climatology statistic: "mean", "std", "p10", "p50" or "p90".
 
     Returns:
     - float | None: Estimated energy output in kWh for the specified month or average yearly output.
@@ -190,42 +396,66 @@ def get_estimated_energy(
 
     Raises:
     - ValueError: If data for the specified year is not available.
+    - ClimatologyUnavailable: If the climatology isn't built.
 
     Note:
     - The function assumes the use of a class `NetCDFRetriever` to retrieve weather data,
       and a class `NetCDFExtractor` to extract solar radiation data.
     - The sunlight hours are adjusted with an empirical factor of 0.6 to account for peak hours.
     """
-    year = datetime.datetime.now().year - 1
+    with metrics.span("energy.estimate"):
+        return estimate_energy(lat, lon, area, efficiency, month, source, stat)
+
+
+def estimate_energy(
+    lat: float,
+    lon: float,
+    area: float,
+    efficiency: float | None,
+    month: int | None,
+    source: str,
+    stat: str,
+):
+    """
+    Estimates the energy, see `get_estimated_energy`
+    """
+    year = get_estimation_year()
     # Redefine efficiency with a constants
-    efficiency = efficiency or 0.223
+    efficiency = efficiency or DEFAULT_EFFICIENCY
     # Round the month for inputs
     month = month % 12 if month is not None else None
 
-    # Retrieve for the last year
-    files = None
-    try:
-        retriever = NetCDFRetriever()
-        files = retriever.retrieve(year)
-    except ValueError:
-        print("The data is not up-to-date, for year:", year)
-        return None
+    if source == "climatology":
+        # The radiation of each month over all the years, in O(1)
+        SDLR = get_climatology().get(lat, lon, stat).tolist()
+    elif source == "year":
+        # Retrieve for the last year
+        files = None
+        try:
+            retriever = NetCDFRetriever()
+            files = retriever.retrieve(year)
+        except ValueError:
+            logger.warning(msg=f"The data is not up-to-date, for year: {year}")
+            return None
 
-    # If the files aren't found, return None
-    if files is None:
-        return None
+        # If the files aren't found, return None
+        if files is None:
+            return None
 
-    # Extract the SDLR data
-    SDLR = list(map(lambda dt: dt["sdlr"], NetCDFExtractor.get_sdlr(files, lat, lon)))
+        # Extract the SDLR data
+        SDLR = list(
+            map(lambda dt: dt["sdlr"], get_extractor().get_sdlr(files, lat, lon))
+        )
+    else:
+        raise ValueError(f"unexpected source for the radiation: '{source}'")
 
     total = 0
     # Return the energy for a particular month
     if month is not None:
         # Average sunlight received for the particular month
-        hours = get_sunlight_hours(lat, -1, get_month_abbr(month))
+        hours = daylength_cache.get(lat)[month - 1]
         # Adjustment factor for sunlight, accounting for peak hours
-        adjustment_factor = 0.6
-        hours *= adjustment_factor
+        hours *= PEAK_HOURS_FACTOR
         # The SDLR for the particular month
         radiation = SDLR[month - 1]
         # Energy output for the scenario (in kWh) (in a single day)
@@ -233,16 +463,16 @@ def get_estimated_energy(
         # Account for the efficiency of the panel
         energy *= efficiency
         total = energy
-        return {"order": 0, "month": get_month_abbr(month), "energy": energy}, total
+        return {"order": 0, "month": get_month_abbr(month - 1), "energy": energy}, total
 
     # Else, return an average energy for the whole year
     month_energies = []
+    daylength = daylength_cache.get(lat)
     for i in range(1, 13):  # Corrected to loop through all months (1 to 12)
         # Average sunlight received for the particular month
-        hours = get_sunlight_hours(lat, -1, get_month_abbr(i))
+        hours = daylength[i - 1]
         # Adjustment factor for sunlight, accounting for peak hours
-        adjustment_factor = 0.6
-        hours *= adjustment_factor
+        hours *= PEAK_HOURS_FACTOR
         # The SDLR radiation for this month
         radiation = SDLR[i - 1]
         energy = (radiation * area * hours) / 1000
@@ -257,6 +487,282 @@ def get_estimated_energy(
     return month_energies, total
 
 
+def get_estimated_energy_batch(
+    lats,
+    lons,
+    areas,
+    efficiencies=None,
+    month: int | None = None,
+) -> dict | None:
+    """
+    Estimate the energy output of many solar panel systems at once, see
+    `get_estimated_energy` for the model.
+
+    Parameters:
+    - lats (array-like): Latitudes of the sites (in decimal degrees).
+    - lons (array-like): Longitudes of the sites (in decimal degrees).
+    - areas (array-like | float): Areas of the solar panels (in square meters).
+    - efficiencies (array-like | float | None): Efficiencies of the solar panels,
+      the missing ones default to 0.223 (22.3%).
+    - month (int | None): The month for which to estimate the daily energy,
+      if None, returns the energy of each month of the year.
+
+    Returns:
+    - dict | None: The columns "lat", "lon", "months", "energy" as a (site, month)
+      array in kWh and "total" per site. Returns None if the data is not up-to-date.
+
+    Raises:
+    - ValueError: If the inputs can't be matched up site by site.
+    """
+    year = get_estimation_year()
+
+    lats = np.asarray(lats, dtype=np.float64).reshape(-1)
+    lons = np.asarray(lons, dtype=np.float64).reshape(-1)
+    if lats.shape != lons.shape:
+        raise ValueError(f"got {len(lats)} latitudes for {len(lons)} longitudes")
+
+    areas = broadcast_to_sites(areas, len(lats), "areas")
+    efficiencies = broadcast_to_sites(
+        DEFAULT_EFFICIENCY if efficiencies is None else efficiencies,
+        len(lats),
+        "efficiencies",
+    )
+    # Same as `efficiency or 0.223` for each of the sites
+    efficiencies = np.where(
+        np.isnan(efficiencies) | (efficiencies == 0), DEFAULT_EFFICIENCY, efficiencies
+    )
+
+    try:
+        files = NetCDFRetriever().retrieve(year)
+    except ValueError:
+        logger.warning(msg=f"The data is not up-to-date, for year: {year}")
+        return None
+
+    # The SDLR of every site for each month, as (month, site)
+    SDLR = get_extractor().get_sdlr_many(files, lats, lons)
+    months = len(SDLR)
+
+    hours = daylength_cache.get_many(lats)[:, :months] * PEAK_HOURS_FACTOR
+
+    # Return the daily energy for a particular month
+    if month is not None:
+        month = month % 12
+        energy = (SDLR[month - 1] * areas * hours[:, month - 1]) / 1000
+        energy *= efficiencies
+        return {
+            "lat": lats,
+            "lon": lons,
+            "months": [get_month_abbr(month - 1)],
+            "energy": energy[:, None],
+            "total": energy,
+        }
+
+    # Else, the energy for each month of the year
+    days = np.array([date_range(i, year) for i in range(1, months + 1)])
+    energy = (SDLR.T * areas[:, None] * hours) / 1000
+    energy *= efficiencies[:, None] * days
+
+    return {
+        "lat": lats,
+        "lon": lons,
+        "months": [get_month_abbr(i) for i in range(months)],
+        "energy": energy,
+        "total": energy.sum(axis=1),
+    }
+
+
+def iter_estimated_energy_batch(
+    lats,
+    lons,
+    areas,
+    efficiencies=None,
+    month: int | None = None,
+    chunk_size: int = 1024,
+):
+    """
+    Returns a generator of the results of `get_estimated_energy_batch` for
+    the chunks of at most chunk_size sites, so only a chunk is held at once.
+    The inputs and the data are checked before
+
+    Returns:
+    - generator | None: The results for each chunk, or None if the data is not up-to-date.
+
+    Raises:
+    - ValueError: If the inputs can't be matched up site by site.
+    """
+    lats = np.asarray(lats, dtype=np.float64).reshape(-1)
+    lons = np.asarray(lons, dtype=np.float64).reshape(-1)
+    if lats.shape != lons.shape:
+        raise ValueError(f"got {len(lats)} latitudes for {len(lons)} longitudes")
+
+    areas = np.broadcast_to(np.asarray(areas, dtype=np.float64), lats.shape)
+    if efficiencies is not None:
+        efficiencies = np.broadcast_to(
+            np.asarray(efficiencies, dtype=np.float64), lats.shape
+        )
+
+    year = get_estimation_year()
+    try:
+        NetCDFRetriever().retrieve(year)
+    except ValueError:
+        logger.warning(msg=f"The data is not up-to-date, for year: {year}")
+        return None
+
+    def chunks():
+        for start in range(0, len(lats), chunk_size):
+            chunk = slice(start, start + chunk_size)
+            yield get_estimated_energy_batch(
+                lats[chunk],
+                lons[chunk],
+                areas[chunk],
+                None if efficiencies is None else efficiencies[chunk],
+                month,
+            )
+
+    return chunks()
+
+
+def get_daily_declinations(year: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the declination of the sun for each day of the year in degrees,
+    along with the month of each day (0 for January)
+    """
+    declinations, declination_mask = get_declinations()
+    months, days = np.nonzero(declination_mask)
+
+    daily = declinations[months, days]
+    # The table has a 29th of February, left out of the common years
+    if not calendar.isleap(year):
+        leap_day = (months == 1) & (days == 28)
+        daily, months = daily[~leap_day], months[~leap_day]
+
+    return daily, months
+
+
+def get_estimated_energy_profile(
+    lats,
+    lons,
+    areas,
+    efficiencies=None,
+    tilts=None,
+    azimuths=None,
+    resolution: str = "daily",
+    source: str = "year",
+    stat: str = "mean",
+) -> dict | None:
+    """
+    Estimate the energy output of solar panels for every day or hour of the year,
+    accounting for their tilt and the direction they face.
+
+    Parameters:
+    - lats (array-like | float): Latitudes of the sites (in decimal degrees).
+    - lons (array-like | float): Longitudes of the sites (in decimal degrees).
+    - areas (array-like | float): Areas of the solar panels (in square meters).
+    - efficiencies (array-like | float | None): Efficiencies of the solar panels,
+      the missing ones default to 0.223 (22.3%).
+    - tilts (array-like | float | None): Tilts of the panels from the horizontal
+      (in degrees), the latitude of the site if None.
+    - azimuths (array-like | float | None): The directions the panels face, clockwise
+      from the north (in degrees, 180 for the south), facing the equator if None.
+    - resolution (str): "daily" for the energy of each day, or "hourly" for each
+      hour of each day in local solar time.
+    - source (str): Where the radiation comes from, "year" or "climatology".
+    - stat (str): The climatology statistic: "mean", "std", "p10", "p50" or "p90".
+
+    Returns:
+    - dict | None: The columns "lat", "lon", "tilt", "azimuth", the "dates" of the
+      year, the "energy" in kWh as a (site, day) or (site, day, hour) array, and the
+      "total" per site. Returns None if the data is not up-to-date.
+
+    Raises:
+    - ValueError: If the inputs are out of range or can't be matched up site by site.
+    - ClimatologyUnavailable: If the climatology isn't built.
+
+    Note:
+    - Each day gets the energy `get_estimated_energy` gives a horizontal panel,
+      from the daylength of the day, which is spread over the hours as the sun's
+      elevation and turned onto the panel by the incidence of the sun's rays. A
+      horizontal panel gets close to the monthly energy of `get_estimated_energy`,
+      not the same: that one multiplies the daylength averaged over the month of
+      the declination table, with its 29th of February, at the quantised latitude.
+    """
+    if resolution not in ("daily", "hourly"):
+        raise ValueError(f"unexpected resolution: '{resolution}'")
+
+    year = get_estimation_year()
+
+    lats = np.asarray(lats, dtype=np.float64).reshape(-1)
+    lons = np.asarray(lons, dtype=np.float64).reshape(-1)
+    if lats.shape != lons.shape:
+        raise ValueError(f"got {len(lats)} latitudes for {len(lons)} longitudes")
+    tilts, azimuths = get_default_orientation(lats, tilts, azimuths)
+
+    areas = broadcast_to_sites(areas, len(lats), "areas")
+    efficiencies = broadcast_to_sites(
+        DEFAULT_EFFICIENCY if efficiencies is None else efficiencies,
+        len(lats),
+        "efficiencies",
+    )
+    efficiencies = np.where(
+        np.isnan(efficiencies) | (efficiencies == 0), DEFAULT_EFFICIENCY, efficiencies
+    )
+
+    # The SDLR of every site for each month, as (month, site)
+    if source == "climatology":
+        SDLR = np.stack(
+            [get_climatology().get(lat, lon, stat) for lat, lon in zip(lats, lons)],
+            axis=1,
+        )
+    elif source == "year":
+        try:
+            files = NetCDFRetriever().retrieve(year)
+        except ValueError:
+            logger.warning(msg=f"The data is not up-to-date, for year: {year}")
+            return None
+        SDLR = get_extractor().get_sdlr_many(files, lats, lons)
+    else:
+        raise ValueError(f"unexpected source for the radiation: '{source}'")
+
+    # The months missing from the data are left empty
+    SDLR = np.vstack([SDLR, np.full((12 - len(SDLR), len(lats)), np.nan)])
+
+    declinations, months = get_daily_declinations(year)
+    days = len(declinations)
+
+    with metrics.span("energy.profile"):
+        # The energy of each day on a horizontal panel, as (site, day)
+        daylength = calculate_omegao(declinations, lats[:, None]) * (24 / math.pi)
+        energy = SDLR[months].T * areas[:, None] * daylength * PEAK_HOURS_FACTOR
+        energy *= efficiencies[:, None] / 1000
+
+        geometry = get_solar_geometry(lats, declinations, tilts, azimuths)
+        elevation = np.maximum(geometry["sin_elevation"], 0).reshape(-1, days, 24)
+        incidence = np.maximum(geometry["cos_incidence"], 0).reshape(-1, days, 24)
+        # The sun's rays reach the panel only while it's above the horizon
+        incidence[elevation == 0] = 0
+
+        # The share of the day's energy in each hour, turned onto the panel
+        daily_elevation = elevation.sum(axis=2, keepdims=True)
+        hourly = energy[:, :, None] * np.divide(
+            incidence,
+            daily_elevation,
+            out=np.zeros_like(incidence),
+            where=daily_elevation > 0,
+        )
+
+    dates = np.arange(f"{year}-01-01", f"{year + 1}-01-01", dtype="datetime64[D]")
+
+    return {
+        "lat": lats,
+        "lon": lons,
+        "tilt": tilts,
+        "azimuth": azimuths,
+        "dates": dates.astype(str).tolist(),
+        "energy": hourly if resolution == "hourly" else hourly.sum(axis=2),
+        "total": hourly.sum(axis=(1, 2)),
+    }
+
+
 if __name__ == "__main__":
 
     """
@@ -0,0 +1,114 @@
+import numpy as np
+import threading
+import hashlib
+
+
+class GridAxis:
+    """
+    Maps coordinates to the index of the nearest point along one axis,
+    in O(1) for evenly spaced axes, or with a bisect for irregular ones
+    """
+
+    def __init__(self, values):
+        self.values = np.asarray(np.ma.getdata(values), dtype=np.float64)
+        self.size = len(self.values)
+
+        # Check if the axis is evenly spaced
+        steps = np.diff(self.values)
+        self.step = float(steps[0]) if self.size > 1 else 0.0
+        self.regular = bool(
+            self.size > 1
+            and self.step != 0
+            and np.allclose(steps, self.step, rtol=0, atol=abs(self.step) * 1e-6)
+        )
+
+        # For the bisect lookups, keep the axis in ascending order
+        self.__order = np.argsort(self.values, kind="stable")
+        self.__sorted = self.values[self.__order]
+
+    def lookup(self, value):
+        """
+        Returns the index of the nearest point, for a scalar or an array
+        """
+        if self.regular:
+            position = (
+                np.asarray(value, dtype=np.float64) - self.values[0]
+            ) / self.step
+            # Round half down, so ties pick the lower index like argmin
+            index = np.clip(np.ceil(position - 0.5), 0, self.size - 1).astype(np.intp)
+        else:
+            index = self.__bisect(value)
+
+        return index if np.ndim(index) else int(index)
+
+    def __bisect(self, value):
+        value = np.asarray(value, dtype=np.float64)
+
+        # Pick the closer one of the two neighbours around the value
+        right = np.clip(np.searchsorted(self.__sorted, value), 1, self.size - 1)
+        left = right - 1
+        to_right = np.abs(self.__sorted[right] - value)
+        to_left = np.abs(self.__sorted[left] - value)
+        # Ties pick the lower index like argmin, which is the right neighbour
+        # on the descending axes
+        nearest = np.where(
+            (to_right < to_left)
+            | ((to_right == to_left) & (self.__order[right] < self.__order[left])),
+            right,
+            left,
+        )
+        return self.__order[nearest]
+
+
+class GridIndex:
+    """
+    Maps (lat, lon) coordinates to the (lat_idx, lon_idx) of the nearest
+    cell in a grid
+    """
+
+    def __init__(self, latitudes, longitudes):
+        self.lat = GridAxis(latitudes)
+        self.lon = GridAxis(longitudes)
+
+    @property
+    def shape(self):
+        return self.lat.size, self.lon.size
+
+    def lookup(self, lat, lon):
+        """
+        Returns the (lat_idx, lon_idx) for the nearest cell
+        """
+        return self.lat.lookup(lat), self.lon.lookup(lon)
+
+
+# The indices for each grid seen so far, keyed by the signature of the grid
+__grid_indices: dict[tuple, GridIndex] = {}
+__grid_lock = threading.Lock()
+
+
+def grid_signature(latitudes, longitudes) -> tuple:
+    """
+    Returns a key that is equal for the grids with identical coordinates
+    """
+    latitudes = np.asarray(np.ma.getdata(latitudes), dtype=np.float64)
+    longitudes = np.asarray(np.ma.getdata(longitudes), dtype=np.float64)
+
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(latitudes.tobytes())
+    digest.update(longitudes.tobytes())
+    return latitudes.shape, longitudes.shape, digest.hexdigest()
+
+
+def get_grid_index(latitudes, longitudes) -> GridIndex:
+    """
+    Returns the shared grid index for the coordinates, building it on the
+    first use of the grid
+    """
+    signature = grid_signature(latitudes, longitudes)
+
+    with __grid_lock:
+        index = __grid_indices.get(signature)
+        if index is None:
+            index = __grid_indices[signature] = GridIndex(latitudes, longitudes)
+
+    return index
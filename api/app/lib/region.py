@@ -0,0 +1,226 @@
+import numpy as np
+
+# Custom modules
+from logger import logger
+from app.utils.dates import date_range, get_month_abbr
+from .dataset import (
+    NetCDFExtractor,
+    NetCDFRetriever,
+    get_climatology,
+    get_file_grid,
+)
+from .energy import (
+    DEFAULT_EFFICIENCY,
+    PEAK_HOURS_FACTOR,
+    daylength_cache,
+    get_estimation_year,
+)
+
+"""
+Energy estimations integrated over the regions, rather than single points
+"""
+
+# The mean radius of the earth, in metres
+EARTH_RADIUS = 6371008.8
+
+
+def parse_geometry(geometry: dict) -> list[np.ndarray]:
+    """
+    Returns the rings of a GeoJSON Polygon or MultiPolygon, or a Feature of
+    one, as (point, [lon, lat]) arrays
+
+    Raises:
+    - ValueError: If the geometry isn't a polygon.
+    """
+    if not isinstance(geometry, dict):
+        raise ValueError("the polygon must be a GeoJSON geometry")
+
+    if geometry.get("type") == "Feature":
+        geometry = geometry.get("geometry") or {}
+
+    kind = geometry.get("type")
+    if kind == "Polygon":
+        polygons = [geometry.get("coordinates")]
+    elif kind == "MultiPolygon":
+        polygons = geometry.get("coordinates")
+    else:
+        raise ValueError(f"unexpected geometry type: '{kind}'")
+
+    rings = []
+    for polygon in polygons or []:
+        for ring in polygon:
+            ring = np.asarray(ring, dtype=np.float64)
+            if ring.ndim != 2 or ring.shape[0] < 3 or ring.shape[1] < 2:
+                raise ValueError("the rings of the polygon need 3 or more points")
+            rings.append(ring[:, :2])
+
+    if not rings:
+        raise ValueError("the polygon has no rings")
+
+    return rings
+
+
+def get_bounds(rings: list[np.ndarray]) -> tuple[float, float, float, float]:
+    """
+    Returns the (min_lon, min_lat, max_lon, max_lat) around the rings
+    """
+    points = np.concatenate(rings)
+    return (*points.min(axis=0), *points.max(axis=0))
+
+
+def polygon_mask(rings: list[np.ndarray], lats, lons) -> np.ndarray:
+    """
+    Rasterises the rings onto the grid of the lats and lons, returning the
+    (lat, lon) mask of the cells whose centres fall inside. The holes are
+    handled by the even-odd rule, as they're rings within the outer ring
+    """
+    lat = np.asarray(lats, dtype=np.float64)[:, None]
+    lon = np.asarray(lons, dtype=np.float64)[None, :]
+    inside = np.zeros((lat.shape[0], lon.shape[1]), dtype=bool)
+
+    for ring in rings:
+        # Every edge, from each point to the next one, closing the ring
+        x1, y1 = ring[:, 0], ring[:, 1]
+        x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+
+        for ax, ay, bx, by in zip(x1, y1, x2, y2):
+            # Count the edges crossed by a ray going east from the centre
+            crosses = (ay > lat) != (by > lat)
+            if not crosses.any():
+                continue
+            with np.errstate(divide="ignore", invalid="ignore"):
+                x = ax + (lat - ay) * (bx - ax) / (by - ay)
+            inside ^= crosses & (lon < x)
+
+    return inside
+
+
+def get_cell_areas(lats, lat_step: float, lon_step: float) -> np.ndarray:
+    """
+    Returns the surface areas of the cells centred on the lats, in square
+    metres, which shrink with the cos of the latitude
+    """
+    lats = np.radians(np.asarray(lats, dtype=np.float64))
+    return (
+        EARTH_RADIUS**2
+        * np.radians(abs(lat_step))
+        * np.radians(abs(lon_step))
+        * np.cos(lats)
+    )
+
+
+def get_regional_energy(
+    bbox: list[float] | None = None,
+    polygon: dict | None = None,
+    efficiency: float | None = None,
+    coverage: float = 1.0,
+    source: str = "year",
+    stat: str = "mean",
+) -> dict | None:
+    """
+    Estimate the energy potential of a region, with the panels covering a
+    fraction of every cell of the SDL grid within it, see
+    `get_estimated_energy` for the model.
+
+    Parameters:
+    - bbox (list[float] | None): The [min_lon, min_lat, max_lon, max_lat] of the region.
+    - polygon (dict | None): A GeoJSON Polygon or MultiPolygon of the region, within the bbox if both are given.
+    - efficiency (float | None): Efficiency of the solar panels, if None, defaults to 0.223 (22.3%).
+    - coverage (float): The fraction of the area of the region covered by the panels.
+    - source (str): Where the radiation comes from, "year" for the last year's data or
+      "climatology" for the statistic of each month over all the years.
+    - stat (str): The climatology statistic: "mean", "std", "p10", "p50" or "p90".
+
+    Returns:
+    - dict | None: The axes "lat" and "lon" of the cells, the "months", the "yield" of each
+      cell as a (lat, lon) array in kWh per square metre of panels (NaN outside the region),
+      the "monthly" and "total" energy of the region in kWh, its "area" in square metres,
+      the number of "cells" and the area-weighted "mean_yield".
+      Returns None if the data is not up-to-date.
+
+    Raises:
+    - ValueError: If the region is malformed or has no cells.
+    - ClimatologyUnavailable: If the climatology isn't built.
+    """
+    year = get_estimation_year()
+    efficiency = efficiency or DEFAULT_EFFICIENCY
+
+    if bbox is None and polygon is None:
+        raise ValueError("a bbox or a polygon is required")
+    if not 0 <= coverage <= 1:
+        raise ValueError(f"coverage out of range: {coverage}")
+
+    rings = parse_geometry(polygon) if polygon is not None else None
+    if bbox is None:
+        bbox = get_bounds(rings)
+    if len(bbox) != 4:
+        raise ValueError("the bbox must be [min_lon, min_lat, max_lon, max_lat]")
+    min_lon, min_lat, max_lon, max_lat = map(float, bbox)
+
+    if source == "climatology":
+        climatology = get_climatology()
+        grid = climatology.grid
+    elif source == "year":
+        try:
+            files = NetCDFRetriever().retrieve(year)
+        except ValueError:
+            logger.warning(msg=f"The data is not up-to-date, for year: {year}")
+            return None
+        # The year hasn't been published yet
+        if not files:
+            return None
+        grid = get_file_grid(files[0])
+    else:
+        raise ValueError(f"unexpected source for the radiation: '{source}'")
+
+    # The cells of the grid whose centres are within the bbox
+    lats = grid.lat.values[(grid.lat.values >= min_lat) & (grid.lat.values <= max_lat)]
+    lons = grid.lon.values[(grid.lon.values >= min_lon) & (grid.lon.values <= max_lon)]
+    if not len(lats) or not len(lons):
+        raise ValueError("no cells of the grid within the region")
+
+    mask = np.ones((len(lats), len(lons)), dtype=bool)
+    if rings is not None:
+        mask &= polygon_mask(rings, lats, lons)
+
+    # The radiation of each cell, as (month, lat, lon)
+    if source == "climatology":
+        SDLR = climatology.get_region(lats, lons, stat)
+    else:
+        SDLR = np.stack(
+            [NetCDFExtractor.read_region(file, lats, lons) for file in files]
+        )
+    months = len(SDLR)
+
+    hours = daylength_cache.get_many(lats)[:, :months].T * PEAK_HOURS_FACTOR
+    days = np.array([date_range(i, year) for i in range(1, months + 1)])
+
+    # The energy of a square metre of panels in each cell, for each month
+    energy = (SDLR * hours[:, :, None]) / 1000
+    energy *= efficiency * days[:, None, None]
+
+    # The cells without data don't count towards the region
+    cell_yield = energy.sum(axis=0)
+    mask &= ~np.isnan(cell_yield)
+    cell_yield[~mask] = np.nan
+
+    areas = np.broadcast_to(
+        get_cell_areas(lats, grid.lat.step, grid.lon.step)[:, None], mask.shape
+    )
+    weights = np.where(mask, areas, 0.0)
+    area = weights.sum()
+
+    monthly = np.where(mask, energy, 0.0).reshape(months, -1) @ weights.reshape(-1)
+    monthly *= coverage
+
+    return {
+        "lat": lats,
+        "lon": lons,
+        "months": [get_month_abbr(i) for i in range(months)],
+        "yield": cell_yield,
+        "monthly": monthly,
+        "total": float(monthly.sum()),
+        "area": float(area),
+        "cells": int(mask.sum()),
+        "mean_yield": float(np.nansum(cell_yield * weights) / area) if area else None,
+    }
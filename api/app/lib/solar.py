@@ -0,0 +1,136 @@
+import numpy as np
+
+"""
+Solar geometry for every hour of the days of a year, as arrays for one or
+many sites at once. The hours are in local solar time, so the sun crosses
+the meridian at noon, and each hour is taken at its middle
+"""
+
+# Radians per degree
+RPD = np.pi / 180
+
+
+def get_hour_angles(days: int) -> np.ndarray:
+    """
+    Returns the hour angle of the sun at the middle of each hour of the days,
+    in degrees, negative in the mornings
+    """
+    return np.tile((np.arange(24) + 0.5 - 12) * 15.0, days)
+
+
+def get_hourly_terms(declinations) -> np.ndarray:
+    """
+    Returns the (3, hour) terms of the sun's position shared by all the
+    sites: sin(delta), cos(delta) * cos(omega) and cos(delta) * sin(omega),
+    for the declination of each day in degrees
+    """
+    delta = np.repeat(np.asarray(declinations, dtype=np.float64) * RPD, 24)
+    omega = get_hour_angles(len(declinations)) * RPD
+
+    cos_delta = np.cos(delta)
+    return np.stack(
+        [np.sin(delta), cos_delta * np.cos(omega), cos_delta * np.sin(omega)]
+    )
+
+
+def get_plane_coefficients(lats, tilts, azimuths) -> np.ndarray:
+    """
+    Returns the (site, 3) coefficients of the hourly terms giving the cosine
+    of the incidence angle on each plane (Duffie & Beckman, eq. 1.6.2)
+
+    Parameters:
+    - lats (np.ndarray): The latitudes of the sites, in degrees.
+    - tilts (np.ndarray): The tilts of the panels from the horizontal, in degrees.
+    - azimuths (np.ndarray): The directions the panels face, in degrees clockwise
+      from the north (180 for the south).
+    """
+    phi, beta = lats * RPD, tilts * RPD
+    # From the south, with the east negative
+    gamma = (azimuths - 180) * RPD
+
+    return np.stack(
+        [
+            np.sin(phi) * np.cos(beta) - np.cos(phi) * np.sin(beta) * np.cos(gamma),
+            np.cos(phi) * np.cos(beta) + np.sin(phi) * np.sin(beta) * np.cos(gamma),
+            np.sin(beta) * np.sin(gamma),
+        ],
+        axis=-1,
+    )
+
+
+def broadcast_to_sites(values, sites: int, name: str) -> np.ndarray:
+    """
+    Returns the values as an array of one per site, a single value going
+    to all of them
+
+    Raises:
+    - ValueError: If there are neither one value nor one per site.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim > 1 or values.size not in (1, sites):
+        raise ValueError(f"got {values.size} {name} for {sites} sites")
+
+    return np.broadcast_to(values.reshape(-1), (sites,))
+
+
+def get_default_orientation(lats, tilts=None, azimuths=None):
+    """
+    Returns the tilts and azimuths of the panels, the missing ones tilted
+    at the latitude and facing the equator
+    """
+    lats = np.asarray(lats, dtype=np.float64).reshape(-1)
+    tilts = np.abs(lats) if tilts is None else tilts
+    azimuths = np.where(lats >= 0, 180.0, 0.0) if azimuths is None else azimuths
+
+    tilts = broadcast_to_sites(tilts, len(lats), "tilts")
+    azimuths = broadcast_to_sites(azimuths, len(lats), "azimuths")
+    if np.any((tilts < 0) | (tilts > 90)):
+        raise ValueError("the tilts have to be within 0 and 90 degrees")
+    if np.any((azimuths < 0) | (azimuths > 360)):
+        raise ValueError("the azimuths have to be within 0 and 360 degrees")
+
+    return tilts, azimuths
+
+
+def get_solar_geometry(lats, declinations, tilts=None, azimuths=None) -> dict:
+    """
+    Computes the position of the sun for every hour of the days, for each site.
+
+    Parameters:
+    - lats (array-like): The latitudes of the sites, in degrees.
+    - declinations (array-like): The declination of the sun for each day, in degrees.
+    - tilts (array-like | float | None): The tilts of the panels, the latitude if None.
+    - azimuths (array-like | float | None): The directions the panels face, clockwise
+      from the north, facing the equator if None.
+
+    Returns:
+    - dict: The "sin_elevation" of the sun and the "cos_incidence" of its rays on
+      the panels, as (site, hour) arrays. They're negative when the sun is below the
+      horizon or behind the panel.
+    """
+    lats = np.asarray(lats, dtype=np.float64).reshape(-1)
+    tilts, azimuths = get_default_orientation(lats, tilts, azimuths)
+
+    terms = get_hourly_terms(declinations)
+    # The horizontal plane, the elevation is the complement of its incidence
+    horizontal = np.stack(
+        [np.sin(lats * RPD), np.cos(lats * RPD), np.zeros_like(lats)], axis=-1
+    )
+
+    return {
+        "sin_elevation": horizontal @ terms,
+        "cos_incidence": get_plane_coefficients(lats, tilts, azimuths) @ terms,
+    }
+
+
+def get_sun_angles(lats, declinations, tilts=None, azimuths=None) -> dict:
+    """
+    Returns the "elevation" of the sun and the "incidence" angle of its rays
+    on the panels for every hour, in degrees, as (site, hour) arrays
+    """
+    geometry = get_solar_geometry(lats, declinations, tilts, azimuths)
+
+    return {
+        "elevation": np.degrees(np.arcsin(np.clip(geometry["sin_elevation"], -1, 1))),
+        "incidence": np.degrees(np.arccos(np.clip(geometry["cos_incidence"], -1, 1))),
+    }
@@ -0,0 +1,203 @@
+import threading
+import time
+import json
+
+from collections import Counter
+
+# Custom modules
+from logger import logger
+from .dataset import NetCDFRetriever, get_extractor, get_file_grid, snap_to_grid
+from .energy import daylength_cache, get_estimation_year
+
+"""
+Warms the caches of the data path for the popular places, so the first
+requests after a deploy don't pay for the cold reads
+"""
+
+
+def parse_target(values) -> tuple:
+    """
+    Returns the ("point", (lat, lon)) or ("bbox", (min_lon, min_lat, max_lon, max_lat))
+    for the values
+    """
+    values = tuple(float(value) for value in values)
+    if len(values) == 2:
+        return "point", values
+    if len(values) == 4:
+        return "bbox", values
+
+    raise ValueError(f"expected a lat, lon or a bbox, got: {values}")
+
+
+def load_targets(path: str) -> list[tuple]:
+    """
+    Reads the targets from a file, either a JSON list of [lat, lon],
+    {"lat", "lon"} and {"bbox"} items, or a hit log with a "lat,lon" or a
+    "min_lon,min_lat,max_lon,max_lat" on each line. The repeated targets are
+    ordered by their hits, the most requested first
+    """
+    with open(path, mode="r") as file:
+        if path.endswith(".json"):
+            targets = [
+                parse_target(
+                    item
+                    if isinstance(item, list)
+                    else item["bbox"] if "bbox" in item else (item["lat"], item["lon"])
+                )
+                for item in json.load(file)
+            ]
+        else:
+            targets = [
+                parse_target(line.replace(",", " ").split())
+                for line in file
+                if line.strip() and not line.lstrip().startswith("#")
+            ]
+
+    hits = Counter(targets)
+    return sorted(hits, key=hits.get, reverse=True)
+
+
+def get_cells(targets: list[tuple], grid) -> list[tuple[float, float]]:
+    """
+    Returns the coordinates to warm for the targets, the points as they are
+    and the bboxes as the centres of the cells of the grid within them
+    """
+    cells = {}
+    for kind, values in targets:
+        if kind == "point":
+            cells.setdefault(values)
+            continue
+
+        min_lon, min_lat, max_lon, max_lat = values
+        lat_values, lon_values = grid.lat.values, grid.lon.values
+        lats = lat_values[(lat_values >= min_lat) & (lat_values <= max_lat)]
+        lons = lon_values[(lon_values >= min_lon) & (lon_values <= max_lon)]
+        for lat in lats:
+            for lon in lons:
+                cells.setdefault((float(lat), float(lon)))
+
+    return list(cells)
+
+
+def get_warmup_cells(targets: list[tuple]) -> list[tuple[float, float]]:
+    """
+    Returns the places to warm for the targets on the grid of the estimation
+    year, computing their sunlight hours together
+
+    Raises:
+    - ValueError: If the estimation year has no files.
+    """
+    year = get_estimation_year()
+    files = NetCDFRetriever().retrieve(year)
+    if not files:
+        raise ValueError(f"no files to warm for the year: {year}")
+
+    cells = get_cells(targets, get_file_grid(files[0]))
+
+    daylength_cache.get_many([lat for lat, _ in cells])
+    return cells
+
+
+def warm_cell(lat: float, lon: float):
+    """
+    Fills the caches of /sdlr and /energy for the point, for the estimation
+    year, opening its files along the way
+    """
+    # The routes own the response cache
+    from app.routes.data import get_energy_for_cell, get_response_cache
+
+    year = get_estimation_year()
+    files = NetCDFRetriever().retrieve(year)
+
+    cache = get_response_cache()
+    cache.get_or_set(
+        cache.key("sdlr", year, snap_to_grid(files, lat, lon)),
+        lambda: get_extractor().get_sdlr(files, lat, lon),
+    )
+    get_energy_for_cell(lat, lon, None)
+
+
+class Warmup:
+    """
+    Runs the warming of a list of places, keeping track of the progress
+    """
+
+    def __init__(self):
+        self.status = "idle"
+        self.done = 0
+        self.total = 0
+        self.errors = 0
+        self.started = None
+        self.finished = None
+        self.error = None
+
+        self.__thread = None
+
+    def run(self, cells: list[tuple[float, float]], warm, report=None):
+        """
+        Calls warm(lat, lon) for each of the cells, reporting the progress
+        every tenth of the way through
+        """
+        self.status, self.error = "running", None
+        self.done, self.total, self.errors = 0, len(cells), 0
+        self.started, self.finished = time.time(), None
+        report = report or (lambda msg: logger.info(msg=msg))
+
+        step = max(1, self.total // 10)
+        for lat, lon in cells:
+            try:
+                warm(lat, lon)
+            except Exception as e:
+                self.errors += 1
+                logger.error(msg=f"warm-up failed for ({lat}, {lon}): {e}")
+
+            self.done += 1
+            if self.done % step == 0 or self.done == self.total:
+                report(f"warm-up: {self.done}/{self.total} places")
+
+        self.status, self.finished = "done", time.time()
+
+    def start(self, app, prepare, warm):
+        """
+        Runs the warm-up in the background within the context of the app,
+        with the cells returned by prepare()
+        """
+
+        def run():
+            with app.app_context():
+                try:
+                    self.run(prepare(), warm)
+                except Exception as e:
+                    self.status, self.error = "failed", str(e)
+                    logger.error(msg=f"warm-up failed: {e}")
+
+        self.status = "running"
+        self.__thread = threading.Thread(target=run, name="warmup", daemon=True)
+        self.__thread.start()
+        return self.__thread
+
+    @property
+    def warm(self) -> bool:
+        """
+        Whether there's nothing left to warm
+        """
+        return self.status != "running"
+
+    @property
+    def state(self):
+        return {
+            "status": self.status,
+            "done": self.done,
+            "total": self.total,
+            "errors": self.errors,
+            "seconds": (
+                None
+                if self.started is None
+                else round((self.finished or time.time()) - self.started, 3)
+            ),
+            "error": self.error,
+        }
+
+
+# The warm-up of the running app
+warmup = Warmup()
@@ -1,4 +1,5 @@
 from flask_login import UserMixin
+from sqlalchemy import and_, or_
 from typing import Any
 
 # Custom utilities
@@ -13,7 +14,13 @@ class User(db.Model, UserMixin):
     password = db.Column(db.Text, nullable=False)
 
     # The timestamp columns
-    created = db.Column(db.DateTime, default=now)
+    created = db.Column(db.DateTime, nullable=False, default=now)
+
+    # For paging through the users, the newest first
+    __table_args__ = (db.Index('ix_user_created_id', 'created', 'id'),)
+
+    # The columns that can be shown, the password is never selected
+    COLUMNS = ('id', 'email', 'username', 'created')
 
     @staticmethod
     def serialize_fields() -> list:
@@ -38,3 +45,36 @@ class User(db.Model, UserMixin):
             "created": instance.created,
         }
 
+    @staticmethod
+    def keyset(
+        after: tuple | None = None,
+        limit: int = 50,
+        search: str | None = None,
+        columns: list[str] | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Returns the users after the (created, id) key, the newest first,
+        selecting only the columns along with the ones of the key. The
+        search matches a part of the email or the username
+        """
+        columns = list(dict.fromkeys([*(columns or User.COLUMNS), 'created', 'id']))
+        query = db.session.query(*[getattr(User, column) for column in columns])
+
+        if search:
+            escaped = search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            pattern = f'%{escaped}%'
+            query = query.filter(
+                or_(
+                    User.email.ilike(pattern, escape='\\'),
+                    User.username.ilike(pattern, escape='\\'),
+                )
+            )
+
+        if after is not None:
+            created, id = after
+            query = query.filter(
+                or_(User.created < created, and_(User.created == created, User.id < id))
+            )
+
+        rows = query.order_by(User.created.desc(), User.id.desc()).limit(limit)
+        return [row._asdict() for row in rows]
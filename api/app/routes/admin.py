@@ -1,9 +1,38 @@
-from flask import Blueprint, session, redirect, url_for, flash, render_template
+from flask import (
+    Blueprint,
+    session,
+    redirect,
+    url_for,
+    flash,
+    render_template,
+    send_file,
+    request,
+    stream_with_context,
+    Response as FlaskResponse,
+)
+import datetime
+import base64
+import json
+import csv
+import io
+import os
 
 # Custom modules
 from app.utils.forms import LoginForm
 from app.models.user import User
-from app.constants import ADMIN_USERNAME, ADMIN_PASSWD
+from app.constants import (
+    ADMIN_USERNAME,
+    ADMIN_PASSWD,
+    LOGS_PAGE_SIZE,
+    USERS_PAGE_SIZE,
+    USERS_EXPORT_BATCH,
+)
+from app.lib.dataset import dataset_pool
+from app.lib.energy import daylength_cache
+from app.utils.logreader import LEVELS, log_reader
+from app.utils.profiler import profile_store
+from app.utils.startup import startup
+from app.utils.responses import BadRequestException, NotFoundException
 
 """
 The APIs for accessing admin portal
@@ -50,19 +79,131 @@ def collection_users():
     if not session.get("name"):
         return redirect(url_for("admin"))
 
-    # Get the data of the users collection
-    fields = User.serialize_fields()
+    # The search and the columns are kept in the links to the next pages
+    filters = {
+        key: request.args[key] for key in ("q", "columns") if request.args.get(key)
+    }
+    limit = request.args.get("limit", USERS_PAGE_SIZE, type=int)
+    limit = max(1, min(limit, 500))
+    try:
+        columns = parse_columns(filters.get("columns"))
+        after = parse_key(request.args.get("cursor"))
+    except ValueError as e:
+        return BadRequestException(msg=str(e)).response
 
-    # Get the data about the users
-    users = User.query.all()
-    # Serialize all the users
-    users = list(map(User.serialize, users))
+    # Get a page of the users, with one more to know if there's a next page
+    users = User.keyset(after, limit + 1, filters.get("q"), columns)
+    next_key = format_key(users[limit - 1]) if len(users) > limit else None
 
     return render_template(
-        "collections.jinja", fields=map(lambda f: f.get("name"), fields), data=users
+        "collections.jinja",
+        fields=columns,
+        data=[{column: user[column] for column in columns} for user in users[:limit]],
+        next=next_key,
+        filters=filters,
     )
 
 
+# Streams all the users matching the search, as CSV or NDJSON
+@admin_bp.route("/collections/users/export")
+def export_users():
+    # If we're not logged-in, then return to login
+    if not session.get("name"):
+        return redirect(url_for("admin"))
+
+    fmt = request.args.get("format", "csv")
+    search = request.args.get("q") or None
+    try:
+        columns = parse_columns(request.args.get("columns"))
+        if fmt not in ("csv", "ndjson"):
+            raise ValueError(f"unexpected format: '{fmt}'")
+    except ValueError as e:
+        return BadRequestException(msg=str(e)).response
+
+    def iter_users():
+        """
+        Yields the users a batch at a time, each batch picking up after
+        the key of the last one
+        """
+        after = None
+        while True:
+            users = User.keyset(after, USERS_EXPORT_BATCH, search, columns)
+            for user in users:
+                yield {
+                    column: (
+                        user[column].isoformat()
+                        if isinstance(user[column], datetime.datetime)
+                        else user[column]
+                    )
+                    for column in columns
+                }
+
+            if len(users) < USERS_EXPORT_BATCH:
+                return
+            after = (users[-1]["created"], users[-1]["id"])
+
+    def lines():
+        if fmt == "ndjson":
+            for user in iter_users():
+                yield json.dumps(user) + "\n"
+            return
+
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=columns)
+        writer.writeheader()
+        for i, user in enumerate(iter_users()):
+            writer.writerow(user)
+            if (i + 1) % USERS_EXPORT_BATCH == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    return FlaskResponse(
+        stream_with_context(lines()),
+        mimetype="text/csv" if fmt == "csv" else "application/x-ndjson",
+        headers={"Content-Disposition": f"attachment; filename=users.{fmt}"},
+    )
+
+
+def parse_columns(value: str | None) -> list[str]:
+    """
+    Returns the columns asked for as a comma-separated list, all of them
+    when not given
+    """
+    if not value:
+        return list(User.COLUMNS)
+
+    columns = [column.strip() for column in value.split(",") if column.strip()]
+    for column in columns:
+        if column not in User.COLUMNS:
+            raise ValueError(f"unexpected column: '{column}'")
+
+    return columns
+
+
+def format_key(user: dict) -> str:
+    """
+    Returns the cursor for the page after the user
+    """
+    key = f"{user['created'].isoformat()}|{user['id']}"
+    return base64.urlsafe_b64encode(key.encode()).decode()
+
+
+def parse_key(cursor: str | None) -> tuple | None:
+    """
+    Returns the (created, id) key of the cursor, None when not given
+    """
+    if not cursor:
+        return None
+
+    try:
+        created, id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.datetime.fromisoformat(created), id
+    except ValueError:
+        raise ValueError(f"invalid cursor: '{cursor}'")
+
+
 # The logs for the database
 @admin_bp.route("/logs")
 def logs():
@@ -70,13 +211,85 @@ def logs():
     if not session.get("name"):
         return redirect(url_for("admin"))
 
-    data = None
-    with open("app.log", mode="r+") as log_file:
-        data = log_file.read().strip().split("\n")
-        data = list(map(lambda string: string.split(" - "), data))
+    # The filters are kept in the links to the next pages
+    filters = {
+        key: request.args[key]
+        for key in ("level", "since", "until")
+        if request.args.get(key)
+    }
+    limit = request.args.get("limit", LOGS_PAGE_SIZE, type=int)
+    try:
+        page = log_reader.page(
+            cursor=request.args.get("cursor") or None,
+            limit=max(1, min(limit, 1000)),
+            level=filters.get("level"),
+            since=parse_time(filters.get("since")),
+            until=parse_time(filters.get("until")),
+        )
+    except ValueError as e:
+        return BadRequestException(msg=str(e)).response
+
+    # Return a page of the logs, the latest first
+    return render_template(
+        "logs.jinja",
+        logs=page["records"],
+        next=page["next"],
+        filters=filters,
+        levels=LEVELS,
+    )
+
+
+def parse_time(value: str | None) -> datetime.datetime | None:
+    """
+    Parses the ISO time of a filter, None when not given
+    """
+    if value is None:
+        return None
+
+    try:
+        return datetime.datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"expected an ISO time, got: '{value}'")
+
+
+# The counters of the caches and the coalesced calls
+@admin_bp.route("/stats")
+def stats():
+    # If we're not logged-in, then return to login
+    if not session.get("name"):
+        return redirect(url_for("admin"))
+
+    from app.routes.data import get_response_cache
+
+    return {
+        "responses": get_response_cache().stats,
+        "daylength": daylength_cache.stats,
+        "datasets": dataset_pool.stats,
+        "startup": startup.state,
+    }, 200
+
+
+# The profiles of the requests, taken with ?profile= on the data APIs
+@admin_bp.route("/profiles")
+def profiles():
+    # If we're not logged-in, then return to login
+    if not session.get("name"):
+        return redirect(url_for("admin"))
+
+    return render_template("profiles.jinja", profiles=profile_store.list())
+
+
+@admin_bp.route("/profiles/<name>")
+def profile(name: str):
+    # If we're not logged-in, then return to login
+    if not session.get("name"):
+        return redirect(url_for("admin"))
+
+    path = profile_store.path(name)
+    if path is None:
+        return NotFoundException(msg=f"no profile named '{name}'").response
 
-    # Return the logs of the current operation
-    return render_template("logs.jinja", logs=data)
+    return send_file(os.path.abspath(path), as_attachment=name.endswith(".pstats"))
 
 
 # The route to logout the admin
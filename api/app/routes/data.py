@@ -1,19 +1,188 @@
-from flask import Blueprint, request
+from flask import Blueprint, request, current_app, g, session
+import numpy as np
+import itertools
+import time
 
 # Custom modules
-from app.lib.dataset import NetCDFExtractor, NetCDFRetriever
-from app.lib.energy import get_estimated_energy
+from app.lib.dataset import (
+    ClimatologyUnavailable,
+    NetCDFRetriever,
+    get_climatology,
+    get_extractor,
+    get_data_version,
+    get_sdlr_range,
+    iter_sdlr_range,
+    snap_to_grid,
+)
+from app.lib.energy import (
+    DEFAULT_EFFICIENCY,
+    daylength_cache,
+    get_estimated_energy,
+    get_estimated_energy_batch,
+    get_estimated_energy_profile,
+    get_estimation_year,
+    iter_estimated_energy_batch,
+)
+from app.lib.region import get_regional_energy
+from app.utils.cache import LRUCache, NullCache, RedisCache, ResponseCache
+from app.utils.metrics import metrics, reset_sampled
+from app.utils.profiler import RequestProfiler, profile_store
 from app.utils.validators import get_or_none
-from app.utils.dates import get_current_year
+from app.utils import formats
+from app.utils.dates import get_current_year, get_month_abbr
+from app.constants import (
+    RESPONSE_CACHE_BACKEND,
+    RESPONSE_CACHE_SIZE,
+    RESPONSE_CACHE_TTL,
+    STREAM_CHUNK_SIZE,
+    PROFILE_SAMPLE_INTERVAL,
+    ENERGY_PROFILE_MAX_SITES,
+)
 
 # Custom Responses
-from app.utils.responses import APIBaseException, BadRequestException, Success
+from app.utils.responses import (
+    APIBaseException,
+    BadRequestException,
+    Binary,
+    ServiceUnavailableException,
+    Stream,
+    Success,
+)
 
 """
 The APIs for accessing data portal
 """
 data_bp = Blueprint("data", __name__)
 
+# The cache for the responses, created with the first request
+response_cache = None
+
+
+def get_response_cache() -> ResponseCache:
+    """
+    Returns the response cache for the configured backend
+    """
+    global response_cache
+
+    if response_cache is None:
+        if RESPONSE_CACHE_BACKEND == "redis":
+            # Share the connection used for the sessions
+            backend = RedisCache(
+                current_app.config["SESSION_REDIS"], ttl=RESPONSE_CACHE_TTL
+            )
+        elif RESPONSE_CACHE_BACKEND == "memory":
+            backend = LRUCache(max_size=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL)
+        else:
+            backend = NullCache()
+
+        response_cache = ResponseCache(backend, version=get_data_version)
+
+    return response_cache
+
+
+metrics.collect(
+    "response_cache", lambda: {} if response_cache is None else response_cache.stats
+)
+
+
+@data_bp.before_request
+def start_request():
+    """
+    Samples the request for the timings of its stages
+    """
+    g.metrics_token = metrics.sample()
+    g.metrics_start = time.perf_counter()
+
+
+@data_bp.after_request
+def record_request(response):
+    """
+    Times every request by its route, along with the count of each status
+    """
+    metrics.observe(
+        f"request.{request.endpoint}", time.perf_counter() - g.metrics_start
+    )
+    metrics.count("responses", code=response.status_code)
+    return response
+
+
+@data_bp.before_request
+def start_profile():
+    """
+    Profiles the request when the admin asks for it with ?profile= or
+    the X-Profile header, as "cprofile" or "sample"
+    """
+    mode = request.args.get("profile") or request.headers.get("X-Profile")
+    if not mode or not session.get("name"):
+        return None
+
+    try:
+        g.profiler = RequestProfiler(mode, PROFILE_SAMPLE_INTERVAL)
+    except ValueError as e:
+        return BadRequestException(msg=str(e)).response
+    g.profiler.start()
+
+
+@data_bp.after_request
+def save_profile(response):
+    """
+    Stores the profile of the request, naming it in the X-Profile header.
+    The streamed bodies are produced after this, so their profile is stored
+    when the stream closes
+    """
+    profiler = g.pop("profiler", None)
+    if profiler is None:
+        return response
+
+    name = profile_store.name(profiler, request.endpoint)
+    response.headers["X-Profile"] = name
+
+    def save():
+        profiler.stop()
+        profile_store.save(profiler, name)
+
+    if response.is_streamed:
+        response.call_on_close(save)
+    else:
+        save()
+
+    return response
+
+
+@data_bp.teardown_request
+def end_request(exc):
+    token = g.pop("metrics_token", None)
+    if token is not None:
+        reset_sampled(token)
+
+
+def scale_energy(energy, total, factor: float):
+    """
+    Scales the energy computed for a unit area and efficiency,
+    energy is linear in both
+    """
+    if isinstance(energy, dict):
+        energy = {**energy, "energy": energy["energy"] * factor}
+    else:
+        energy = [{**month, "energy": month["energy"] * factor} for month in energy]
+
+    return energy, total * factor
+
+
+def wants_stream() -> bool:
+    """
+    Checks if the client prefers the response as newline-delimited JSON
+    """
+    best = request.accept_mimetypes.best_match(["application/json", Stream.mimetype])
+    return best == Stream.mimetype
+
+
+def as_nullable(values: np.ndarray) -> list:
+    """
+    Converts the array to lists, with the NaN as nulls
+    """
+    return np.where(np.isnan(values), None, values).tolist()
+
 
 @data_bp.route("/sdlr", methods=["POST"])
 def get_sdlr():
@@ -37,20 +206,88 @@ def get_sdlr():
     except Exception as e:
         return BadRequestException(msg=str(e)).response
 
-    # Get the date for the files
+    # Get the date for the files, shared by all the points within the cell
     sdlr_data = None
     try:
-        sdlr_data = NetCDFExtractor.get_sdlr(files, lat, lon)
+        cache = get_response_cache()
+        sdlr_data = cache.get_or_set(
+            cache.key("sdlr", year, snap_to_grid(files, lat, lon)),
+            lambda: get_extractor().get_sdlr(files, lat, lon),
+        )
     except Exception as e:
         return APIBaseException(
             msg="Internal Server error", code=500, payload={"error": str(e)}
         ).response
 
+    # The binary formats are encoded from the array of the values
+    fmt = formats.negotiate(request.accept_mimetypes)
+    if fmt != formats.JSON:
+        sdlr = np.array([month["sdlr"] for month in sdlr_data], dtype=np.float64)
+        body, headers = formats.encode(
+            fmt,
+            {"month": [get_month_abbr(i) for i in range(len(sdlr))], "sdlr": sdlr},
+            values="sdlr",
+            metadata={"year": year},
+        )
+        return Binary(body, fmt, headers).response
+
     return Success(
         msg="found SDLR data", payload={"year": year, "sdlr": sdlr_data}
     ).response
 
 
+@data_bp.route("/sdlr/range", methods=["POST"])
+def get_sdlr_history():
+    """
+    Returns the SDLR for the given lat, lon over a range of years,
+    as a (year, month) array
+    """
+    json = request.get_json()
+
+    # Get the required values
+    from_ = get_or_none(json, "from")
+    to_ = get_or_none(json, "to", default=from_)
+    lat = get_or_none(json, "lat")
+    lon = get_or_none(json, "lon")
+
+    if from_ is None or lat is None or lon is None:
+        return BadRequestException(msg="from, lat and lon are required").response
+    # bool is an int too, but not a year
+    if any(not isinstance(y, int) or isinstance(y, bool) for y in (from_, to_)):
+        return BadRequestException(msg="from and to have to be integers").response
+
+    try:
+        if wants_stream():
+            rows = iter_sdlr_range(lat, lon, from_, to_)
+            return Stream(
+                msg="found SDLR data",
+                header={"months": [get_month_abbr(i) for i in range(12)]},
+                rows=(
+                    {"year": int(year), "sdlr": as_nullable(sdlr)}
+                    for year, sdlr in rows
+                ),
+            ).response
+
+        history = get_sdlr_range(lat, lon, from_, to_)
+    except ValueError as e:
+        return BadRequestException(msg=str(e)).response
+    except Exception as e:
+        return APIBaseException(
+            msg="Internal Server error", code=500, payload={"error": str(e)}
+        ).response
+
+    sdlr = history["sdlr"]
+    return Success(
+        msg="found SDLR data",
+        payload={
+            "years": history["years"].tolist(),
+            "months": [get_month_abbr(i) for i in range(12)],
+            # The missing months as nulls
+            "sdlr": as_nullable(sdlr),
+        },
+    ).response
+
+
 @data_bp.route("/energy", methods=["POST"])
 def get_energy():
     """
@@ -64,14 +301,272 @@ def get_energy():
     lon = get_or_none(json, "lon")
     area = get_or_none(json, "area")
     efficiency = get_or_none(json, "efficiency")
+    # Where the radiation comes from: the last "year" or the "climatology"
+    source = get_or_none(json, "source", default="year")
+    stat = get_or_none(json, "stat", default="mean")
 
     try:
-        energy, total = get_estimated_energy(lat, lon, area, efficiency, month)
+        energy, total = get_energy_for_cell(lat, lon, month, source, stat)
+        energy, total = scale_energy(
+            energy, total, area * (efficiency or DEFAULT_EFFICIENCY)
+        )
+    except ClimatologyUnavailable as e:
+        return ServiceUnavailableException(msg=str(e)).response
+    except ValueError as e:
+        return BadRequestException(msg=str(e)).response
     except Exception as e:
         return APIBaseException(
             msg="Internal Server error", code=500, payload={"error": str(e)}
         ).response
 
+    fmt = formats.negotiate(request.accept_mimetypes)
+    if fmt != formats.JSON:
+        months = energy if isinstance(energy, list) else [energy]
+        body, headers = formats.encode(
+            fmt,
+            {
+                "month": [month["month"] for month in months],
+                "energy": np.fromiter(
+                    (month["energy"] for month in months), np.float64, len(months)
+                ),
+            },
+            values="energy",
+            metadata={"total": total},
+        )
+        return Binary(body, fmt, headers).response
+
     return Success(
         msg="energy for the year", payload={"months": energy, "total": total}
     ).response
+
+
+def get_energy_for_cell(
+    lat: float, lon: float, month: int | None, source: str = "year", stat: str = "mean"
+):
+    """
+    Returns the energy for a unit area and efficiency, shared by the points
+    within the same cell and latitude band of the sunlight hours
+    """
+    month = month % 12 if month is not None else None
+
+    def compute():
+        result = get_estimated_energy(lat, lon, 1, 1, month, source, stat)
+        return None if result is None else list(result)
+
+    year = get_estimation_year()
+    if source == "climatology":
+        # The rebuilt climatology doesn't share the results of the older one
+        climatology = get_climatology()
+        cell = (source, stat, climatology.mtime, climatology.grid.lookup(lat, lon))
+    else:
+        try:
+            cell = (source, snap_to_grid(NetCDFRetriever().retrieve(year), lat, lon))
+        except ValueError:
+            # Nothing to share when the data is missing
+            return compute()
+
+    cache = get_response_cache()
+    return cache.get_or_set(
+        cache.key("energy", year, month, *cell, int(daylength_cache.key(lat))),
+        compute,
+    )
+
+
+@data_bp.route("/energy/batch", methods=["POST"])
+def get_energy_batch():
+    """
+    Returns the energy generated by the panels of many sites at once,
+    as columns of values for each site
+    """
+    json = request.get_json()
+
+    # Get the required values, as lists with a value for each site
+    month = get_or_none(json, "month")
+    lat = get_or_none(json, "lat")
+    lon = get_or_none(json, "lon")
+    area = get_or_none(json, "area")
+    efficiency = get_or_none(json, "efficiency")
+
+    if lat is None or lon is None or area is None:
+        return BadRequestException(msg="lat, lon and area are required").response
+
+    try:
+        if wants_stream():
+            return stream_energy_batch(lat, lon, area, efficiency, month)
+
+        result = get_estimated_energy_batch(lat, lon, area, efficiency, month)
+    except (ValueError, TypeError) as e:
+        return BadRequestException(msg=str(e)).response
+    except Exception as e:
+        return APIBaseException(
+            msg="Internal Server error", code=500, payload={"error": str(e)}
+        ).response
+
+    if result is None:
+        return ServiceUnavailableException(msg="the data is not up-to-date").response
+
+    return Success(
+        msg="energy for the sites",
+        payload={
+            column: values.tolist() if hasattr(values, "tolist") else values
+            for column, values in result.items()
+        },
+    ).response
+
+
+def stream_energy_batch(lat, lon, area, efficiency, month):
+    """
+    Streams the energy of the sites a line each, estimating a chunk of sites
+    at a time
+    """
+    chunks = iter_estimated_energy_batch(
+        lat, lon, area, efficiency, month, chunk_size=STREAM_CHUNK_SIZE
+    )
+    if chunks is None:
+        return ServiceUnavailableException(msg="the data is not up-to-date").response
+
+    # The months are known from the first chunk, computed before the stream starts
+    first = next(chunks, None)
+
+    def rows():
+        if first is None:
+            return
+        for chunk in itertools.chain([first], chunks):
+            for site in zip(
+                chunk["lat"], chunk["lon"], chunk["energy"], chunk["total"]
+            ):
+                yield {
+                    "lat": float(site[0]),
+                    "lon": float(site[1]),
+                    "energy": as_nullable(site[2]),
+                    "total": None if np.isnan(site[3]) else float(site[3]),
+                }
+
+    return Stream(
+        msg="energy for the sites",
+        header={"months": [] if first is None else first["months"]},
+        rows=rows(),
+    ).response
+
+
+@data_bp.route("/energy/region", methods=["POST"])
+def get_energy_region():
+    """
+    Returns the energy potential of a region given by a bbox or a GeoJSON
+    polygon, with the yield of each cell as a (lat, lon) array
+    """
+    json = request.get_json()
+
+    # Get the required values
+    bbox = get_or_none(json, "bbox")
+    polygon = get_or_none(json, "polygon")
+    efficiency = get_or_none(json, "efficiency")
+    coverage = get_or_none(json, "coverage", default=1.0)
+    source = get_or_none(json, "source", default="year")
+    stat = get_or_none(json, "stat", default="mean")
+
+    try:
+        result = get_regional_energy(bbox, polygon, efficiency, coverage, source, stat)
+    except ClimatologyUnavailable as e:
+        return ServiceUnavailableException(msg=str(e)).response
+    except (ValueError, TypeError) as e:
+        return BadRequestException(msg=str(e)).response
+    except Exception as e:
+        return APIBaseException(
+            msg="Internal Server error", code=500, payload={"error": str(e)}
+        ).response
+
+    if result is None:
+        return ServiceUnavailableException(msg="the data is not up-to-date").response
+
+    return Success(
+        msg="energy for the region",
+        payload={
+            **result,
+            "lat": result["lat"].tolist(),
+            "lon": result["lon"].tolist(),
+            # The cells outside the region as nulls
+            "yield": as_nullable(result["yield"]),
+            "monthly": result["monthly"].tolist(),
+        },
+    ).response
+
+
+@data_bp.route("/energy/profile", methods=["POST"])
+def get_energy_profile():
+    """
+    Returns the energy generated by tilted panels for every day or hour of
+    the year, for one or many sites
+    """
+    json = request.get_json()
+
+    # Get the required values, as values or lists with a value for each site
+    lat = get_or_none(json, "lat")
+    lon = get_or_none(json, "lon")
+    area = get_or_none(json, "area")
+    efficiency = get_or_none(json, "efficiency")
+    tilt = get_or_none(json, "tilt")
+    azimuth = get_or_none(json, "azimuth")
+    resolution = get_or_none(json, "resolution", default="daily")
+    source = get_or_none(json, "source", default="year")
+    stat = get_or_none(json, "stat", default="mean")
+
+    if lat is None or lon is None or area is None:
+        return BadRequestException(msg="lat, lon and area are required").response
+    if np.size(lat) > ENERGY_PROFILE_MAX_SITES:
+        return BadRequestException(
+            msg=f"at most {ENERGY_PROFILE_MAX_SITES} sites at once"
+        ).response
+
+    try:
+        result = get_estimated_energy_profile(
+            lat, lon, area, efficiency, tilt, azimuth, resolution, source, stat
+        )
+    except ClimatologyUnavailable as e:
+        return ServiceUnavailableException(msg=str(e)).response
+    except (ValueError, TypeError) as e:
+        return BadRequestException(msg=str(e)).response
+    except Exception as e:
+        return APIBaseException(
+            msg="Internal Server error", code=500, payload={"error": str(e)}
+        ).response
+
+    if result is None:
+        return ServiceUnavailableException(msg="the data is not up-to-date").response
+
+    fmt = formats.negotiate(request.accept_mimetypes)
+    if fmt == formats.NPY:
+        # The (site, day) or (site, day, hour) array, with the sites as headers
+        body, headers = formats.encode(
+            fmt,
+            {
+                "lat": result["lat"].tolist(),
+                "lon": result["lon"].tolist(),
+                "energy": result["energy"],
+            },
+            values="energy",
+            metadata={"start": result["dates"][0], "resolution": resolution},
+        )
+        return Binary(body, fmt, headers).response
+    if fmt == formats.ARROW:
+        # A row for each step of each site
+        energy = result["energy"].reshape(len(result["lat"]), -1)
+        body, headers = formats.encode(
+            fmt,
+            {
+                "site": np.repeat(np.arange(energy.shape[0]), energy.shape[1]),
+                "step": np.tile(np.arange(energy.shape[1]), energy.shape[0]),
+                "energy": energy.ravel(),
+            },
+            values="energy",
+            metadata={"start": result["dates"][0], "resolution": resolution},
+        )
+        return Binary(body, fmt, headers).response
+
+    return Success(
+        msg=f"{resolution} energy for the sites",
+        payload={
+            column: as_nullable(values) if isinstance(values, np.ndarray) else values
+            for column, values in result.items()
+        },
+    ).response
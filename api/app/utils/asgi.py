@@ -0,0 +1,206 @@
+from a2wsgi import WSGIMiddleware
+import hashlib
+import asyncio
+import json
+
+"""
+Serves the WSGI app from an event loop through a2wsgi, the blocking
+requests run in its bounded pool of threads while the loop keeps
+accepting connections
+"""
+
+
+async def read_body(receive) -> bytes | None:
+    """
+    Reads the whole body of the request, None if the client disconnects
+    """
+    body = bytearray()
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return None
+
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return bytes(body)
+
+
+def replay_body(body: bytes):
+    """
+    Returns an ASGI receive handing out the body that was already read
+    """
+    messages = iter([{"type": "http.request", "body": body, "more_body": False}])
+
+    async def receive():
+        return next(messages, {"type": "http.disconnect"})
+
+    return receive
+
+
+class AsyncApp:
+    """
+    ASGI app running a WSGI app in a bounded pool of threads. The health
+    checks are answered from the loop, and the identical requests under the
+    coalesced prefix that arrive together share a single run
+    """
+
+    # The headers telling apart the responses to the same path and body
+    VARY = (b"accept", b"content-type", b"cookie", b"authorization")
+
+    def __init__(
+        self,
+        wsgi_app,
+        workers: int = 32,
+        max_pending: int = 256,
+        coalesce_prefix: str | None = None,
+        health=None,
+        health_path: str = "/health",
+        on_startup=None,
+    ):
+        self.app = WSGIMiddleware(wsgi_app, workers=workers)
+        self.max_pending = max_pending
+        self.coalesce_prefix = coalesce_prefix
+        self.health = health
+        self.health_path = health_path
+        self.on_startup = on_startup
+
+        self.pending = 0
+        self.executed = 0
+        self.coalesced = 0
+        self.rejected = 0
+
+        self.__inflight: dict[tuple, asyncio.Task] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self.__lifespan(receive, send)
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        # Answered without waiting on the workers
+        if self.health is not None and scope["path"] == self.health_path:
+            return await send_json(send, 200, self.health())
+
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            msg = "too many requests pending"
+            return await send_json(
+                send,
+                503,
+                {
+                    "msg": "Service Unavailable: " + msg,
+                    "raw_msg": msg,
+                    "code": 503,
+                    "payload": None,
+                },
+            )
+
+        if not self.__coalesces(scope):
+            return await self.__run(scope, receive, send)
+
+        body = await read_body(receive)
+        if body is None:
+            return
+
+        key = self.__coalescing_key(scope, body)
+        task = self.__inflight.get(key)
+        if task is None:
+            task = self.__inflight[key] = asyncio.ensure_future(
+                self.__run_buffered(scope, body)
+            )
+            task.add_done_callback(lambda _: self.__inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+
+        # Shielded, so a client leaving doesn't cancel the run for the others
+        for message in await asyncio.shield(task):
+            await send(message)
+
+    def __coalesces(self, scope: dict) -> bool:
+        """
+        Whether the identical requests are run once for all of them
+        """
+        if self.coalesce_prefix is None or not scope["path"].startswith(
+            self.coalesce_prefix
+        ):
+            return False
+
+        # The streamed responses are sent as they're computed
+        headers = dict(scope.get("headers", []))
+        return b"ndjson" not in headers.get(b"accept", b"")
+
+    def __coalescing_key(self, scope: dict, body: bytes) -> tuple:
+        """
+        Returns the key shared by the identical requests
+        """
+        headers = dict(scope.get("headers", []))
+        return (
+            scope["method"],
+            scope["path"],
+            scope.get("query_string", b""),
+            tuple(headers.get(name) for name in self.VARY),
+            hashlib.blake2b(body, digest_size=16).digest(),
+        )
+
+    async def __run(self, scope: dict, receive, send):
+        """
+        Runs the request in the pool, counting it as pending until it's done
+        """
+        self.pending += 1
+        self.executed += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.pending -= 1
+
+    async def __run_buffered(self, scope: dict, body: bytes) -> list[dict]:
+        """
+        Runs the request, returning the messages of the whole response
+        """
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        await self.__run(scope, replay_body(body), send)
+        return messages
+
+    async def __lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                if self.on_startup is not None:
+                    self.on_startup()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.app.executor.shutdown(wait=False, cancel_futures=True)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    @property
+    def stats(self):
+        return {
+            "pending": self.pending,
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "rejected": self.rejected,
+            "inflight": len(self.__inflight),
+        }
+
+
+async def send_json(send, status: int, payload: dict):
+    """
+    Sends a whole JSON response
+    """
+    body = json.dumps(payload).encode()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,227 @@
+from collections import OrderedDict
+from concurrent.futures import Future
+from logger import logger
+import threading
+import json
+import time
+
+"""
+Caches for the responses of the API
+"""
+
+
+class LRUCache:
+    """
+    In-process cache, evicting the least recently used entries
+    """
+
+    shared = False
+
+    def __init__(self, max_size: int = 1024, ttl: int = 3600):
+        self.max_size = max_size
+        self.ttl = ttl
+
+        self.__entries: OrderedDict[str, tuple[float, object]] = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def get(self, key: str):
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None:
+                return None
+
+            expires, value = entry
+            if expires < time.monotonic():
+                del self.__entries[key]
+                return None
+
+            self.__entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value):
+        with self.__lock:
+            self.__entries[key] = (time.monotonic() + self.ttl, value)
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.max_size:
+                self.__entries.popitem(last=False)
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+
+
+class RedisCache:
+    """
+    Cache shared between the workers through redis, the values are stored
+    as JSON. Redis being unavailable is treated as a miss
+    """
+
+    # The keys carry the version of the data, so the stale ones are left
+    # to expire rather than scanned for by every worker
+    shared = True
+
+    def __init__(self, client, ttl: int = 3600, prefix: str = "solarwise:cache:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key: str):
+        try:
+            value = self.client.get(self.prefix + key)
+        except Exception as e:
+            logger.error(msg=f"redis cache unavailable: {e}")
+            return None
+
+        return None if value is None else json.loads(value)
+
+    def set(self, key: str, value):
+        try:
+            self.client.setex(self.prefix + key, self.ttl, json.dumps(value))
+        except Exception as e:
+            logger.error(msg=f"redis cache unavailable: {e}")
+
+    def clear(self):
+        try:
+            for key in self.client.scan_iter(match=self.prefix + "*"):
+                self.client.delete(key)
+        except Exception as e:
+            logger.error(msg=f"redis cache unavailable: {e}")
+
+
+class NullCache:
+    """
+    Cache that never holds anything, when caching is turned off
+    """
+
+    shared = False
+
+    def get(self, key: str):
+        return None
+
+    def set(self, key: str, value):
+        pass
+
+    def clear(self):
+        pass
+
+
+class ResponseCache:
+    """
+    Wraps a cache backend, clearing it when the version of the data changes
+    """
+
+    def __init__(self, backend, version=lambda: None):
+        self.backend = backend
+        self.version = version
+
+        self.hits = 0
+        self.misses = 0
+        self.__seen_version = None
+        self.__lock = threading.Lock()
+        # The misses being computed, shared by the callers of the same key
+        self.__flight = SingleFlight()
+
+    def key(self, *parts) -> str:
+        """
+        Returns the key for the parts, tagged with the version of the data
+        """
+        version = self.version()
+        with self.__lock:
+            stale = self.__seen_version not in (None, version)
+            self.__seen_version = version
+
+        # Drop the entries computed from the older data, once per process.
+        # The shared backends can't be cleared on the request path
+        if stale and not self.backend.shared:
+            self.backend.clear()
+
+        return ":".join(map(str, (version, *parts)))
+
+    def get_or_set(self, key: str, compute):
+        """
+        Returns the cached value for the key, computing and storing it on a miss.
+        The concurrent misses of a key share one computation. None values are
+        not cached
+        """
+        value = self.backend.get(key)
+        with self.__lock:
+            if value is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        if value is not None:
+            return value
+
+        def compute_and_set():
+            value = compute()
+            if value is not None:
+                self.backend.set(key, value)
+            return value
+
+        return self.__flight.do(key, compute_and_set)
+
+    def clear(self):
+        self.backend.clear()
+
+    @property
+    def stats(self):
+        flight = self.__flight.stats
+        with self.__lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "executed": flight["executed"],
+                "coalesced": flight["coalesced"],
+                "inflight": flight["inflight"],
+            }
+
+
+class SingleFlight:
+    """
+    Runs a computation once for the concurrent callers with the same key,
+    the ones arriving while it runs wait for it and share its result
+    """
+
+    def __init__(self):
+        self.executed = 0
+        self.coalesced = 0
+
+        self.__calls: dict[object, Future] = {}
+        self.__lock = threading.Lock()
+
+    def do(self, key, compute):
+        """
+        Returns the result of compute, or of the call for the key in flight.
+        The errors are raised to all the callers sharing the call
+        """
+        with self.__lock:
+            call = self.__calls.get(key)
+            leader = call is None
+            if leader:
+                self.executed += 1
+                call = self.__calls[key] = Future()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return call.result()
+
+        try:
+            call.set_result(compute())
+        except BaseException as e:
+            call.set_exception(e)
+        finally:
+            with self.__lock:
+                del self.__calls[key]
+
+        return call.result()
+
+    @property
+    def stats(self):
+        with self.__lock:
+            return {
+                "executed": self.executed,
+                "coalesced": self.coalesced,
+                "inflight": len(self.__calls),
+            }
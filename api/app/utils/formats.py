@@ -0,0 +1,83 @@
+import importlib.util
+import numpy as np
+import io
+
+# Optional, Arrow responses are only offered when pyarrow is installed,
+# it's imported on the first Arrow response
+HAS_ARROW = importlib.util.find_spec("pyarrow") is not None
+
+"""
+Binary encodings of the columns of the data responses
+"""
+
+JSON = "application/json"
+# Apache Arrow IPC stream, a record batch with a column each
+ARROW = "application/vnd.apache.arrow.stream"
+# NumPy .npy, the little-endian float64 array of the values only
+NPY = "application/x-npy"
+
+
+def get_formats() -> list[str]:
+    """
+    Returns the formats that can be offered, JSON first as the default
+    """
+    return [JSON, ARROW, NPY] if HAS_ARROW else [JSON, NPY]
+
+
+def negotiate(accept) -> str:
+    """
+    Returns the format the Accept header of the request prefers
+    """
+    return accept.best_match(get_formats(), default=JSON)
+
+
+def encode_npy(values) -> bytes:
+    """
+    Encodes the values as a .npy buffer of little-endian float64, the
+    header of the format holds the shape
+    """
+    buffer = io.BytesIO()
+    np.lib.format.write_array(
+        buffer, np.ascontiguousarray(values, dtype="<f8"), allow_pickle=False
+    )
+    return buffer.getvalue()
+
+
+def encode_arrow(columns: dict, metadata: dict | None = None) -> bytes:
+    """
+    Encodes the columns as an Arrow IPC stream of a single record batch,
+    the numeric columns are wrapped without copying
+    """
+    import pyarrow as pa
+
+    batch = pa.record_batch(
+        [pa.array(np.asarray(values)) for values in columns.values()],
+        names=list(columns),
+        metadata={key: str(value) for key, value in (metadata or {}).items()},
+    )
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+
+def encode(fmt: str, columns: dict, values: str, metadata: dict | None = None):
+    """
+    Returns the (body, headers) for the columns in the format, the .npy
+    holds the values column only with the rest of the columns and the
+    metadata sent as headers
+    """
+    if fmt == ARROW:
+        return encode_arrow(columns, metadata), {}
+
+    fields = {name: list(column) for name, column in columns.items() if name != values}
+    fields.update(metadata or {})
+
+    headers = {}
+    for key, value in fields.items():
+        if isinstance(value, list):
+            value = ",".join(map(str, value))
+        headers[f"X-{key.title()}"] = str(value)
+
+    return encode_npy(columns[values]), headers
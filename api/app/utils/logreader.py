@@ -0,0 +1,324 @@
+import threading
+import datetime
+import bisect
+import json
+import glob
+import os
+import re
+
+# Custom modules
+from logger import filename
+from app.constants import LOGS_MAX_SCAN
+
+"""
+Reads the logs of the app from the end, a page at a time. The files are
+read backward by blocks and the record starts found along the way are kept
+in a sparse index, so the cost of a page doesn't grow with the logs
+"""
+
+# The size of the blocks read backward, and of the ranges scanned forward
+BLOCK = 64 * 1024
+# The most record starts kept in the index of a file
+MAX_INDEX = 4096
+
+# The lines starting a record, as written by the formatter of the logger,
+# the others are the continuation of the record before them
+RECORD = re.compile(rb"(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d,\d{3}) - ([A-Z]+) - ")
+# The records written as JSON lines, with LOG_JSON
+JSON_RECORD = re.compile(
+    rb'\{"time": "(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d,\d{3})", "level": "([A-Z]+)", '
+)
+LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40, "CRITICAL": 50}
+
+
+def format_time(time: datetime.datetime) -> bytes:
+    """
+    Returns the time as written in the records, which sort as they're compared
+    """
+    return f"{time:%Y-%m-%d %H:%M:%S},{time.microsecond // 1000:03d}".encode()
+
+
+def iter_lines_backward(file, end: int):
+    """
+    Yields the (offset, line) of the lines before the end, the last first
+    """
+    position, head = end, b""
+    while position > 0:
+        size = min(BLOCK, position)
+        position -= size
+        file.seek(position)
+        lines = (file.read(size) + head).split(b"\n")
+
+        # The first piece may start in the block before
+        head = lines[0]
+        starts = [position + len(head) + 1]
+        for line in lines[1:-1]:
+            starts.append(starts[-1] + len(line) + 1)
+
+        for start, line in zip(reversed(starts), reversed(lines[1:])):
+            if line:
+                yield start, line
+
+    if head:
+        yield 0, head
+
+
+def match_record(line: bytes):
+    """
+    Returns the match of the time and the level if the line starts a record
+    """
+    return RECORD.match(line) or JSON_RECORD.match(line)
+
+
+def get_message(match, text: bytes) -> str:
+    """
+    Returns the message of the record, with its traceback if any
+    """
+    if match.re is RECORD:
+        return text[match.end() :].decode(errors="replace")
+
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return text.decode(errors="replace")
+    return "\n".join(filter(None, (data.get("message"), data.get("exc_info"))))
+
+
+def iter_records_backward(file, end: int):
+    """
+    Yields the (offset, match, text) of the records before the end, the
+    last first, with the continuation lines joined to their record
+    """
+    continuation = []
+    for offset, line in iter_lines_backward(file, end):
+        match = match_record(line)
+        if match is None:
+            continuation.append(line)
+            continue
+
+        yield offset, match, b"\n".join([line, *reversed(continuation)])
+        continuation = []
+
+
+def find_record(file, offset: int, end: int) -> tuple[int, bytes] | None:
+    """
+    Returns the (offset, time) of the first record starting within the
+    offset and the end, None if there's none
+    """
+    file.seek(max(offset - 1, 0))
+    # Skip the rest of the line the offset falls in
+    if offset > 0:
+        file.readline()
+
+    while file.tell() < end:
+        start = file.tell()
+        match = match_record(file.readline())
+        if match is not None:
+            return start, match.group(1)
+
+    return None
+
+
+class LogFile:
+    """
+    One of the log files, with the sparse index of the (offset, time) of
+    the record starts found in it
+    """
+
+    def __init__(self, path: str, stat: os.stat_result):
+        self.path = path
+        self.inode = stat.st_ino
+        self.size = stat.st_size
+        self.mtime = stat.st_mtime
+
+        self.offsets: list[int] = []
+        self.times: list[bytes] = []
+        self.__lock = threading.Lock()
+
+    def update(self, path: str, stat: os.stat_result):
+        """
+        Follows the file across the rotations, dropping the index if it was
+        truncated
+        """
+        if stat.st_size < self.size:
+            with self.__lock:
+                self.offsets, self.times = [], []
+        self.path, self.size, self.mtime = path, stat.st_size, stat.st_mtime
+
+    def remember(self, offset: int, time: bytes):
+        with self.__lock:
+            i = bisect.bisect_left(self.offsets, offset)
+            if len(self.offsets) < MAX_INDEX and (
+                i == len(self.offsets) or self.offsets[i] != offset
+            ):
+                self.offsets.insert(i, offset)
+                self.times.insert(i, time)
+
+    def seek_time(self, file, time: bytes, end: int) -> int:
+        """
+        Returns the offset of the first record after the time, the end if
+        there's none. The index narrows the range, which is then bisected
+        by probing for the record starts
+        """
+        # The other requests add to the index while it's read
+        with self.__lock:
+            i = bisect.bisect_right(self.times, time)
+            lo = self.offsets[i - 1] + 1 if i > 0 else 0
+            hi = answer = min(self.offsets[i], end) if i < len(self.offsets) else end
+
+        while hi - lo > BLOCK:
+            mid = (lo + hi) // 2
+            found = find_record(file, mid, hi)
+            if found is None:
+                # Nothing starts within mid and hi
+                hi = mid
+                continue
+
+            start, stamp = found
+            self.remember(start, stamp)
+            if stamp > time:
+                hi = answer = start
+            else:
+                lo = start + 1
+
+        found = find_record(file, lo, hi)
+        while found is not None:
+            start, stamp = found
+            if stamp > time:
+                return start
+            found = find_record(file, start + 1, hi)
+
+        return answer
+
+
+class LogReader:
+    """
+    Pages through the log file and its rotated files, the latest records
+    first. The cursors point at a record start in one of the files, which
+    they follow by inode as the files are rotated
+    """
+
+    def __init__(self, path: str, max_scan: int = LOGS_MAX_SCAN):
+        self.path = path
+        self.max_scan = max_scan
+
+        self.__files: dict[int, LogFile] = {}
+        self.__lock = threading.Lock()
+
+    def files(self) -> list[LogFile]:
+        """
+        Returns the log file and the rotated ones, the latest first
+        """
+        found, current = {}, None
+        for path in [self.path] + glob.glob(glob.escape(self.path) + ".*"):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if path == self.path:
+                current = stat.st_ino
+
+            with self.__lock:
+                logfile = self.__files.get(stat.st_ino)
+                if logfile is None:
+                    logfile = LogFile(path, stat)
+                else:
+                    logfile.update(path, stat)
+            found[stat.st_ino] = logfile
+
+        with self.__lock:
+            self.__files = found
+
+        rotated = sorted(
+            (logfile for inode, logfile in found.items() if inode != current),
+            key=lambda logfile: logfile.mtime,
+            reverse=True,
+        )
+        return ([found[current]] if current is not None else []) + rotated
+
+    def page(
+        self,
+        cursor: str | None = None,
+        limit: int = 100,
+        level: str | None = None,
+        since: datetime.datetime | None = None,
+        until: datetime.datetime | None = None,
+    ) -> dict:
+        """
+        Returns the records before the cursor, the latest first, of the
+        level or above and within the times. The next cursor is None once
+        the logs are over, a page stops early past max_scan bytes
+        """
+        if level is not None and level not in LEVELS:
+            raise ValueError(f"unexpected level: '{level}'")
+        min_level = LEVELS[level] if level is not None else 0
+        since = format_time(since) if since is not None else None
+        until = format_time(until) if until is not None else None
+
+        files = self.files()
+        start, end = 0, None
+        if cursor is not None:
+            inode, end = parse_cursor(cursor)
+            start = next(
+                (i for i, logfile in enumerate(files) if logfile.inode == inode), None
+            )
+            # The file is gone, rotated out of the logs
+            if start is None:
+                return {"records": [], "next": None}
+
+        records, scanned = [], 0
+        for logfile in files[start:]:
+            with open(logfile.path, mode="rb") as file:
+                file_end = logfile.size if end is None else min(end, logfile.size)
+                # The files before have nothing older than the time
+                if until is not None:
+                    file_end = logfile.seek_time(file, until, file_end)
+                    until = None if file_end > 0 else until
+                end = None
+
+                for offset, match, text in iter_records_backward(file, file_end):
+                    stamp, name = match.group(1), match.group(2).decode()
+                    if since is not None and stamp < since:
+                        return {"records": records, "next": None}
+
+                    if LEVELS.get(name, 0) >= min_level:
+                        records.append(
+                            {
+                                "time": stamp.decode(),
+                                "level": name,
+                                "message": get_message(match, text),
+                            }
+                        )
+
+                    if (
+                        len(records) >= limit
+                        or scanned + file_end - offset > self.max_scan
+                    ):
+                        logfile.remember(offset, stamp)
+                        return {
+                            "records": records,
+                            "next": format_cursor(logfile.inode, offset),
+                        }
+
+                scanned += file_end
+
+        return {"records": records, "next": None}
+
+
+def format_cursor(inode: int, offset: int) -> str:
+    return f"{inode:x}.{offset:x}"
+
+
+def parse_cursor(cursor: str) -> tuple[int, int]:
+    """
+    Returns the (inode, offset) of the cursor
+    """
+    try:
+        inode, offset = cursor.split(".")
+        return int(inode, 16), int(offset, 16)
+    except ValueError:
+        raise ValueError(f"invalid cursor: '{cursor}'")
+
+
+# The logs of the app
+log_reader = LogReader(filename)
@@ -0,0 +1,222 @@
+from flask.json.provider import DefaultJSONProvider
+from contextvars import ContextVar
+from contextlib import nullcontext
+import threading
+import bisect
+import random
+import time
+
+# Custom modules
+from app.constants import METRICS_SAMPLE_RATE
+
+"""
+Timings of the stages of the data path and the counters around them,
+exposed in the Prometheus text format
+"""
+
+# The upper bounds of the histogram buckets, in seconds
+BUCKETS = (
+    0.0001,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+# Whether the spans of the current request are timed, None outside the requests
+__sampled: ContextVar[bool | None] = ContextVar("sampled", default=None)
+# Shared by the spans that aren't timed
+__untimed = nullcontext()
+
+
+class Histogram:
+    """
+    Counts of the observations within each of the buckets, with their sum
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Span:
+    """
+    Times a block, recording it in the histogram of its name when it exits
+    """
+
+    __slots__ = ("metrics", "name", "start")
+
+    def __init__(self, metrics, name: str):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Metrics:
+    """
+    Histograms of the timed spans and counters, along with the collectors
+    reading the stats kept elsewhere when scraped
+    """
+
+    def __init__(
+        self, sample_rate: float = METRICS_SAMPLE_RATE, prefix: str = "solarwise"
+    ):
+        self.sample_rate = sample_rate
+        self.prefix = prefix
+
+        self.__histograms: dict[str, Histogram] = {}
+        # Keyed by the name and the sorted (label, value) pairs
+        self.__counters: dict[tuple[str, tuple], float] = {}
+        self.__collectors: dict[str, object] = {}
+        self.__lock = threading.Lock()
+
+    def sample(self):
+        """
+        Decides if the spans of the request starting are timed, returning
+        the token to reset it with when it ends
+        """
+        return set_sampled(random.random() < self.sample_rate)
+
+    def span(self, name: str):
+        """
+        Returns a context timing the block, or doing nothing when it isn't
+        sampled. Outside the requests, each span is sampled on its own
+        """
+        sampled = get_sampled()
+        if sampled is None:
+            sampled = self.sample_rate > 0 and random.random() < self.sample_rate
+
+        return Span(self, name) if sampled else get_untimed()
+
+    def observe(self, name: str, seconds: float):
+        with self.__lock:
+            histogram = self.__histograms.get(name)
+            if histogram is None:
+                histogram = self.__histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    def count(self, name: str, value: float = 1, **labels):
+        """
+        Adds to the counter for the labels, counted for every call regardless
+        of the sampling
+        """
+        key = (name, tuple(sorted((label, str(v)) for label, v in labels.items())))
+        with self.__lock:
+            self.__counters[key] = self.__counters.get(key, 0) + value
+
+    def collect(self, name: str, read):
+        """
+        Registers read() returning a dict of the values for the name, read
+        when the metrics are exported
+        """
+        self.__collectors[name] = read
+
+    def export(self) -> str:
+        """
+        Returns the metrics in the Prometheus text format
+        """
+        with self.__lock:
+            histograms = {
+                name: (list(h.counts), h.sum, h.count)
+                for name, h in sorted(self.__histograms.items())
+            }
+            counters = dict(sorted(self.__counters.items()))
+
+        lines = [
+            f"# HELP {self.prefix}_span_seconds Time spent in the stages of the data path, sampled at {self.sample_rate}",
+            f"# TYPE {self.prefix}_span_seconds histogram",
+        ]
+        for name, (counts, total, count) in histograms.items():
+            cumulative = 0
+            for bound, bucket in zip((*BUCKETS, "+Inf"), counts):
+                cumulative += bucket
+                lines.append(
+                    f'{self.prefix}_span_seconds_bucket{{span="{name}",le="{bound}"}} {cumulative}'
+                )
+            lines.append(f'{self.prefix}_span_seconds_sum{{span="{name}"}} {total}')
+            lines.append(f'{self.prefix}_span_seconds_count{{span="{name}"}} {count}')
+
+        typed = set()
+        for (name, labels), value in counters.items():
+            # A single type line for all the labels of the counter
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {self.prefix}_{name}_total counter")
+            lines.append(f"{self.prefix}_{name}_total{format_labels(labels)} {value}")
+
+        for name, read in sorted(self.__collectors.items()):
+            for key, value in read().items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    lines.append(f"# TYPE {self.prefix}_{name}_{key} gauge")
+                    lines.append(f"{self.prefix}_{name}_{key} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """
+    The JSON of the app, timing the encoding of the responses
+    """
+
+    def response(self, *args, **kwargs):
+        with metrics.span("json.encode"):
+            return super().response(*args, **kwargs)
+
+
+def format_labels(labels: tuple) -> str:
+    """
+    Returns the (label, value) pairs as written after a metric's name
+    """
+    if not labels:
+        return ""
+
+    # The backslashes, quotes and line breaks are escaped in the values
+    escaped = (
+        (label, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for label, value in labels
+    )
+    return "{" + ",".join(f'{label}="{value}"' for label, value in escaped) + "}"
+
+
+def get_sampled() -> bool | None:
+    return __sampled.get()
+
+
+def set_sampled(sampled: bool | None):
+    return __sampled.set(sampled)
+
+
+def reset_sampled(token):
+    __sampled.reset(token)
+
+
+def get_untimed():
+    return __untimed
+
+
+# The metrics of the app
+metrics = Metrics()
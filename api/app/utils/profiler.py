@@ -0,0 +1,161 @@
+from collections import Counter
+import threading
+import cProfile
+import datetime
+import time
+import sys
+import os
+
+# Custom modules
+from app.constants import PROFILE_FOLDER, PROFILE_MAX_FILES
+
+"""
+Profilers for single requests, and the bounded folder their results are kept in
+"""
+
+# The profilers by the name asked for, with the extension of their output
+MODES = {"cprofile": ".pstats", "sample": ".collapsed"}
+
+
+class SamplingProfiler:
+    """
+    Samples the stack of a thread at an interval, counting the stacks in the
+    collapsed format read by the flamegraph tools
+    """
+
+    def __init__(self, interval: float = 0.001, thread_id: int | None = None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.stacks = Counter()
+
+        self.__running = threading.Event()
+        self.__thread = None
+
+    def start(self):
+        self.__running.set()
+        self.__thread = threading.Thread(
+            target=self.__sample, name="profiler", daemon=True
+        )
+        self.__thread.start()
+
+    def stop(self):
+        self.__running.clear()
+        self.__thread.join()
+
+    def __sample(self):
+        while self.__running.is_set():
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(
+                        f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                    )
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+
+            time.sleep(self.interval)
+
+    def dump(self, path: str):
+        with open(path, mode="w") as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f"{stack} {count}\n")
+
+
+class RequestProfiler:
+    """
+    Profiles the thread of a request, with the deterministic cProfile or
+    the sampling profiler
+    """
+
+    def __init__(self, mode: str, interval: float = 0.001):
+        if mode not in MODES:
+            raise ValueError(f"unexpected profiler: '{mode}'")
+
+        self.mode = mode
+        self.profiler = (
+            cProfile.Profile() if mode == "cprofile" else SamplingProfiler(interval)
+        )
+
+    def start(self):
+        if self.mode == "cprofile":
+            self.profiler.enable()
+        else:
+            self.profiler.start()
+
+    def stop(self):
+        if self.mode == "cprofile":
+            self.profiler.disable()
+        else:
+            self.profiler.stop()
+
+    def dump(self, path: str):
+        if self.mode == "cprofile":
+            self.profiler.dump_stats(path)
+        else:
+            self.profiler.dump(path)
+
+
+class ProfileStore:
+    """
+    Folder of the profiles, keeping only the latest ones
+    """
+
+    def __init__(self, folder: str, max_files: int = 50):
+        self.folder = folder
+        self.max_files = max_files
+        self.__lock = threading.Lock()
+
+    @staticmethod
+    def name(profiler: RequestProfiler, label: str) -> str:
+        """
+        Returns the name of the file for a new profile
+        """
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        label = "".join(c if c.isalnum() else "_" for c in label).strip("_")
+        return f"{stamp}-{label}{MODES[profiler.mode]}"
+
+    def save(self, profiler: RequestProfiler, name: str):
+        """
+        Writes the profile under the name, dropping the oldest ones over the limit
+        """
+        with self.__lock:
+            os.makedirs(self.folder, exist_ok=True)
+            profiler.dump(os.path.join(self.folder, name))
+
+            for old in self.list()[self.max_files :]:
+                os.remove(os.path.join(self.folder, old["name"]))
+
+    def list(self) -> list[dict]:
+        """
+        Returns the profiles, the latest first
+        """
+        if not os.path.isdir(self.folder):
+            return []
+
+        profiles = []
+        for entry in os.scandir(self.folder):
+            if os.path.splitext(entry.name)[1] in MODES.values():
+                stat = entry.stat()
+                profiles.append(
+                    {
+                        "name": entry.name,
+                        "size": stat.st_size,
+                        "created": datetime.datetime.fromtimestamp(stat.st_mtime),
+                    }
+                )
+
+        return sorted(profiles, key=lambda profile: profile["name"], reverse=True)
+
+    def path(self, name: str) -> str | None:
+        """
+        Returns the path of the profile, None if there's no such profile
+        """
+        if name not in {profile["name"] for profile in self.list()}:
+            return None
+        return os.path.join(self.folder, name)
+
+
+# The profiles of the app
+profile_store = ProfileStore(PROFILE_FOLDER, PROFILE_MAX_FILES)
@@ -1,3 +1,4 @@
+from flask import Response as FlaskResponse, stream_with_context
 from logger import logger
 import json
 
@@ -12,11 +13,6 @@ class Response:
         self.code = code
         self.payload = payload
 
-        try:
-            self.payload = json.loads(payload)
-        except Exception as e:
-            self.payload = payload
-
     @property
     def response(self):
         return {
@@ -32,6 +28,58 @@ class Success(Response):
         super().__init__(msg, code=200, payload=payload)
 
 
+class Stream:
+    """
+    Response streamed as newline-delimited JSON while the rows are being
+    computed: a line with the msg and code, then a line for each row
+    """
+
+    mimetype = "application/x-ndjson"
+
+    def __init__(self, msg: str, rows, header: dict | None = None):
+        self.msg = msg
+        self.code = 200
+        self.rows = rows
+        self.header = header or {}
+
+    def lines(self):
+        yield json.dumps(
+            {"msg": self.msg, "raw_msg": self.msg, "code": self.code, **self.header}
+        ) + "\n"
+
+        # The status is already sent, so a failure ends the stream with an error line
+        try:
+            for row in self.rows:
+                yield json.dumps(row) + "\n"
+        except Exception as e:
+            logger.error(msg=str(e))
+            yield json.dumps({"error": str(e)}) + "\n"
+
+    @property
+    def response(self):
+        return FlaskResponse(
+            stream_with_context(self.lines()), status=self.code, mimetype=self.mimetype
+        )
+
+
+class Binary:
+    """
+    Response with an encoded body, for the clients asking for a binary format
+    """
+
+    def __init__(self, body: bytes, mimetype: str, headers: dict | None = None):
+        self.code = 200
+        self.body = body
+        self.mimetype = mimetype
+        self.headers = headers or {}
+
+    @property
+    def response(self):
+        return FlaskResponse(
+            self.body, status=self.code, mimetype=self.mimetype, headers=self.headers
+        )
+
+
 """
 Definition of some exceptions that can be thrown in the app
 """
@@ -0,0 +1,47 @@
+from contextlib import contextmanager
+import time
+
+"""
+Timings of the stages of starting the app, to keep track of how long the
+workers take to boot
+"""
+
+
+class StartupReport:
+    """
+    Durations of the named stages of the startup, in the order they ran
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: dict[str, float] = {}
+        self.finished = None
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0) + time.perf_counter() - start
+
+    def finish(self):
+        """
+        Marks the app as ready for the requests
+        """
+        self.finished = time.perf_counter()
+
+    @property
+    def total(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    @property
+    def state(self):
+        return {
+            **{name: round(seconds, 6) for name, seconds in self.stages.items()},
+            "total": round(self.total, 6),
+        }
+
+
+# The startup of the process, started as the app is imported
+startup = StartupReport()
@@ -0,0 +1,20 @@
+from run import app, get_health, start_background
+
+# Custom modules
+from app.utils.asgi import AsyncApp
+from app.constants import ASGI_WORKERS, ASGI_MAX_PENDING
+
+"""
+ASGI entry point, serve with
+
+    uvicorn asgi:application
+"""
+application = AsyncApp(
+    app,
+    workers=ASGI_WORKERS,
+    max_pending=ASGI_MAX_PENDING,
+    # The identical data requests arriving together share the reads
+    coalesce_prefix="/api/data",
+    health=get_health,
+    on_startup=start_background,
+)
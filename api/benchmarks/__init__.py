@@ -0,0 +1,7 @@
+"""
+Benchmarks for the extraction and energy hot paths, run with
+
+    python -m benchmarks.run --years 5 --output bench.json
+
+from the api folder
+"""
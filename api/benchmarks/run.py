@@ -0,0 +1,321 @@
+import numpy as np
+import subprocess
+import resource
+import platform
+import argparse
+import tempfile
+import datetime
+import json
+import time
+import glob
+import sys
+import os
+
+# Custom modules
+from .synthetic import LATITUDES, LONGITUDES, generate
+
+"""
+Times the hot paths on synthetic SDLmm files, writing the results as JSON
+to compare them across commits
+"""
+
+# The last year the app accepts
+LAST_YEAR = 2024
+
+
+def get_peak_rss() -> dict:
+    """
+    Returns the peak resident memory so far in KB, of the process and of
+    its finished children, the workers reading the NetCDF files. Each case
+    runs in a process of its own, so it's the peak of that case
+    """
+    return {
+        "self": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "children": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    }
+
+
+def summarize(latencies: list[float], items: int = 1) -> dict:
+    """
+    Returns the throughput and the percentiles of the latencies, in ms
+    """
+    latencies = np.asarray(latencies)
+    total = float(latencies.sum())
+    return {
+        "calls": len(latencies),
+        "seconds": round(total, 6),
+        "throughput": round(len(latencies) * items / total, 3) if total else None,
+        "mean_ms": round(float(latencies.mean()) * 1000, 4),
+        "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 4),
+        "p99_ms": round(float(np.percentile(latencies, 99)) * 1000, 4),
+    }
+
+
+def measure(call, repeat: int, reset=None, items: int = 1) -> dict:
+    """
+    Times call(i) for each of the repeats, calling reset before each one
+    without timing it
+    """
+    latencies = []
+    for i in range(repeat):
+        if reset is not None:
+            reset()
+        start = time.perf_counter()
+        call(i)
+        latencies.append(time.perf_counter() - start)
+
+    return summarize(latencies, items)
+
+
+def get_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def get_cases(first_year: int, last_year: int, repeat: int, sites: int) -> dict:
+    """
+    Returns the benchmarks by name, as (call, reset, calls, items), the app is
+    imported here so it picks up the folder of the synthetic files
+    """
+    from run import app
+    from app.lib import dataset, energy, region
+    from app.routes.data import get_response_cache
+
+    rng = np.random.default_rng(0)
+    lats = rng.uniform(LATITUDES[0], LATITUDES[-1], max(repeat, sites))
+    lons = rng.uniform(LONGITUDES[0], LONGITUDES[-1], max(repeat, sites))
+    bbox = [80.0, 20.0, 85.0, 25.0]
+
+    files = dataset.NetCDFRetriever().retrieve(last_year)
+    # The DMS strings of the declination table, as they're parsed at startup
+    dms = [
+        value
+        for row in dataset.get_solar_decline()
+        for value in row.values()
+        if value and value[0] in "NS0"
+    ]
+
+    def reset():
+        """
+        Drops the caches of the process, so the next call reads cold
+        """
+        for file in glob.glob(os.path.join(dataset.DATA_FOLDER, "*.nc")):
+            dataset.forget_file(file)
+        energy.daylength_cache.clear()
+        with app.app_context():
+            get_response_cache().clear()
+
+    client = app.test_client()
+
+    def post(path: str, body: dict):
+        response = client.post(path, json=body)
+        if response.status_code != 200:
+            raise RuntimeError(f"{path} answered {response.status_code}")
+
+    cases = {
+        "parse_dms": (lambda i: energy.parse_dms(dms[i % len(dms)]), None),
+        "sunlight_hours.day": (
+            lambda i: energy.get_sunlight_hours(
+                lats[i], i % 28 + 1, energy.MONTHS[i % 12]
+            ),
+            None,
+        ),
+        "sunlight_hours.month": (
+            lambda i: energy.get_sunlight_hours(lats[i], -1, energy.MONTHS[i % 12]),
+            None,
+        ),
+        "sdlr.cold": (
+            lambda i: dataset.get_extractor().get_sdlr(files, lats[i], lons[i]),
+            reset,
+        ),
+        "sdlr.warm": (
+            lambda i: dataset.get_extractor().get_sdlr(files, lats[i], lons[i]),
+            None,
+        ),
+        "sdlr_range.cold": (
+            lambda i: dataset.get_sdlr_range(lats[i], lons[i], first_year, last_year),
+            reset,
+        ),
+        "sdlr_range.warm": (
+            lambda i: dataset.get_sdlr_range(lats[i], lons[i], first_year, last_year),
+            None,
+        ),
+        "energy.cold": (
+            lambda i: energy.get_estimated_energy(lats[i], lons[i], 10),
+            reset,
+        ),
+        "energy.warm": (
+            lambda i: energy.get_estimated_energy(lats[i], lons[i], 10),
+            None,
+        ),
+        "energy.profile.hourly": (
+            lambda i: energy.get_estimated_energy_profile(
+                lats[i], lons[i], 10, resolution="hourly"
+            ),
+            None,
+        ),
+        "region.bbox": (lambda i: region.get_regional_energy(bbox), None),
+        "endpoint.sdlr": (
+            lambda i: post(
+                "/api/data/sdlr", {"year": last_year, "lat": lats[i], "lon": lons[i]}
+            ),
+            None,
+        ),
+        "endpoint.sdlr_range": (
+            lambda i: post(
+                "/api/data/sdlr/range",
+                {"from": first_year, "to": last_year, "lat": lats[i], "lon": lons[i]},
+            ),
+            None,
+        ),
+        "endpoint.energy": (
+            lambda i: post(
+                "/api/data/energy", {"lat": lats[i], "lon": lons[i], "area": 10}
+            ),
+            None,
+        ),
+        "endpoint.energy_region": (
+            lambda i: post("/api/data/energy/region", {"bbox": bbox}),
+            None,
+        ),
+    }
+    cases = {name: (call, before, repeat, 1) for name, (call, before) in cases.items()}
+
+    # The sites are estimated together, the throughput is in sites
+    batch = max(1, repeat // 10)
+    cases["energy_batch"] = (
+        lambda i: energy.get_estimated_energy_batch(lats[:sites], lons[:sites], 10),
+        None,
+        batch,
+        sites,
+    )
+    cases["endpoint.energy_batch"] = (
+        lambda i: post(
+            "/api/data/energy/batch",
+            {"lat": lats[:sites].tolist(), "lon": lons[:sites].tolist(), "area": 10},
+        ),
+        None,
+        batch,
+        sites,
+    )
+
+    return cases
+
+
+def run_case(name: str, first_year: int, last_year: int, repeat: int, sites: int):
+    """
+    Runs one of the benchmarks in this process. The cases without a reset
+    are timed warm, after a call that isn't timed
+    """
+    call, reset, calls, items = get_cases(first_year, last_year, repeat, sites)[name]
+    if reset is None:
+        call(0)
+
+    rss = get_peak_rss()["self"]
+    result = measure(call, calls, reset, items)
+
+    # The workers are only counted in the children once they've exited
+    from app.lib.dataset import get_executor
+
+    executor = get_executor()
+    if executor is not None:
+        executor.shutdown()
+
+    result["peak_rss_kb"] = {**get_peak_rss(), "before": rss}
+    return result
+
+
+def run_benchmarks(first_year: int, last_year: int, repeat: int, sites: int) -> dict:
+    """
+    Runs each of the benchmarks in a fresh interpreter, so its peak memory
+    and caches aren't left over from the ones before
+    """
+    names = list(get_cases(first_year, last_year, repeat, sites))
+    options = [f"--years={last_year - first_year + 1}", f"--repeat={repeat}"]
+    options += [f"--sites={sites}", f"--folder={os.environ['SDL_DATA_FOLDER']}"]
+
+    results = {}
+    for name in names:
+        process = subprocess.run(
+            [sys.executable, "-m", "benchmarks.run", f"--case={name}", *options],
+            capture_output=True,
+            text=True,
+        )
+        if process.returncode != 0:
+            raise RuntimeError(f"{name} failed: {process.stderr.strip()}")
+        results[name] = json.loads(process.stdout.strip().splitlines()[-1])
+
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--years", type=int, default=3, help="Years of synthetic files")
+    parser.add_argument("--repeat", type=int, default=50, help="Calls for each case")
+    parser.add_argument("--sites", type=int, default=1000, help="Sites for the batches")
+    parser.add_argument(
+        "--folder", help="Where to keep the synthetic files, reused if present"
+    )
+    parser.add_argument(
+        "--output", help="The JSON file for the results, printed if not given"
+    )
+    # Runs a single case, in the processes started for each of them
+    parser.add_argument("--case", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    first_year = LAST_YEAR - args.years + 1
+    if first_year < 1979:
+        parser.error("the years have to be within 1979 and 2024")
+
+    folder = args.folder or tempfile.mkdtemp(prefix="sdlmm-")
+    if len(glob.glob(os.path.join(folder, "*.nc"))) != args.years * 12:
+        start = time.perf_counter()
+        generate(folder, args.years, first_year)
+        print(
+            f"generated {args.years * 12} files in {time.perf_counter() - start:.1f}s",
+            file=sys.stderr,
+        )
+
+    # Point the app at the synthetic files, before it's imported
+    os.environ["SDL_DATA_FOLDER"] = folder
+    os.environ["ESTIMATION_YEAR"] = str(LAST_YEAR)
+
+    if args.case:
+        result = run_case(args.case, first_year, LAST_YEAR, args.repeat, args.sites)
+        print(json.dumps(result))
+        return
+
+    results = run_benchmarks(first_year, LAST_YEAR, args.repeat, args.sites)
+
+    report = {
+        "meta": {
+            "commit": get_commit(),
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "years": args.years,
+            "files": args.years * 12,
+            "grid": [len(LATITUDES), len(LONGITUDES)],
+            "repeat": args.repeat,
+            "sites": args.sites,
+            "backend": os.environ.get("SDL_BACKEND", "netcdf"),
+            "response_cache": os.environ.get("RESPONSE_CACHE_BACKEND", "memory"),
+        },
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, mode="w") as file:
+            json.dump(report, file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import netCDF4 as nc
+import numpy as np
+import calendar
+import os
+
+"""
+Synthetic SDLmm files, on the grid of the CM SAF subset the app ships with
+"""
+
+# The cell centres of the subset, at 0.25 degrees
+LATITUDES = np.arange(5.125, 38, 0.25)
+LONGITUDES = np.arange(68.125, 98, 0.25)
+FILL_VALUE = -999.0
+
+
+def get_filename(year: int, month: int, version: str = "POS01") -> str:
+    """
+    Returns the name of the file for the month, as named by CM SAF
+    """
+    return f"SDLmm{year}{month:02d}010000003UDAV{version}UD.nc"
+
+
+def get_sdl(year: int, month: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Returns a plausible (lat, lon) SDL field for the month, warmer towards the
+    equator and in the summer, with a few missing cells
+    """
+    lat = np.radians(LATITUDES)[:, None]
+    season = np.cos(2 * np.pi * (month - 7) / 12)
+    sdl = 250 + 120 * np.cos(lat) + 40 * season + np.zeros((1, len(LONGITUDES)))
+    sdl += rng.normal(0, 5, sdl.shape)
+
+    # The cells without a retrieval
+    sdl[rng.random(sdl.shape) < 0.005] = FILL_VALUE
+    return sdl.astype(np.float32)
+
+
+def write_file(path: str, year: int, month: int, sdl: np.ndarray):
+    """
+    Writes a single month in the layout of the real files
+    """
+    days_from = (
+        np.datetime64(f"{year}-{month:02d}-01") - np.datetime64("1970-01-01")
+    ).astype(int)
+    days = calendar.monthrange(year, month)[1]
+
+    with nc.Dataset(path, mode="w", format="NETCDF4") as dataset:
+        dataset.createDimension("time", None)
+        dataset.createDimension("bnds", 2)
+        dataset.createDimension("lon", len(LONGITUDES))
+        dataset.createDimension("lat", len(LATITUDES))
+
+        time = dataset.createVariable("time", "f8", ("time",))
+        time.units = "days since 1970-01-01 00:00:00"
+        time.calendar = "standard"
+        time[:] = [days_from]
+        dataset.createVariable("time_bnds", "f8", ("time", "bnds"))[:] = [
+            [days_from, days_from + days]
+        ]
+
+        dataset.createVariable("lon", "f8", ("lon",))[:] = LONGITUDES
+        dataset.createVariable("lat", "f8", ("lat",))[:] = LATITUDES
+
+        variable = dataset.createVariable(
+            "SDL",
+            "f4",
+            ("time", "lat", "lon"),
+            zlib=True,
+            complevel=6,
+            chunksizes=(1, len(LATITUDES), len(LONGITUDES)),
+            fill_value=FILL_VALUE,
+        )
+        variable.units = "W/m2"
+        variable.missing_value = FILL_VALUE
+        variable[0] = sdl
+
+
+def generate(
+    folder: str, years: int, first_year: int = 1990, seed: int = 0
+) -> list[str]:
+    """
+    Writes the files for every month of the years into the folder,
+    returning their paths
+    """
+    os.makedirs(folder, exist_ok=True)
+    rng = np.random.default_rng(seed)
+
+    paths = []
+    for year in range(first_year, first_year + years):
+        for month in range(1, 13):
+            path = os.path.join(folder, get_filename(year, month))
+            write_file(path, year, month, get_sdl(year, month, rng))
+            paths.append(path)
+
+    return paths
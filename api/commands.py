@@ -0,0 +1,137 @@
+import subprocess
+import click
+import json
+import sys
+import os
+
+# Custom modules
+from app import app
+from app.lib.dataset import (
+    build_sdl_climatology,
+    build_sdl_cube,
+    build_sdl_tiles,
+    SDLCubeExtractor,
+    CLIMATOLOGY_FOLDER,
+    CUBE_FOLDER,
+    TILES_FOLDER,
+)
+from app.lib.warmup import (
+    get_warmup_cells,
+    load_targets,
+    parse_target,
+    warm_cell,
+    warmup,
+)
+
+"""
+The CLI commands for the app, run with `flask --app run <command>`
+"""
+
+
+@app.cli.command("build-cube")
+@click.option("--folder", default=CUBE_FOLDER, help="Where to write the cube")
+def build_cube(folder: str):
+    """
+    Packs the NetCDF archive into the memory-mapped SDL cube
+    """
+    path = build_sdl_cube(folder=folder)
+    click.echo(f"built the SDL cube: {path}")
+
+
+@app.cli.command("build-tiles")
+@click.option("--folder", default=TILES_FOLDER, help="Where to write the tiles")
+@click.option("--tile-size", default=16, help="Grid cells along a tile's side")
+@click.option(
+    "--codec",
+    default="none",
+    type=click.Choice(["none", "zlib", "lz4", "zstd"]),
+    help="Compression for the blocks",
+)
+def build_tiles(folder: str, tile_size: int, codec: str):
+    """
+    Re-chunks the SDL cube into the tiled point-series store,
+    building the cube first if needed
+    """
+    if not SDLCubeExtractor.exists():
+        click.echo(f"built the SDL cube: {build_sdl_cube()}")
+
+    path = build_sdl_tiles(folder=folder, tile_size=tile_size, codec=codec)
+    click.echo(f"built the SDL tiles: {path}")
+
+
+@app.cli.command("build-climatology")
+@click.option("--folder", default=CLIMATOLOGY_FOLDER, help="Where to write it")
+def build_climatology(folder: str):
+    """
+    Computes the monthly climatology of every cell over the NetCDF archive
+    """
+    path = build_sdl_climatology(folder=folder)
+    click.echo(f"built the SDL climatology: {path}")
+
+
+@app.cli.command("warmup")
+@click.option("--file", "path", default=None, help="JSON list or hit log of places")
+@click.option("--point", multiple=True, help="A place as lat,lon")
+@click.option(
+    "--bbox", multiple=True, help="A region as min_lon,min_lat,max_lon,max_lat"
+)
+def warm_up(path: str | None, point: tuple[str], bbox: tuple[str]):
+    """
+    Opens the files and fills the caches for the places. The in-process
+    caches only last for the command, the redis responses and the files
+    in the page cache are kept for the app
+    """
+    targets = load_targets(path) if path else []
+    targets += [parse_target(value.split(",")) for value in point + bbox]
+    if not targets:
+        raise click.UsageError("give a --file, --point or --bbox to warm")
+
+    try:
+        cells = get_warmup_cells(targets)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+    warmup.run(cells, warm_cell, report=click.echo)
+    click.echo(f"warmed {warmup.done} places in {warmup.state['seconds']}s")
+
+
+@app.cli.command("startup-report")
+@click.option("--fast/--full", default=True, help="Start with FAST_START or without")
+@click.option("--top", default=15, help="How many of the slowest imports to list")
+def startup_report(fast: bool, top: int):
+    """
+    Starts the app in a fresh interpreter, listing the time of its stages
+    and the slowest imports
+    """
+    script = (
+        "import json, run; from app.utils.startup import startup; "
+        "print(json.dumps(startup.state))"
+    )
+    env = {**os.environ, "FAST_START": "1" if fast else "0"}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", script],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    if result.returncode != 0:
+        raise click.ClickException(result.stderr.strip().splitlines()[-1])
+
+    # The lines are "import time: self [us] | cumulative | imported package",
+    # the cumulative times of the nested imports are counted in their parents
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        if name.strip() != "run":
+            imports.append((int(cumulative), name.strip()))
+
+    stages = json.loads(result.stdout.strip().splitlines()[-1])
+    click.echo(f"stages ({'fast' if fast else 'full'} start):")
+    for name, seconds in stages.items():
+        click.echo(f"  {name:<14} {seconds * 1000:9.1f} ms")
+
+    click.echo("slowest imports:")
+    for cumulative, name in sorted(imports, reverse=True)[:top]:
+        click.echo(f"  {name:<30} {cumulative / 1000:9.1f} ms")
@@ -1,15 +1,34 @@
 from dotenv import load_dotenv
 import os
-import redis
 load_dotenv()
 
+
+class LazyRedis:
+    """
+    Redis client connecting on the first use, so loading the config
+    doesn't import the client
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self.__client = None
+
+    def __getattr__(self, name):
+        if self.__client is None:
+            import redis
+
+            self.__client = redis.from_url(self.url)
+        return getattr(self.__client, name)
+
+
 class ApplicationConfig:
     SECRET_KEY = os.environ["SECRET_KEY"]
     SQLALCHEMY_TRACK_NOTIFICATIONS = False
-    SQLALCHEMY_ECHO = True
-    SQLALCHEMY_DATABASE_URI = r"sqlite:///./db.sqlite"
+    # Logs every statement, for debugging only
+    SQLALCHEMY_ECHO = os.environ.get("SQLALCHEMY_ECHO", "").lower() in ("1", "true")
+    SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_URL", r"sqlite:///./db.sqlite")
 
     SESSION_TYPE = "redis"
     SESSION_PERMANENT = False
     SESSION_USE_SIGNER = True
-    SESSION_REDIS = redis.from_url("redis://127.0.0.1:6379")
\ No newline at end of file
+    SESSION_REDIS = LazyRedis(os.environ.get("REDIS_URL", "redis://127.0.0.1:6379"))
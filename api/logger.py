@@ -1,9 +1,104 @@
 import os, sys
+import multiprocessing
 import logging
+import logging.handlers
+import atexit
+import queue
+import json
+
+from dotenv import load_dotenv
+load_dotenv()
 
 dir_path = os.path.dirname(os.path.realpath(__file__))
 filename = os.path.join(dir_path, 'app.log')
 
+# The records waiting for the writer, past which the new ones are dropped
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+# Rotate the file at a size, or at a time (e.g. "midnight"), when set. It's
+# rotated outside the app by default, the worker processes can't share it
+LOG_MAX_BYTES = int(os.environ.get('LOG_MAX_BYTES', 0))
+LOG_ROTATE_WHEN = os.environ.get('LOG_ROTATE_WHEN')
+LOG_BACKUP_COUNT = int(os.environ.get('LOG_BACKUP_COUNT', 5))
+# Write the file as JSON lines instead of the text format
+LOG_JSON = os.environ.get('LOG_JSON', '').lower() in ('1', 'true')
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    Formats the records as JSON lines, starting with the time and the level
+    as in the text format
+    """
+
+    def format(self, record):
+        data = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'message': record.getMessage(),
+            'logger': record.name,
+            'thread': record.threadName,
+        }
+        if record.exc_info:
+            data['exc_info'] = self.formatException(record.exc_info)
+
+        return json.dumps(data)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands the records to the writer thread, dropping and counting them
+    when it falls behind, so logging never waits on the writes
+    """
+
+    def __init__(self, queue):
+        super().__init__(queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # The record stays within the process, only the message is fixed
+        # now, the traceback is formatted by the writer
+        record.msg, record.args = record.getMessage(), None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def get_file_handler() -> logging.Handler:
+    """
+    Returns the handler of the log file. It's reopened when rotated outside
+    the app, unless the app is set to rotate it, for a single process only.
+    The processes spawned by the app append to it either way
+    """
+    if multiprocessing.parent_process() is not None:
+        return logging.handlers.WatchedFileHandler(filename)
+    if LOG_ROTATE_WHEN:
+        return logging.handlers.TimedRotatingFileHandler(
+            filename, when=LOG_ROTATE_WHEN, backupCount=LOG_BACKUP_COUNT
+        )
+    if LOG_MAX_BYTES > 0:
+        return logging.handlers.RotatingFileHandler(
+            filename, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT
+        )
+    return logging.handlers.WatchedFileHandler(filename)
+
+
+def stop_listener():
+    """
+    Writes what's left in the queue, when there's room for the sentinel
+    """
+    try:
+        listener.stop()
+    except queue.Full:
+        pass
+
+
+def get_stats() -> dict:
+    return {'queued': log_queue.qsize(), 'dropped': queue_handler.dropped}
+
+
 # Initialize the logger
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -12,19 +107,27 @@ logger.setLevel(logging.INFO)
 formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
 
 # File handler
-file_handler = logging.FileHandler(filename)
+file_handler = get_file_handler()
 file_handler.setLevel(logging.INFO)
-file_handler.setFormatter(formatter)
+file_handler.setFormatter(JSONFormatter() if LOG_JSON else formatter)
 
 # Stream handler
 stream_handler = logging.StreamHandler(sys.stdout)
 stream_handler.setLevel(logging.INFO)
 stream_handler.setFormatter(formatter)
 
-# Add the handlers
-logger.addHandler(file_handler)
-logger.addHandler(stream_handler)
+# The handlers run in the writer thread, fed by the queue
+log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+queue_handler = DroppingQueueHandler(log_queue)
+listener = logging.handlers.QueueListener(
+    log_queue, file_handler, stream_handler, respect_handler_level=True
+)
+listener.start()
+# Write what's left in the queue before exiting
+atexit.register(stop_listener)
+
+# Add the handler
+logger.addHandler(queue_handler)
 
 if __name__ == '__main__':
     logger.info("App logger test")
-
@@ -0,0 +1,49 @@
+"""make the users' created timestamps non-nullable and index them
+
+Revision ID: 1e1f6d61ae4d
+Revises: 
+Create Date: 2026-10-18 14:02:54.104318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import datetime
+
+
+# revision identifiers, used by Alembic.
+revision = '1e1f6d61ae4d'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# The users without a timestamp are taken as the oldest ones
+UNKNOWN_CREATED = datetime.datetime(1970, 1, 1)
+
+
+def upgrade():
+    # The tables themselves are made by `db.create_all()`
+    user = sa.table('user', sa.column('created', sa.DateTime))
+    op.execute(
+        user.update()
+        .where(user.c.created.is_(None))
+        .values(created=UNKNOWN_CREATED)
+    )
+
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.alter_column(
+            'created', existing_type=sa.DateTime(), nullable=False
+        )
+
+    # Already there on the tables made with it
+    op.create_index(
+        'ix_user_created_id', 'user', ['created', 'id'], if_not_exists=True
+    )
+
+
+def downgrade():
+    op.drop_index('ix_user_created_id', table_name='user', if_exists=True)
+
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.alter_column(
+            'created', existing_type=sa.DateTime(), nullable=True
+        )
@@ -1,14 +1,102 @@
-from app import app
+from flask import Response
+from werkzeug.serving import is_running_from_reloader
+import threading
+
+from app import app, preload
+from app.utils.metrics import metrics
+from app.utils.startup import startup
+from app.constants import FAST_START, WARMUP_FILE
+from app.lib.warmup import get_warmup_cells, load_targets, warm_cell, warmup
+from logger import logger
+
+# Registers the CLI commands
+import commands
+
+# Without the fast start, all the loading is done by the import
+if not FAST_START:
+    startup.finish()
+
+
+def report_started():
+    """
+    Logs the time the process took to be ready, with the deferred loading
+    """
+    logger.info(
+        msg=f"started in {startup.total * 1000:.1f} ms"
+        + (" (fast start)" if FAST_START else "")
+    )
+
+
+def preload_and_report():
+    """
+    Loads what the fast start left out, then reports the app as ready
+    """
+    preload()
+    startup.finish()
+    report_started()
+
+
+# Whether the background work of the process was started
+__started = False
+__started_lock = threading.Lock()
+
+
+def start_background():
+    """
+    Starts the background work of the process once it serves the app, not at
+    import, as the reloader's watcher and the spawned workers import it too
+    """
+    global __started
+
+    with __started_lock:
+        if __started:
+            return
+        __started = True
+
+    # Load what the fast start left out in the background, the requests
+    # arriving before it's done load what they need themselves
+    if FAST_START:
+        threading.Thread(target=preload_and_report, name="preload", daemon=True).start()
+    else:
+        report_started()
+
+    # Warm the caches in the background for the places in the file
+    if WARMUP_FILE:
+        targets = load_targets(WARMUP_FILE)
+        warmup.start(app, lambda: get_warmup_cells(targets), warm_cell)
+
+
+# Started by the first request under `flask run` and the WSGI servers
+@app.before_request
+def start_serving():
+    if not __started:
+        start_background()
+
 
 """
 Pages
 """
 
 
+def get_health() -> dict:
+    """
+    Returns the status of the app, cheap enough to answer from the event loop
+    """
+    return {"status": "ok", "warm": warmup.warm, "warmup": warmup.state}
+
+
 @app.route("/health")
 def home():
-    return {"status": "ok"}, 200
+    return get_health(), 200
+
+
+@app.route("/metrics")
+def get_metrics():
+    return Response(metrics.export(), mimetype="text/plain; version=0.0.4")
 
 
 if __name__ == "__main__":
+    # With the reloader, only its child process serves the app
+    if is_running_from_reloader():
+        start_background()
     app.run(debug=True, host="0.0.0.0")
@@ -0,0 +1,10 @@
+import os
+import sys
+
+# The app reads these at import, the tests don't need the heavy startup
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("FAST_START", "1")
+# The tests make their own users, in memory
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
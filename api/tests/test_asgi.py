@@ -0,0 +1,78 @@
+import asyncio
+import threading
+
+import httpx
+import pytest
+from flask import Flask, Response, request
+
+from app.utils.asgi import AsyncApp
+
+
+def make_app():
+    app = Flask(__name__)
+    app.calls = 0
+    app.gate = threading.Event()
+
+    @app.post("/api/data/echo")
+    def echo():
+        app.calls += 1
+        app.gate.wait(5)
+        return {"body": request.get_json()}
+
+    @app.get("/api/data/stream")
+    def stream():
+        def rows():
+            yield "first\n"
+            raise RuntimeError("failed mid-stream")
+
+        return Response(rows(), mimetype="application/x-ndjson")
+
+    return app
+
+
+def client(application):
+    transport = httpx.ASGITransport(app=application)
+    return httpx.AsyncClient(transport=transport, base_url="http://test")
+
+
+def test_identical_requests_share_one_run():
+    wsgi_app = make_app()
+    application = AsyncApp(wsgi_app, workers=4, coalesce_prefix="/api/data")
+
+    async def run():
+        async with client(application) as http:
+            requests = [http.post("/api/data/echo", json={"a": 1}) for _ in range(3)]
+            requests.append(http.post("/api/data/echo", json={"a": 2}))
+            pending = asyncio.gather(*requests)
+            await asyncio.sleep(0.2)
+            wsgi_app.gate.set()
+            return await pending
+
+    responses = asyncio.run(run())
+
+    assert [r.json()["body"]["a"] for r in responses] == [1, 1, 1, 2]
+    assert wsgi_app.calls == 2
+    assert application.stats["coalesced"] == 2
+
+
+def test_health_is_answered_from_the_loop():
+    application = AsyncApp(make_app(), health=lambda: {"status": "ok"})
+
+    async def run():
+        async with client(application) as http:
+            return await http.get("/health")
+
+    assert asyncio.run(run()).json() == {"status": "ok"}
+
+
+def test_failure_after_the_start_is_raised():
+    application = AsyncApp(make_app(), coalesce_prefix="/api/data")
+
+    async def run():
+        async with client(application) as http:
+            await http.get(
+                "/api/data/stream", headers={"Accept": "application/x-ndjson"}
+            )
+
+    with pytest.raises(RuntimeError, match="failed mid-stream"):
+        asyncio.run(run())
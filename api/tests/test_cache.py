@@ -0,0 +1,97 @@
+import threading
+import time
+
+from app.utils.cache import LRUCache, NullCache, RedisCache, ResponseCache
+from app.utils.metrics import Metrics
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+        self.scans = 0
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def setex(self, key, ttl, value):
+        self.values[key] = value
+
+    def scan_iter(self, match):
+        self.scans += 1
+        return [key for key in self.values if key.startswith(match[:-1])]
+
+    def delete(self, key):
+        self.values.pop(key, None)
+
+
+def test_version_change_clears_the_process_cache():
+    version = [1]
+    cache = ResponseCache(LRUCache(), version=lambda: version[0])
+
+    cache.get_or_set(cache.key("sdlr", 2020), lambda: [1.0])
+    version[0] = 2
+    key = cache.key("sdlr", 2020)
+
+    assert cache.backend.get(cache.key("sdlr", 2020)) is None
+    assert cache.get_or_set(key, lambda: [2.0]) == [2.0]
+    assert cache.stats["hits"] == 0
+    assert cache.stats["misses"] == 2
+
+
+def test_version_change_leaves_the_shared_cache_to_expire():
+    client = FakeRedis()
+    version = [1]
+    cache = ResponseCache(RedisCache(client), version=lambda: version[0])
+
+    old = cache.key("sdlr", 2020)
+    cache.get_or_set(old, lambda: [1.0])
+    version[0] = 2
+    new = cache.key("sdlr", 2020)
+
+    assert client.scans == 0
+    assert new != old
+    assert cache.get_or_set(new, lambda: [2.0]) == [2.0]
+    assert cache.get_or_set(new, lambda: [3.0]) == [2.0]
+
+
+def test_concurrent_misses_share_one_computation():
+    cache = ResponseCache(NullCache())
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.05)
+        return [1.0]
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_set("k", compute)))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [[1.0]] * 4
+    assert len(calls) == 1
+    assert cache.stats["executed"] == 1
+    assert cache.stats["coalesced"] == 3
+
+
+def test_executed_calls_are_counted_and_exported():
+    cache = ResponseCache(LRUCache())
+    metrics = Metrics()
+    metrics.collect("response_cache", lambda: cache.stats)
+
+    for key in ["a", "b", "a", "c"]:
+        cache.get_or_set(key, lambda: [1.0])
+
+    assert cache.stats == {
+        "hits": 1,
+        "misses": 3,
+        "executed": 3,
+        "coalesced": 0,
+        "inflight": 0,
+    }
+    assert "solarwise_response_cache_executed 3\n" in metrics.export()
@@ -0,0 +1,33 @@
+from app import app
+from app.lib import dataset
+from app.routes import data
+
+
+def test_energy_without_the_climatology_is_unavailable(monkeypatch):
+    monkeypatch.setattr(dataset.SDLClimatology, "exists", lambda *args: False)
+
+    response = app.test_client().post(
+        "/api/data/energy",
+        json={"lat": 20, "lon": 78, "area": 1, "source": "climatology"},
+    )
+
+    assert response.status_code == 503
+
+
+def test_rebuilt_climatology_is_not_served_from_the_cache(monkeypatch):
+    class Climatology:
+        grid = dataset.get_grid_index([10.0, 20.0], [70.0, 80.0])
+        mtime = 1.0
+
+    climatology = Climatology()
+    keys = []
+    monkeypatch.setattr(data, "get_climatology", lambda: climatology)
+    monkeypatch.setattr(
+        data.ResponseCache, "get_or_set", lambda self, key, compute: keys.append(key)
+    )
+
+    data.get_energy_for_cell(20, 78, None, "climatology")
+    climatology.mtime = 2.0
+    data.get_energy_for_cell(20, 78, None, "climatology")
+
+    assert keys[0] != keys[1]
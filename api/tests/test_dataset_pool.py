@@ -0,0 +1,114 @@
+import shutil
+import threading
+import os
+
+import pytest
+
+from app.lib import dataset
+
+
+class FakeDataset:
+    """
+    Stands in for an open file, of a set size
+    """
+
+    nbytes = 100
+
+    def __init__(self, path: str):
+        self.path = path
+        self.users = 0
+        self.evicted = False
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def opened(monkeypatch):
+    monkeypatch.setattr(dataset, "PooledDataset", FakeDataset)
+    entries = {}
+
+    def checkout(pool, path):
+        with pool.open(path) as entry:
+            entries[path] = entry
+
+    return entries, checkout
+
+
+def test_pool_evicts_the_least_recently_used_past_max_files(opened):
+    entries, checkout = opened
+    pool = dataset.DatasetPool(max_files=2, max_bytes=10_000)
+
+    for path in ["a", "b", "a", "c"]:
+        checkout(pool, path)
+
+    assert entries["b"].closed
+    assert not entries["a"].closed and not entries["c"].closed
+    assert pool.stats == {"files": 2, "bytes": 200}
+
+
+def test_pool_evicts_past_max_bytes_keeping_the_latest(opened):
+    entries, checkout = opened
+    pool = dataset.DatasetPool(max_files=10, max_bytes=250)
+
+    for path in ["a", "b", "c"]:
+        checkout(pool, path)
+    assert entries["a"].closed and pool.stats == {"files": 2, "bytes": 200}
+
+    # A single dataset over the budget is still kept
+    pool.max_bytes = 50
+    checkout(pool, "d")
+    assert [entries[path].closed for path in "bcd"] == [True, True, False]
+    assert pool.stats == {"files": 1, "bytes": 100}
+
+
+def test_pool_closes_a_dataset_in_use_after_its_last_reader(opened):
+    _, checkout = opened
+    pool = dataset.DatasetPool(max_files=1, max_bytes=10_000)
+
+    with pool.open("a") as entry:
+        checkout(pool, "b")
+        assert entry.evicted and not entry.closed
+
+    assert entry.closed
+
+
+def test_pool_closes_evicted_datasets_outside_its_lock(opened, monkeypatch):
+    _, checkout = opened
+    pool = dataset.DatasetPool(max_files=1, max_bytes=10_000)
+    blocked = []
+
+    def close(self):
+        # Another thread checking out meanwhile isn't held up
+        thread = threading.Thread(target=lambda: pool.stats)
+        thread.start()
+        thread.join(timeout=1)
+        blocked.append(thread.is_alive())
+
+    monkeypatch.setattr(FakeDataset, "close", close)
+    checkout(pool, "a")
+    checkout(pool, "b")
+    pool.discard("b")
+
+    assert blocked == [False, False]
+
+
+def test_replaced_file_is_read_again(tmp_path):
+    files = dataset.NetCDFRetriever().retrieve(1980)
+    path = str(tmp_path / os.path.basename(files[0]))
+    shutil.copy(files[0], path)
+
+    index = dataset.NetCDFIndex(str(tmp_path), poll_interval=0)
+    assert index.files(1980) == [path]
+    january = dataset.NetCDFExtractor.read_cell(path, 20.0, 78.0)
+
+    # The file is replaced in place by the one of July, with a newer mtime
+    shutil.copy(files[6], path)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    index.refresh(force=True)
+
+    july = dataset.NetCDFExtractor.read_cell(path, 20.0, 78.0)
+    assert july == dataset.NetCDFExtractor.read_cell(files[6], 20.0, 78.0)
+    assert july != january
@@ -0,0 +1,55 @@
+import numpy as np
+
+from app.lib.energy import DaylengthCache, get_monthly_sunlight_hours
+
+LATS = np.random.default_rng(0).uniform(-60, 60, 200)
+
+
+def test_cached_hours_are_those_of_the_quantised_latitude():
+    cache = DaylengthCache(resolution=0.01, max_size=1000)
+
+    hours = cache.get_many(LATS)
+
+    assert np.array_equal(
+        hours, get_monthly_sunlight_hours(np.rint(LATS / 0.01) * 0.01)
+    )
+    # Off by no more than the hours move within the resolution around it
+    direct = get_monthly_sunlight_hours(LATS)
+    spread = np.abs(
+        get_monthly_sunlight_hours(LATS + 0.005)
+        - get_monthly_sunlight_hours(LATS - 0.005)
+    )
+    assert np.all(np.abs(hours - direct) <= spread + 1e-12)
+    assert np.array_equal(cache.get(LATS[0]), hours[0])
+
+
+def test_precomputed_table_gives_the_cached_hours():
+    cached = DaylengthCache(resolution=0.05).get_many(LATS)
+    cache = DaylengthCache(resolution=0.05)
+    cache.precompute(-60, 60)
+
+    assert np.allclose(cache.get_many(LATS), cached)
+    assert cache.stats["size"] == 0 and cache.stats["precomputed"] == 2401
+    # Past the table, the latitudes are cached as usual
+    cache.get_many([75.0, 75.0])
+    assert cache.stats["size"] == 1
+
+
+def test_cache_keeps_the_most_recent_latitudes():
+    cache = DaylengthCache(resolution=1, max_size=3)
+
+    cache.get_many([10, 20, 10])
+    assert cache.stats == {"hits": 0, "misses": 3, "size": 2, "precomputed": 0}
+
+    cache.get(30)
+    cache.get(10)
+    cache.get(40)
+    # 20 was the least recently used
+    assert cache.stats == {"hits": 1, "misses": 5, "size": 3, "precomputed": 0}
+    cache.get_many([10, 30, 40])
+    assert cache.stats["hits"] == 4
+    cache.get(20)
+    assert cache.stats["misses"] == 6
+
+    cache.clear()
+    assert cache.stats == {"hits": 0, "misses": 0, "size": 0, "precomputed": 0}
@@ -0,0 +1,57 @@
+import calendar
+import csv
+import os
+import re
+
+import numpy as np
+
+from app.lib import dataset, energy
+
+# A declination as written in the table, e.g. S23° 04', or 0° 00'
+DMS = re.compile(r"([NS]?)(\d+)° (\d+)'")
+
+
+def read_table() -> list[list[str]]:
+    """
+    Returns the cells of the table's days, without the header and the days
+    """
+    path = os.path.join(dataset.STATIC_FOLDER, "csv", "delta_table.csv")
+    with open(path, mode="r") as rFile:
+        rows = list(csv.reader(rFile))
+
+    assert rows[0] == ["Day", *energy.MONTHS]
+    return [row[1:] for row in rows[1:]]
+
+
+def test_every_day_has_a_cell_for_each_month():
+    rows = read_table()
+
+    assert len(rows) == 31
+    assert all(len(row) == 12 for row in rows)
+    # The days of each month in a leap year, the 29th of February included
+    for month in range(12):
+        days = sum(1 for row in rows if row[month])
+        assert days == calendar.monthrange(2024, month + 1)[1]
+
+
+def test_table_matches_the_csv_and_the_dict_lookups():
+    declinations, mask = energy.get_declinations()
+    rows = read_table()
+    records = dataset.get_solar_decline()
+
+    assert declinations.shape == mask.shape == (12, 31)
+    for day, row in enumerate(rows):
+        for month, cell in enumerate(row):
+            assert mask[month, day] == bool(cell)
+            if not cell:
+                continue
+
+            sign, degrees, minutes = DMS.fullmatch(cell).groups()
+            expected = (int(degrees) + int(minutes) / 60) * (-1 if sign == "S" else 1)
+            assert np.isclose(declinations[month, day], expected)
+
+            # As the declinations were looked up before the table
+            delta = records[day][energy.MONTHS[month]]
+            assert declinations[month, day] == energy.dms_to_decimal(
+                *energy.parse_dms(delta)
+            )
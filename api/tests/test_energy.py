@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from app.lib import dataset, energy
+
+# Within the grid, between its cells and past its edges
+SITES = [(20.0, 78.0), (28.676, 77.203), (12.9, 96.3), (40.0, 60.0)]
+AREAS = [10.0, 2.5, 40.0, 1.0]
+EFFICIENCIES = [0.2, None, 0.15, 0.0]
+
+
+@pytest.fixture(autouse=True)
+def estimation_year(monkeypatch):
+    monkeypatch.setattr(energy, "get_estimation_year", lambda: 2023)
+
+
+def test_batch_reads_the_cells_of_the_single_reads():
+    files = dataset.NetCDFRetriever().retrieve(2023)
+    lats, lons = zip(*SITES)
+
+    batch = dataset.NetCDFExtractor.get_sdlr_many(files, lats, lons)
+
+    for j, (lat, lon) in enumerate(SITES):
+        assert np.array_equal(
+            batch[:, j], dataset.NetCDFExtractor.get_sdlr_as_np(files, lat, lon)
+        )
+
+
+@pytest.mark.parametrize("month", [None, 2, 12])
+def test_batch_matches_the_estimate_of_each_site(month):
+    lats, lons = zip(*SITES)
+    efficiencies = [np.nan if value is None else value for value in EFFICIENCIES]
+
+    batch = energy.get_estimated_energy_batch(lats, lons, AREAS, efficiencies, month)
+
+    for j, (lat, lon) in enumerate(SITES):
+        months, total = energy.get_estimated_energy(
+            lat, lon, AREAS[j], EFFICIENCIES[j], month
+        )
+        months = [months] if month is not None else months
+
+        assert batch["months"] == [entry["month"] for entry in months]
+        assert np.allclose(batch["energy"][j], [entry["energy"] for entry in months])
+        assert np.isclose(batch["total"][j], total)
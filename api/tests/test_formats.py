@@ -0,0 +1,33 @@
+import io
+
+import numpy as np
+import pytest
+
+from app import app
+from app.utils import formats
+
+
+@pytest.mark.filterwarnings("ignore:Warning. converting a masked element")
+def test_npy_sdlr_is_served_from_the_cache_of_the_json():
+    client = app.test_client()
+    body = {"year": 1980, "lat": 20.0, "lon": 78.0}
+
+    sdlr = client.post("/api/data/sdlr", json=body).get_json()["payload"]["sdlr"]
+    response = client.post("/api/data/sdlr", json=body, headers={"Accept": formats.NPY})
+    values = np.load(io.BytesIO(response.data))
+
+    assert response.mimetype == formats.NPY
+    assert response.headers["X-Year"] == "1980"
+    assert np.allclose(values, [month["sdlr"] for month in sdlr], equal_nan=True)
+
+
+def test_npy_headers_hold_the_other_columns():
+    body, headers = formats.encode(
+        formats.NPY,
+        {"month": ["JAN", "FEB"], "sdlr": np.array([1.0, 2.0])},
+        values="sdlr",
+        metadata={"year": 2020},
+    )
+
+    assert headers == {"X-Month": "JAN,FEB", "X-Year": "2020"}
+    assert np.load(io.BytesIO(body)).tolist() == [1.0, 2.0]
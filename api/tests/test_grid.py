@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from app.lib.grid import GridAxis
+
+AXES = {
+    "regular": np.arange(5.125, 38, 0.25),
+    "regular descending": np.arange(37.875, 5, -0.25),
+    "irregular": np.array([-3.0, -1.0, 0.0, 0.5, 2.0, 6.0]),
+    "irregular descending": np.array([6.0, 2.0, 0.5, 0.0, -1.0, -3.0]),
+}
+
+
+@pytest.mark.parametrize("name", list(AXES))
+def test_lookup_matches_argmin(name):
+    values = AXES[name]
+    axis = GridAxis(values)
+    # The points, the midpoints between them and past both ends
+    midpoints = (values[1:] + values[:-1]) / 2
+    queries = np.concatenate(
+        [values, midpoints, midpoints + 1e-9, [values.min() - 5, values.max() + 5]]
+    )
+
+    expected = np.abs(values[None, :] - queries[:, None]).argmin(axis=1)
+    assert np.array_equal(axis.lookup(queries), expected)
+    assert [axis.lookup(query) for query in queries] == expected.tolist()
+
+
+def test_ties_on_descending_irregular_axes_pick_the_lower_index():
+    axis = GridAxis([6.0, 2.0, 0.5, 0.0])
+
+    # Halfway between 2.0 (index 1) and 0.5 (index 2)
+    assert axis.lookup(1.25) == 1
+    assert axis.lookup(np.array([4.0, 1.25, 0.25])).tolist() == [0, 1, 2]
@@ -0,0 +1,60 @@
+import json
+import logging
+import queue
+
+from logger import DroppingQueueHandler, JSONFormatter
+
+
+def get_logger(handler: logging.Handler) -> logging.Logger:
+    """
+    Returns a logger of its own writing only to the handler
+    """
+    logger = logging.getLogger(f"test.{id(handler)}")
+    logger.propagate = False
+    logger.handlers = [handler]
+    return logger
+
+
+def test_records_past_the_queue_size_are_dropped_and_counted():
+    log_queue = queue.Queue(maxsize=2)
+    handler = DroppingQueueHandler(log_queue)
+    logger = get_logger(handler)
+
+    for n in range(5):
+        logger.warning("record %d", n)
+
+    assert handler.dropped == 3
+    assert [log_queue.get_nowait().getMessage() for _ in range(2)] == [
+        "record 0",
+        "record 1",
+    ]
+
+    # There's room again once the writer catches up
+    logger.warning("record 5")
+    assert handler.dropped == 3
+    assert log_queue.get_nowait().getMessage() == "record 5"
+
+
+def test_traceback_is_left_for_the_writer_to_format():
+    log_queue = queue.Queue()
+    logger = get_logger(DroppingQueueHandler(log_queue))
+
+    try:
+        raise ValueError("bad cell")
+    except ValueError:
+        logger.exception("failed for %s", "cell")
+
+    record = log_queue.get_nowait()
+    assert (record.msg, record.args) == ("failed for cell", None)
+    assert record.exc_info[0] is ValueError and record.exc_text is None
+
+    # As written to the file, with the message first
+    text = logging.Formatter("%(levelname)s - %(message)s").format(record)
+    assert text.startswith(
+        "ERROR - failed for cell\nTraceback (most recent call last):"
+    )
+    assert text.endswith("ValueError: bad cell")
+
+    data = json.loads(JSONFormatter().format(record))
+    assert data["message"] == "failed for cell"
+    assert data["exc_info"].endswith("ValueError: bad cell")
@@ -0,0 +1,85 @@
+import datetime
+import io
+import os
+
+from app.utils import logreader
+from app.utils.logreader import LogReader, iter_lines_backward
+
+START = datetime.datetime(2024, 1, 1)
+
+
+def write_logs(path: str, first: int, count: int, mtime: float):
+    """
+    Writes the records numbered from the first, a second apart, with a
+    traceback under every third one
+    """
+    with open(path, mode="w") as file:
+        for n in range(first, first + count):
+            time = START + datetime.timedelta(seconds=n)
+            file.write(f"{time:%Y-%m-%d %H:%M:%S},000 - INFO - record {n}\n")
+            if n % 3 == 0:
+                file.write("Traceback (most recent call last):\n  line\n")
+    os.utime(path, (mtime, mtime))
+
+
+def get_messages(page: dict) -> list[str]:
+    """
+    Returns the first line of the messages of the page
+    """
+    return [record["message"].split("\n")[0] for record in page["records"]]
+
+
+def test_lines_backward_are_at_their_offsets(monkeypatch):
+    # Blocks smaller than the lines, so they start and end across blocks
+    monkeypatch.setattr(logreader, "BLOCK", 5)
+    data = b"first line\n\nsecond\nthe third line\nlast"
+
+    lines = list(iter_lines_backward(io.BytesIO(data), len(data)))
+
+    assert [line for _, line in lines] == [
+        b"last",
+        b"the third line",
+        b"second",
+        b"first line",
+    ]
+    for offset, line in lines:
+        assert data[offset : offset + len(line)] == line
+
+
+def test_pages_follow_the_rotated_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(logreader, "BLOCK", 64)
+    path = str(tmp_path / "app.log")
+    write_logs(path + ".1", 0, 20, mtime=1000)
+    write_logs(path, 20, 20, mtime=2000)
+    reader = LogReader(path)
+
+    messages, cursor = [], None
+    while True:
+        page = reader.page(cursor=cursor, limit=7)
+        messages += get_messages(page)
+        cursor = page["next"]
+        if cursor is None:
+            break
+
+    assert messages == [f"record {n}" for n in reversed(range(40))]
+    # The tracebacks are kept with their record
+    assert reader.page(limit=1)["records"][0]["message"].endswith("  line")
+
+
+def test_until_seeks_to_the_last_record_before(tmp_path, monkeypatch):
+    # Small blocks so the files are bisected rather than scanned
+    monkeypatch.setattr(logreader, "BLOCK", 64)
+    path = str(tmp_path / "app.log")
+    write_logs(path + ".1", 0, 200, mtime=1000)
+    write_logs(path, 200, 200, mtime=2000)
+    reader = LogReader(path)
+
+    for n in (0, 57, 199, 200, 321, 399):
+        until = START + datetime.timedelta(seconds=n)
+        messages = get_messages(reader.page(limit=2, until=until))
+        assert messages == [f"record {n}", f"record {n - 1}"][: n + 1]
+
+    # Before all the records, and past them
+    assert reader.page(until=START - datetime.timedelta(seconds=1))["records"] == []
+    until = START + datetime.timedelta(hours=1)
+    assert get_messages(reader.page(limit=1, until=until)) == ["record 399"]
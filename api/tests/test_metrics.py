@@ -0,0 +1,74 @@
+from app import app
+from app.utils import metrics as metrics_module
+from app.utils.metrics import Metrics, reset_sampled, set_sampled
+
+
+def test_spans_are_timed_at_the_sample_rate():
+    metrics = Metrics(sample_rate=1)
+    with metrics.span("read"):
+        pass
+    metrics.sample_rate = 0
+    with metrics.span("read"):
+        pass
+
+    assert 'solarwise_span_seconds_count{span="read"} 1' in metrics.export()
+
+
+def test_requests_are_sampled_as_a_whole():
+    metrics = Metrics(sample_rate=1)
+
+    token = set_sampled(False)
+    try:
+        # Left untimed whatever the rate, as the request isn't sampled
+        with metrics.span("read"):
+            pass
+    finally:
+        reset_sampled(token)
+
+    assert 'span="read"' not in metrics.export()
+
+
+def test_histograms_are_cumulative():
+    metrics = Metrics()
+    for seconds in (0.0002, 0.003, 0.003, 20.0):
+        metrics.observe("read", seconds)
+
+    lines = metrics.export().splitlines()
+    assert 'solarwise_span_seconds_bucket{span="read",le="0.0005"} 1' in lines
+    assert 'solarwise_span_seconds_bucket{span="read",le="0.005"} 3' in lines
+    assert 'solarwise_span_seconds_bucket{span="read",le="10.0"} 3' in lines
+    assert 'solarwise_span_seconds_bucket{span="read",le="+Inf"} 4' in lines
+    assert 'solarwise_span_seconds_count{span="read"} 4' in lines
+
+
+def test_counters_keep_their_labels_apart():
+    metrics = Metrics()
+    metrics.count("responses", code=200)
+    metrics.count("responses", code=200)
+    metrics.count("responses", code=404)
+    metrics.count("netcdf_bytes_read", 512)
+    metrics.collect("pool", lambda: {"files": 3, "busy": True})
+
+    lines = metrics.export().splitlines()
+    assert lines.count("# TYPE solarwise_responses_total counter") == 1
+    assert 'solarwise_responses_total{code="200"} 2' in lines
+    assert 'solarwise_responses_total{code="404"} 1' in lines
+    assert "solarwise_netcdf_bytes_read_total 512" in lines
+    assert "solarwise_pool_files 3" in lines
+    assert not any("busy" in line for line in lines)
+
+
+def test_label_values_are_escaped():
+    metrics = Metrics()
+    metrics.count("errors", kind='a "b"\\c')
+
+    assert 'solarwise_errors_total{kind="a \\"b\\"\\\\c"} 1' in metrics.export()
+
+
+def test_data_responses_are_counted_by_code():
+    response = app.test_client().post("/api/data/energy/profile", json={})
+
+    assert response.status_code == 400
+    exported = metrics_module.metrics.export()
+    assert '\nsolarwise_responses_total{code="400"} ' in exported
+    assert "responses_400" not in exported
@@ -0,0 +1,49 @@
+import threading
+import time
+
+from app.lib import dataset
+
+
+def make_folder(path, year: int):
+    for month in range(1, 13):
+        (path / f"SDLmm{year}{month:02d}010000003UDAVPOS01UD.nc").touch()
+
+
+def test_concurrent_first_refresh_sees_the_files(tmp_path, monkeypatch):
+    make_folder(tmp_path, 2020)
+    parse_filename = dataset.parse_filename
+
+    def slow_parse_filename(name):
+        # Widens the window of the first scan
+        time.sleep(0.005)
+        return parse_filename(name)
+
+    monkeypatch.setattr(dataset, "parse_filename", slow_parse_filename)
+
+    for _ in range(5):
+        index = dataset.NetCDFIndex(str(tmp_path), poll_interval=60)
+        barrier = threading.Barrier(4)
+        counts = []
+
+        def read():
+            barrier.wait()
+            counts.append(len(index.files(2020)))
+
+        threads = [threading.Thread(target=read) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert counts == [12, 12, 12, 12]
+
+
+def test_refresh_picks_up_new_files(tmp_path):
+    make_folder(tmp_path, 2020)
+    index = dataset.NetCDFIndex(str(tmp_path), poll_interval=0)
+    assert index.years() == [2020]
+
+    make_folder(tmp_path, 2021)
+    index.refresh(force=True)
+    assert index.years() == [2020, 2021]
+    assert len(index.files(2021)) == 12
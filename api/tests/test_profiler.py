@@ -0,0 +1,29 @@
+import os
+
+import pytest
+
+from app import app
+from app.routes import data
+
+
+@pytest.mark.filterwarnings("ignore:Warning. converting a masked element")
+def test_streamed_response_is_profiled_once_it_closes(monkeypatch, tmp_path):
+    monkeypatch.setattr(data.profile_store, "folder", str(tmp_path))
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["name"] = "admin"
+
+    response = client.post(
+        "/api/data/sdlr/range?profile=cprofile",
+        json={"from": 1980, "to": 1981, "lat": 20.0, "lon": 78.0},
+        headers={"Accept": "application/x-ndjson"},
+        buffered=False,
+    )
+    name = response.headers["X-Profile"]
+    assert not os.path.exists(tmp_path / name)
+
+    lines = response.get_data().splitlines()
+    response.close()
+
+    assert len(lines) == 3
+    assert os.path.getsize(tmp_path / name) > 0
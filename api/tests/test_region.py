@@ -0,0 +1,12 @@
+from app import app
+from app.lib import region
+
+
+def test_region_without_files_is_unavailable(monkeypatch):
+    monkeypatch.setattr(region.NetCDFRetriever, "retrieve", lambda self, year: [])
+
+    response = app.test_client().post(
+        "/api/data/energy/region", json={"bbox": [77, 19, 79, 21]}
+    )
+
+    assert response.status_code == 503
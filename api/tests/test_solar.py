@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from app import app
+from app.lib.solar import (
+    RPD,
+    get_hour_angles,
+    get_plane_coefficients,
+    get_solar_geometry,
+)
+
+LATS = np.array([-40.0, 0.0, 20.0, 51.5])
+DECLINATIONS = np.array([-23.44, -10.0, 0.0, 12.5, 23.44])
+
+
+def test_flat_panel_incidence_is_the_elevation():
+    geometry = get_solar_geometry(LATS, DECLINATIONS, tilts=0, azimuths=180)
+
+    # sin(elevation) = sin(phi) sin(delta) + cos(phi) cos(delta) cos(omega)
+    phi = LATS[:, None] * RPD
+    delta = np.repeat(DECLINATIONS, 24) * RPD
+    omega = get_hour_angles(len(DECLINATIONS)) * RPD
+    expected = np.sin(phi) * np.sin(delta) + np.cos(phi) * np.cos(delta) * np.cos(omega)
+
+    assert np.allclose(geometry["sin_elevation"], expected)
+    assert np.allclose(geometry["cos_incidence"], geometry["sin_elevation"])
+
+
+@pytest.mark.parametrize("tilt", [0.0, 15.0, 30.0, 60.0, 90.0])
+def test_south_facing_incidence_at_noon(tilt):
+    # The hourly terms at noon, when the hour angle is 0
+    delta = DECLINATIONS * RPD
+    terms = np.stack([np.sin(delta), np.cos(delta), np.zeros_like(delta)])
+    coefficients = get_plane_coefficients(
+        LATS, np.full(LATS.shape, tilt), np.full(LATS.shape, 180.0)
+    )
+
+    expected = np.cos((LATS[:, None] - tilt - DECLINATIONS) * RPD)
+    assert np.allclose(coefficients @ terms, expected)
+
+
+def test_profile_orientations_need_one_per_site():
+    response = app.test_client().post(
+        "/api/data/energy/profile",
+        json={"lat": [20, 21, 22], "lon": [78, 78, 78], "area": 10, "tilt": [10, 20]},
+    )
+
+    assert response.status_code == 400
+    assert response.get_json()["raw_msg"] == "got 2 tilts for 3 sites"
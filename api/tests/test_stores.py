@@ -0,0 +1,84 @@
+import os
+
+import numpy as np
+import pytest
+
+from app.lib import dataset
+
+# Outside of the smaller grid of the interim files from 2021 on, and within
+POINTS = [(37.9, 97.9), (5.1, 68.1), (20.0, 78.0)]
+
+
+@pytest.fixture(scope="module")
+def data_folder(tmp_path_factory):
+    """
+    The last month on the full grid and the months of 2024, on the smaller one
+    """
+    folder = tmp_path_factory.mktemp("nc")
+    files = dataset.NetCDFRetriever().retrieve(2020)[-1:]
+    files += dataset.NetCDFRetriever().retrieve(2024)
+    for file in files:
+        os.symlink(os.path.abspath(file), folder / os.path.basename(file))
+
+    return str(folder)
+
+
+@pytest.fixture(scope="module")
+def cube_folder(data_folder, tmp_path_factory):
+    folder = str(tmp_path_factory.mktemp("cube"))
+    dataset.build_sdl_cube(folder, data_folder=data_folder)
+    return folder
+
+
+@pytest.fixture(scope="module")
+def cube(cube_folder):
+    return dataset.SDLCubeExtractor(cube_folder)
+
+
+def get_files(data_folder: str) -> list[str]:
+    index = dataset.NetCDFIndex(data_folder)
+    return [file for year in index.years() for file in index.files(year)]
+
+
+def test_cube_matches_the_files_off_the_smaller_grid(data_folder, cube):
+    files = get_files(data_folder)
+    lats, lons = zip(*POINTS)
+
+    expected = dataset.NetCDFExtractor.get_sdlr_many(files, lats, lons)
+    assert not np.isnan(expected).any()
+    assert np.array_equal(cube.get_sdlr_many(files, lats, lons), expected)
+
+    for j, (lat, lon) in enumerate(POINTS):
+        assert np.array_equal(cube.get_sdlr_as_np(files, lat, lon), expected[:, j])
+        assert [month["sdlr"] for month in cube.get_sdlr(files, lat, lon)] == (
+            expected[:, j].tolist()
+        )
+
+        # The months of 2024 in the history of the point
+        series = cube.get_series(lat, lon, 2024, 2024)
+        assert np.array_equal(series[0, : len(files) - 1], expected[1:, j])
+
+
+@pytest.mark.parametrize("codec", ["none", "zlib"])
+def test_tiles_match_the_files_off_the_smaller_grid(
+    data_folder, cube_folder, tmp_path, codec
+):
+    files = get_files(data_folder)
+    lats, lons = zip(*POINTS)
+    # Tiles smaller than the grid, so the points fall in different ones
+    dataset.build_sdl_tiles(
+        str(tmp_path), tile_size=7, codec=codec, cube_folder=cube_folder
+    )
+    tiles = dataset.SDLTileExtractor(str(tmp_path))
+
+    expected = dataset.NetCDFExtractor.get_sdlr_many(files, lats, lons)
+    assert np.array_equal(tiles.get_sdlr_many(files, lats, lons), expected)
+
+    for j, (lat, lon) in enumerate(POINTS):
+        assert [month["sdlr"] for month in tiles.get_sdlr(files, lat, lon)] == (
+            expected[:, j].tolist()
+        )
+
+        series = tiles.get_series(lat, lon, 2020, 2024)
+        assert series[0, 11] == expected[0, j]
+        assert np.array_equal(series[-1, : len(files) - 1], expected[1:, j])
@@ -0,0 +1,169 @@
+import csv
+import datetime
+import importlib.util
+import io
+import json
+import os
+import re
+
+import pytest
+import sqlalchemy as sa
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+
+from app import app, create_schema
+from app.models import db
+from app.models.user import User
+from app.routes import admin
+
+# Most of the users made at the same time, so the pages split them
+TIMES = [datetime.datetime(2024, 1, day, 12) for day in (1, 2, 2, 2, 2, 3, 3)]
+MIGRATIONS_FOLDER = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations"
+)
+
+
+@pytest.fixture()
+def users():
+    """
+    The ids of the users, the newest first
+    """
+    create_schema()
+    with app.app_context():
+        User.query.delete()
+        for i, created in enumerate(TIMES):
+            db.session.add(
+                User(
+                    id=f"{i:032x}",
+                    email=f"user{i}@example.com",
+                    username=f"user{i}",
+                    password="hash",
+                    created=created,
+                )
+            )
+        db.session.commit()
+
+        yield [
+            user.id for user in User.query.order_by(User.created.desc(), User.id.desc())
+        ]
+
+        User.query.delete()
+        db.session.commit()
+
+
+@pytest.fixture()
+def client():
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["name"] = "admin"
+    return client
+
+
+def test_keyset_pages_across_equal_timestamps(users):
+    ids, after = [], None
+    with app.app_context():
+        while True:
+            page = User.keyset(after, limit=2, columns=["id"])
+            ids += [user["id"] for user in page]
+            if len(page) < 2:
+                break
+            after = (page[-1]["created"], page[-1]["id"])
+
+    assert ids == users
+
+
+def test_pages_are_linked_by_their_cursor(users, client):
+    ids, cursor = [], ""
+    while cursor is not None:
+        response = client.get(
+            f"/_/admin/collections/users?columns=id&limit=3&cursor={cursor}"
+        )
+        assert response.status_code == 200
+        html = response.get_data(as_text=True)
+
+        ids += re.findall(r"<td>([0-9a-f]{32})</td>", html)
+        cursor = next(iter(re.findall(r"cursor=([\w%-]+)", html)), None)
+
+    assert ids == users
+    assert client.get("/_/admin/collections/users?cursor=bad").status_code == 400
+
+
+def test_csv_export_is_written_a_batch_at_a_time(users, client, monkeypatch):
+    monkeypatch.setattr(admin, "USERS_EXPORT_BATCH", 2)
+    keys = []
+    keyset = User.keyset
+    monkeypatch.setattr(
+        User, "keyset", lambda after, *args: keys.append(after) or keyset(after, *args)
+    )
+
+    response = client.get("/_/admin/collections/users/export?format=csv")
+    chunks = list(response.iter_encoded())
+
+    assert response.mimetype == "text/csv"
+    # A query and a chunk for each batch, the header along with the first
+    assert len(keys) == len(chunks) == 4
+    assert keys[0] is None
+    assert [key[1] for key in keys[1:]] == users[1:-1:2]
+    assert [len(chunk.splitlines()) for chunk in chunks] == [3, 2, 2, 1]
+
+    rows = list(csv.DictReader(io.StringIO(b"".join(chunks).decode())))
+    assert [row["id"] for row in rows] == users
+    assert rows[-1]["created"] == TIMES[0].isoformat()
+    assert "password" not in rows[0]
+
+
+def test_ndjson_export_keeps_the_search_and_columns(users, client, monkeypatch):
+    monkeypatch.setattr(admin, "USERS_EXPORT_BATCH", 2)
+
+    response = client.get(
+        "/_/admin/collections/users/export?format=ndjson&q=user1&columns=id,created"
+    )
+    lines = [json.loads(line) for line in response.get_data().splitlines()]
+
+    assert response.mimetype == "application/x-ndjson"
+    assert lines == [{"id": f"{1:032x}", "created": TIMES[1].isoformat()}]
+    assert client.get("/_/admin/collections/users/export?format=xml").status_code == 400
+
+
+def test_migration_fills_the_missing_timestamps_and_adds_the_index(tmp_path):
+    spec = importlib.util.spec_from_file_location(
+        "revision",
+        os.path.join(
+            MIGRATIONS_FOLDER, "versions", "1e1f6d61ae4d_user_created_not_null.py"
+        ),
+    )
+    revision = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(revision)
+
+    engine = sa.create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}")
+    with engine.begin() as connection:
+        # The table as it was made before the migration
+        connection.exec_driver_sql(
+            'CREATE TABLE "user" (id VARCHAR(32) PRIMARY KEY, email VARCHAR(345), '
+            "username VARCHAR(30) NOT NULL, password TEXT NOT NULL, created DATETIME)"
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO \"user\" VALUES ('a', 'a@example.com', 'a', 'x', NULL), "
+            "('b', 'b@example.com', 'b', 'x', '2024-01-01 12:00:00.000000')"
+        )
+
+        with Operations.context(MigrationContext.configure(connection)):
+            revision.upgrade()
+
+        inspector = sa.inspect(connection)
+        created = next(
+            column
+            for column in inspector.get_columns("user")
+            if column["name"] == "created"
+        )
+        assert not created["nullable"]
+        indexes = inspector.get_indexes("user")
+        assert [(index["name"], index["column_names"]) for index in indexes] == [
+            ("ix_user_created_id", ["created", "id"])
+        ]
+        assert connection.exec_driver_sql(
+            'SELECT id, created FROM "user" ORDER BY created'
+        ).all() == [
+            ("a", "1970-01-01 00:00:00.000000"),
+            ("b", "2024-01-01 12:00:00.000000"),
+        ]
@@ -0,0 +1,48 @@
+import threading
+
+import pytest
+
+import run
+from app.lib import warmup
+
+
+def test_no_files_for_the_year_is_reported(monkeypatch):
+    monkeypatch.setattr(warmup.NetCDFRetriever, "retrieve", lambda self, year: [])
+
+    with pytest.raises(ValueError, match="no files to warm"):
+        warmup.get_warmup_cells([("point", (20.0, 78.0))])
+
+
+def test_warmup_starts_once_when_serving(monkeypatch, tmp_path):
+    places = tmp_path / "places.log"
+    places.write_text("20,78\n")
+    starts = []
+    monkeypatch.setattr(run, "WARMUP_FILE", str(places))
+    monkeypatch.setattr(run.warmup, "start", lambda *args: starts.append(args))
+    monkeypatch.setattr(run, "__started", False)
+    monkeypatch.setattr(run, "FAST_START", False)
+
+    # Nothing is started by the import
+    assert starts == []
+
+    client = run.app.test_client()
+    client.get("/health")
+    client.get("/health")
+
+    assert len(starts) == 1
+
+
+def test_fast_start_is_reported_after_the_preload(monkeypatch):
+    order = []
+    monkeypatch.setattr(run, "__started", False)
+    monkeypatch.setattr(run, "FAST_START", True)
+    monkeypatch.setattr(run, "WARMUP_FILE", None)
+    monkeypatch.setattr(run, "preload", lambda: order.append("preload"))
+    monkeypatch.setattr(run, "report_started", lambda: order.append("started"))
+
+    run.start_background()
+    for thread in threading.enumerate():
+        if thread.name == "preload":
+            thread.join()
+
+    assert order == ["preload", "started"]
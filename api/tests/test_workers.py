@@ -0,0 +1,17 @@
+import numpy as np
+import pytest
+
+import workers
+from app.lib import dataset
+
+
+@pytest.mark.filterwarnings("ignore:Warning. converting a masked element")
+@pytest.mark.parametrize("lat,lon", [(20.0, 78.0), (20.025, 78.025), (-10.3, 33.1)])
+def test_worker_reads_the_cells_of_the_app(lat, lon):
+    files = dataset.NetCDFRetriever().retrieve(1980)[:3]
+
+    assert np.allclose(
+        workers.read_year_sdlr(files, lat, lon),
+        dataset.read_year_sdlr(files, lat, lon),
+        equal_nan=True,
+    )
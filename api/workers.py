@@ -0,0 +1,55 @@
+from collections import OrderedDict
+import numpy as np
+import netCDF4
+import os
+
+"""
+The entry points of the processes reading the NetCDF files for the app.
+They're kept out of the app package, which builds the app when imported,
+so the spawned workers only load numpy and netCDF4
+"""
+
+# The files each worker keeps open, as the app's pool of datasets
+MAX_OPEN_FILES = int(os.environ.get("DATASET_POOL_MAX_FILES", 64))
+
+# The open datasets of the worker with their coordinates, by path
+__datasets: OrderedDict[str, tuple] = OrderedDict()
+
+
+def open_dataset(path: str) -> tuple:
+    """
+    Returns the open dataset of the file along with its latitudes and
+    longitudes, closing the least recently used ones past the limit
+    """
+    entry = __datasets.get(path)
+    if entry is not None:
+        __datasets.move_to_end(path)
+        return entry
+
+    dataset = netCDF4.Dataset(path, "r")
+    entry = __datasets[path] = (
+        dataset,
+        np.ma.getdata(dataset.variables["lat"][:]).astype(np.float64),
+        np.ma.getdata(dataset.variables["lon"][:]).astype(np.float64),
+    )
+    while len(__datasets) > MAX_OPEN_FILES:
+        _, (oldest, _, _) = __datasets.popitem(last=False)
+        oldest.close()
+
+    return entry
+
+
+def read_year_sdlr(files: list[str], lat: float, lon: float) -> np.ndarray:
+    """
+    Returns the SDLR of the cell nearest to the point for each of the files,
+    the ties going to the lower index as in the app's grid lookups
+    """
+    sdlr = np.empty(len(files), dtype=np.float64)
+
+    for i, file in enumerate(files):
+        dataset, lats, lons = open_dataset(file)
+        lat_idx = int(np.argmin(np.abs(lats - lat)))
+        lon_idx = int(np.argmin(np.abs(lons - lon)))
+        sdlr[i] = float(dataset.variables["SDL"][..., lat_idx, lon_idx][0])
+
+    return sdlr